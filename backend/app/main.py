@@ -1,4 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 # --- IMPORT ALL YOUR ROUTERS HERE ---
 from app.routers import (
@@ -9,10 +12,36 @@ from app.routers import (
     weather, 
     locations_search, 
     ai_advisor,
-    iot  # <-- The new router for your IoT device
+    iot,  # <-- The new router for your IoT device
+    commodities,
+    analytics,
+    ingest
 )
+from app.services import http_clients, logging_setup, metrics, prefetch_service, readiness, state_backend
 
-app = FastAPI(title="Agri-Insight API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging_setup.configure()
+    # Data, indexes and models load lazily on first use. Optionally warm them
+    # in a worker thread so the first requests don't pay for it.
+    warmup = asyncio.create_task(asyncio.to_thread(readiness.warm)) if readiness.WARM_ON_STARTUP else None
+    # Refreshes popular markets and forecast cells before their cache entries expire.
+    prefetcher = asyncio.create_task(prefetch_service.run()) if prefetch_service.PREFETCH_ENABLED else None
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if prefetcher is not None:
+        prefetcher.cancel()
+        await asyncio.gather(prefetcher, return_exceptions=True)
+    # Close the shared, pooled upstream clients on shutdown.
+    await http_clients.aclose_all()
+    # Write out readings and cache entries still waiting for the next batch.
+    state_backend.close()
+    logging_setup.shutdown()
+
+
+app = FastAPI(title="Agri-Insight API", lifespan=lifespan)
 
 # This middleware allows your React frontend (running on localhost:3000)
 # to make requests to this backend server.
@@ -23,6 +52,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it wraps everything else, including CORS preflights.
+app.add_middleware(metrics.MetricsMiddleware)
 
 # --- INCLUDE ALL THE ROUTERS TO ACTIVATE THE ENDPOINTS ---
 app.include_router(prices.router)
@@ -33,8 +64,22 @@ app.include_router(weather.router)
 app.include_router(locations_search.router)
 app.include_router(ai_advisor.router)
 app.include_router(iot.router) # <-- Activate the new IoT endpoint
+app.include_router(commodities.router)
+app.include_router(analytics.router)
+app.include_router(ingest.router)
 
 @app.get("/")
 def read_root():
     """A simple root endpoint to confirm the server is running."""
-    return {"message": "Welcome to the Agri-Insight Backend!"}
\ No newline at end of file
+    return {"message": "Welcome to the Agri-Insight Backend!"}
+
+@app.get("/ready")
+def read_readiness():
+    """Readiness probe: 503 until the optional start-up warm-up has finished."""
+    state = readiness.status()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Per-route latency and status, upstream call timings and cache hit ratios (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
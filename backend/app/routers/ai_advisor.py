@@ -1,16 +1,20 @@
+import hashlib
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import httpx
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from app.services import gemini_service
 
 router = APIRouter(
     prefix="/api/advisor",
     tags=["AI Advisor"],
 )
 
-# Configuration for the Gemini API
-GEMINI_API_KEY = "gemini api key" # Handled by the execution environment
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={GEMINI_API_KEY}"
+# Band widths used to bucket live sensor readings into cache signatures.
+SOIL_MOISTURE_BAND = 5.0   # %
+TEMPERATURE_BAND = 2.0     # °C
+HUMIDITY_BAND = 10.0       # %
 
 # --- This Pydantic model is for the weather page advisor ---
 class WeatherAdviceRequest(BaseModel):
@@ -25,39 +29,93 @@ class SoilAdviceRequest(BaseModel):
     temperature: Optional[float] = None
     humidity: Optional[float] = None
 
-@router.post("/weather-suggestion")
-async def get_weather_suggestion(request: WeatherAdviceRequest):
-    """
-    Receives weather forecast data and a crop name, then asks Gemini for farming advice.
-    """
-    # This endpoint for the weather page remains unchanged
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _band(value: Optional[float], width: float) -> Optional[int]:
+    return None if value is None else int(value // width)
+
+
+def _format_reading(value: Optional[float], unit: str) -> str:
+    return "unknown" if value is None else f"{value:.1f}{unit}"
+
+
+def _weather_prompt(request: WeatherAdviceRequest) -> Tuple[Tuple, str, str]:
     weather_summary = ", ".join([
-        f"{day['date']}: {day['weather']['description']} ({day['tempMax']}°C)" 
+        f"{day['date']}: {day['weather']['description']} ({day['tempMax']}°C)"
         for day in request.weather_data
     ])
-    
+
     system_prompt = "You are an expert agricultural advisor for Indian farming. Provide clear, actionable advice in markdown bullet points."
-    
+
     user_query = (
         f"For a farmer growing {request.crop_name} in {request.location_name}, India, provide 2-3 specific suggestions based on this 7-day weather forecast: {weather_summary}"
     )
 
-    payload = {
-        "contents": [{"parts": [{"text": user_query}]}],
-        "systemInstruction": {"parts": [{"text": system_prompt}]},
-    }
+    # Farmers in the same place growing the same crop see the same forecast,
+    # so the signature is the crop, the location and a hash of the forecast.
+    forecast_hash = hashlib.sha1(_normalize(weather_summary).encode("utf-8")).hexdigest()
+    signature = ("weather", _normalize(request.crop_name), _normalize(request.location_name), forecast_hash)
+    return signature, system_prompt, user_query
+
+
+def _soil_prompt(request: SoilAdviceRequest) -> Tuple[Tuple, str, str]:
+    system_prompt = "You are an expert agricultural advisor for Indian farming. Provide clear, actionable advice based on live soil conditions. Use simple language and markdown bullet points."
+
+    user_query = (
+        f"I am growing {request.crop_name}. My farm sensor is reporting a current soil moisture of {request.soil_moisture:.1f}%, "
+        f"a temperature of {_format_reading(request.temperature, '°C')}, and humidity of {_format_reading(request.humidity, '%')}. "
+        f"Based on these live conditions, what is one immediate action I should consider today? "
+        f"Focus on irrigation (watering) advice. For example, if the soil is dry, recommend watering. If it is wet, recommend holding off."
+    )
+
+    # Readings within the same band get the same advice.
+    signature = (
+        "soil",
+        _normalize(request.crop_name),
+        _band(request.soil_moisture, SOIL_MOISTURE_BAND),
+        _band(request.temperature, TEMPERATURE_BAND),
+        _band(request.humidity, HUMIDITY_BAND),
+    )
+    return signature, system_prompt, user_query
+
+
+async def _advise(signature: Tuple, system_prompt: str, user_query: str) -> Dict[str, str]:
+    try:
+        return {"advice": await gemini_service.generate(signature, system_prompt, user_query)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating advice: {e}")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+
+def _sse(signature: Tuple, system_prompt: str, user_query: str) -> StreamingResponse:
+    async def events() -> AsyncIterator[str]:
         try:
-            response = await client.post(GEMINI_API_URL, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text")
-            if not text:
-                raise HTTPException(status_code=500, detail="Received empty response from AI.")
-            return {"advice": text}
+            async for chunk in gemini_service.stream_generate(signature, system_prompt, user_query):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error generating advice: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': f'Error generating advice: {e}'})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/weather-suggestion")
+async def get_weather_suggestion(request: WeatherAdviceRequest):
+    """
+    Receives weather forecast data and a crop name, then asks Gemini for farming advice.
+    """
+    return await _advise(*_weather_prompt(request))
+
+
+@router.post("/weather-suggestion/stream")
+async def stream_weather_suggestion(request: WeatherAdviceRequest):
+    """
+    Same as /weather-suggestion, streamed as server-sent events (`data: {"text": ...}`).
+    """
+    return _sse(*_weather_prompt(request))
 
 
 # --- THIS IS THE NEW ENDPOINT FOR THE SOIL MOISTURE PAGE ---
@@ -66,28 +124,12 @@ async def get_soil_suggestion(request: SoilAdviceRequest):
     """
     Receives live sensor data and a crop name, then asks Gemini for immediate advice.
     """
-    system_prompt = "You are an expert agricultural advisor for Indian farming. Provide clear, actionable advice based on live soil conditions. Use simple language and markdown bullet points."
-    
-    user_query = (
-        f"I am growing {request.crop_name}. My farm sensor is reporting a current soil moisture of {request.soil_moisture:.1f}%, "
-        f"a temperature of {request.temperature:.1f}°C, and humidity of {request.humidity:.1f}%. "
-        f"Based on these live conditions, what is one immediate action I should consider today? "
-        f"Focus on irrigation (watering) advice. For example, if the soil is dry, recommend watering. If it is wet, recommend holding off."
-    )
+    return await _advise(*_soil_prompt(request))
 
-    payload = {
-        "contents": [{"parts": [{"text": user_query}]}],
-        "systemInstruction": {"parts": [{"text": system_prompt}]},
-    }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(GEMINI_API_URL, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text")
-            if not text:
-                raise HTTPException(status_code=500, detail="Received empty response from AI.")
-            return {"advice": text}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error generating advice: {e}")
+@router.post("/soil-suggestion/stream")
+async def stream_soil_suggestion(request: SoilAdviceRequest):
+    """
+    Same as /soil-suggestion, streamed as server-sent events (`data: {"text": ...}`).
+    """
+    return _sse(*_soil_prompt(request))
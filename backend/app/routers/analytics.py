@@ -0,0 +1,57 @@
+from datetime import date
+from fastapi import APIRouter, Query, HTTPException
+from typing import Dict, Optional
+from app.services import analytics_service
+
+router = APIRouter(
+    prefix="/api/analytics",
+    tags=["Analytics"],
+)
+
+GROUP_BY_COLUMNS = analytics_service.DIMENSIONS + ("period",)
+MAX_PAGE_SIZE = 1000
+
+@router.get("/prices")
+def get_price_analytics(
+    group_by: str = Query("commodity", description=f"Comma-separated columns to group by: {', '.join(GROUP_BY_COLUMNS)}"),
+    grain: str = Query("month", description="Time grain of the period column: day, week or month"),
+    state: Optional[str] = Query(None),
+    district: Optional[str] = Query(None),
+    market: Optional[str] = Query(None),
+    commodity: Optional[str] = Query(None),
+    variety: Optional[str] = Query(None),
+    start: Optional[date] = Query(None, alias="from", description="First arrival date to include"),
+    end: Optional[date] = Query(None, alias="to", description="Last arrival date to include"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+) -> Dict:
+    """
+    Min/max/average modal price and row counts over the market history, filtered
+    and grouped by any of state, district, market, commodity, variety and period.
+    Served from the precomputed rollup cube.
+    """
+    if grain not in analytics_service.GRAINS:
+        raise HTTPException(status_code=400, detail=f"Unknown grain '{grain}'. Use one of: {', '.join(analytics_service.GRAINS)}.")
+    columns = [c.strip().lower() for c in group_by.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in GROUP_BY_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by {', '.join(unknown)}. Use: {', '.join(GROUP_BY_COLUMNS)}.")
+    if len(set(columns)) != len(columns):
+        raise HTTPException(status_code=400, detail="group_by columns must be unique.")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail=f"'from' ({start}) is after 'to' ({end}).")
+
+    filters = {
+        dim: value
+        for dim, value in zip(analytics_service.DIMENSIONS, (state, district, market, commodity, variety))
+        if value
+    }
+    return analytics_service.get_cube().query(
+        grain=grain,
+        group_by=columns,
+        filters=filters,
+        start=start,
+        end=end,
+        limit=limit,
+        offset=offset,
+    )
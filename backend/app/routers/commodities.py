@@ -1,7 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 import os
 from typing import Dict, List
-from app.services import commodity_service
+from app.services import commodity_service, static_payloads
 
 # Change this line
 DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'app_data.csv')
@@ -11,9 +11,11 @@ router = APIRouter(
     tags=["Commodities"],
 )
 
-@router.get("/categorized")
-def get_categorized_commodities() -> Dict[str, List[str]]:
+@router.get("/categorized", response_model=Dict[str, List[str]])
+def get_categorized_commodities(request: Request):
     """
     Returns a dictionary of commodity categories with their items.
+    Served pre-encoded with an ETag; If-None-Match gets a 304.
     """
-    return commodity_service.categorize_commodities()
\ No newline at end of file
+    categorized = commodity_service.categorize_commodities()
+    return static_payloads.respond(request, static_payloads.get_payload("categorized", categorized))
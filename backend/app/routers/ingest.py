@@ -0,0 +1,60 @@
+import asyncio
+import hmac
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Request
+from typing import Dict
+from app.services import ingest_service
+
+router = APIRouter(
+    prefix="/api/ingest",
+    tags=["Ingest"],
+)
+
+# Shared secret sent in the X-Ingest-Token header; uploads are refused until it is configured.
+INGEST_TOKEN = os.getenv("INGEST_TOKEN")
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def _check_token(request: Request) -> None:
+    if not INGEST_TOKEN:
+        raise HTTPException(status_code=503, detail="Ingest is disabled; INGEST_TOKEN is not configured.")
+    supplied = request.headers.get("x-ingest-token", "")
+    if not hmac.compare_digest(supplied.encode(), INGEST_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Ingest-Token header.")
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body exceeds {INGEST_MAX_BYTES} bytes.")
+
+@router.post("/agmarknet")
+async def ingest_agmarknet_export(request: Request, filename: str = "upload.csv") -> Dict:
+    """
+    Ingests a raw Agmarknet CSV export sent as the request body (Content-Type: text/csv).
+    Requires the X-Ingest-Token header and accepts at most INGEST_MAX_BYTES.
+    The body is streamed to a temporary file and parsed in chunks, so uploads use
+    bounded memory; file I/O and parsing run in a worker thread. New rows are
+    visible to the other endpoints right away; duplicates of already stored rows
+    are skipped.
+    """
+    _check_token(request)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > INGEST_MAX_BYTES:
+        raise _too_large()
+
+    spool = await asyncio.to_thread(tempfile.NamedTemporaryFile, suffix=".csv")
+    try:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            # Content-Length may be absent (chunked uploads), so count as well.
+            if size > INGEST_MAX_BYTES:
+                raise _too_large()
+            await asyncio.to_thread(spool.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Request body is empty.")
+        await asyncio.to_thread(spool.flush)
+        try:
+            return await asyncio.to_thread(ingest_service.ingest_csv, spool.name, filename)
+        except ingest_service.IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await asyncio.to_thread(spool.close)
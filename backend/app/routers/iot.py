@@ -1,6 +1,14 @@
-from fastapi import FastAPI, APIRouter
-from pydantic import BaseModel
-from typing import Optional
+import asyncio
+import contextlib
+import json
+import os
+import time
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
+from typing import List, Optional
+from app.services import alert_service, sensor_store, state_backend
+from app.services.pubsub import Hub, alert_hub, sensor_hub
 
 app = FastAPI(title="IoT Sensor API")
 router = APIRouter(
@@ -8,6 +16,15 @@ router = APIRouter(
     tags=["IoT"],
 )
 
+# Default look-back window for /history when `from` is omitted
+HISTORY_WINDOWS = {"raw": 3600, "1m": 6 * 3600, "1h": 7 * 24 * 3600}
+# SSE comment sent on idle streams so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15.0
+# How far ahead of the server clock a device timestamp may be
+MAX_CLOCK_SKEW_SECONDS = float(os.getenv("IOT_MAX_CLOCK_SKEW", "300"))
+# Earliest accepted device timestamp (2000-01-01); smaller values are not epoch seconds
+MIN_TIMESTAMP = 946684800.0
+
 # Pydantic model for incoming sensor data
 class SensorData(BaseModel):
     device_id: str
@@ -16,21 +33,95 @@ class SensorData(BaseModel):
     humidity: Optional[float] = None
     soil_fertility: Optional[float] = None
     light_intensity: Optional[float] = None
+    crop: Optional[str] = None  # Selects crop-specific alert rules
+    timestamp: Optional[float] = None  # Unix epoch seconds; defaults to the time received
+
+    @field_validator("timestamp")
+    @classmethod
+    def _check_timestamp(cls, value: Optional[float]) -> Optional[float]:
+        if value is None:
+            return value
+        if not MIN_TIMESTAMP <= value <= time.time() + MAX_CLOCK_SKEW_SECONDS:
+            # Millisecond timestamps land far in the future, so they fail here too.
+            raise ValueError("timestamp must be Unix epoch seconds and not in the future")
+        return value
+
+_batch_adapter = TypeAdapter(List[SensorData])
+
+# Latest reading per device, in the state backend so every worker sees it
+# (STATE_BACKEND=sqlite when running several uvicorn workers).
+LATEST_NAMESPACE = "iot:latest"
+
+
+async def get_latest_reading(device_id: str) -> Optional[dict]:
+    return await state_backend.get_async(LATEST_NAMESPACE, device_id)
+
+
+def _store_reading(data: SensorData) -> Optional[dict]:
+    """
+    Records one reading and pushes it to the device's subscribers. Returns None
+    if the reading is older than the device's last one and was dropped.
+    """
+    payload = data.model_dump()
+    timestamp = data.timestamp or time.time()
+    if not sensor_store.record_reading(data.device_id, payload, timestamp):
+        return None
+    # Ordered by reading time, so a worker that never saw the device can't
+    # replace a newer latest reading stored by another worker with a late one.
+    state_backend.get_backend().set(LATEST_NAMESPACE, data.device_id, payload, updated_at=timestamp)
+    sensor_hub.publish(data.device_id, payload)
+    return payload
+
+
+def _parse_batch(body: bytes, content_type: str) -> List[SensorData]:
+    """Accepts a JSON array, or NDJSON (one reading per line)."""
+    if "ndjson" not in content_type and body.lstrip().startswith(b"["):
+        return _batch_adapter.validate_json(body)
+
+    readings = []
+    for line_number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            readings.append(SensorData.model_validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid reading on line {line_number}: {e.errors(include_url=False)}")
+    return readings
 
-# In-memory storage for latest sensor data per device
-latest_sensor_data = {}
 
 # POST endpoint - ESP32 sends data here
 @router.post("/sensor-data")
 async def receive_sensor_data(data: SensorData):
-    print(f"Received data from device {data.device_id}: {data.dict()}")
-    latest_sensor_data[data.device_id] = data
-    return {"status": "success", "message": "Data received"}
+    payload = _store_reading(data)
+    if payload is None:
+        return {"status": "ignored", "message": "Reading is older than the device's last reading", "alerts": 0}
+    alerts = alert_service.process_readings([payload])
+    return {"status": "success", "message": "Data received", "alerts": len(alerts)}
+
+# POST endpoint - gateways send many readings at once (JSON array or NDJSON)
+@router.post("/sensor-data/batch")
+async def receive_sensor_data_batch(request: Request):
+    body = await request.body()
+    try:
+        readings = _parse_batch(body, request.headers.get("content-type", ""))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    stored = [payload for payload in map(_store_reading, readings) if payload is not None]
+    # Alert rules are checked once for the whole batch.
+    alerts = alert_service.process_readings(stored)
+    return {
+        "status": "success",
+        "message": "Data received",
+        "received": len(readings),
+        "dropped": len(readings) - len(stored),
+        "alerts": len(alerts),
+    }
 
 # GET endpoint - frontend fetches latest data
 @router.get("/latest-data/{device_id}")
 async def get_latest_data(device_id: str):
-    if device_id not in latest_sensor_data:
+    latest = await get_latest_reading(device_id)
+    if latest is None:
         return {
             "device_id": device_id,
             "soil_moisture": 0,
@@ -40,7 +131,95 @@ async def get_latest_data(device_id: str):
             "light_intensity": 0,
             "message": "No data received yet."
         }
-    return latest_sensor_data[device_id]
+    return latest
+
+# GET endpoint - trends for charts, answered from the per-device rollups
+@router.get("/history/{device_id}")
+async def get_sensor_history(
+    device_id: str,
+    start: Optional[float] = Query(None, alias="from", description="Start time (Unix epoch seconds)"),
+    end: Optional[float] = Query(None, alias="to", description="End time (Unix epoch seconds), defaults to now"),
+    resolution: str = Query("1m", pattern="^(raw|1m|1h)$", description="raw, 1m or 1h"),
+):
+    end = time.time() if end is None else end
+    start = end - HISTORY_WINDOWS[resolution] if start is None else start
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+
+    history = sensor_store.get_history(device_id, start, end, resolution)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No data received yet for device {device_id}.")
+    return history
+
+# WebSocket - pushes each new reading for a device ("*" for all devices)
+@router.websocket("/ws/{device_id}")
+async def sensor_data_websocket(websocket: WebSocket, device_id: str):
+    await websocket.accept()
+    subscription = sensor_hub.subscribe(device_id)
+    latest = await get_latest_reading(device_id)
+    if latest is not None:
+        subscription.offer(latest)
+
+    async def pump():
+        while True:
+            await websocket.send_json(await subscription.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        # Client messages are ignored; receiving is how a disconnect is noticed.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        sensor_hub.unsubscribe(subscription)
+        with contextlib.suppress(asyncio.CancelledError, WebSocketDisconnect):
+            await sender
+
+def _event_stream(hub: Hub, topic: str, request: Request, initial: Optional[dict] = None) -> StreamingResponse:
+    """Server-sent events for one hub topic, with keepalives on idle streams."""
+
+    async def events():
+        # Subscribed only once the response is streaming, so a stream that never starts leaves nothing behind.
+        subscription = hub.subscribe(topic)
+        try:
+            if initial is not None:
+                subscription.offer(initial)
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Server-sent events - same stream for clients that can't use WebSockets
+@router.get("/stream/{device_id}")
+async def sensor_data_stream(device_id: str, request: Request):
+    return _event_stream(sensor_hub, device_id, request, await get_latest_reading(device_id))
+
+# GET endpoint - recently fired alerts, newest first
+@router.get("/alerts")
+async def get_recent_alerts(
+    device_id: Optional[str] = Query(None, description="Only alerts for this device"),
+    limit: int = Query(100, ge=1, le=alert_service.RECENT_ALERTS),
+):
+    return alert_service.recent_alerts(device_id, limit)
+
+# GET endpoint - the alert rules currently loaded
+@router.get("/alerts/rules")
+async def get_alert_rules():
+    return alert_service.list_rules()
+
+# Server-sent events - alerts as they fire for a device ("*" for all devices)
+@router.get("/alerts/stream/{device_id}")
+async def alert_stream(device_id: str, request: Request):
+    return _event_stream(alert_hub, device_id, request)
 
 # Include router
 app.include_router(router)
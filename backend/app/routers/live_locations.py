@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
 from typing import List
-from app.services import live_location_service
+from app.services import live_location_service, static_payloads
 
 router = APIRouter(
     prefix="/api/live-locations",
@@ -8,22 +8,24 @@ router = APIRouter(
 )
 
 @router.get("/states", response_model=List[str])
-async def get_states_from_api():
+async def get_states_from_api(request: Request):
     states = live_location_service.get_live_states()
     if not states:
         raise HTTPException(status_code=404, detail="Could not find any states in the live data file.")
-    return states
+    return static_payloads.respond(request, static_payloads.get_payload("live-states", states))
 
 @router.get("/districts", response_model=List[str])
-async def get_districts_from_api(state: str = Query(...)):
+async def get_districts_from_api(request: Request, state: str = Query(...)):
     districts = live_location_service.get_live_districts_for_state(state)
     if not districts:
         raise HTTPException(status_code=404, detail=f"Could not find any districts for the state: {state}.")
-    return districts
+    key = ("live-districts", state.strip().lower())
+    return static_payloads.respond(request, static_payloads.get_payload(key, districts))
 
 @router.get("/markets", response_model=List[str])
-async def get_markets_from_api(district: str = Query(...)):
+async def get_markets_from_api(request: Request, district: str = Query(...)):
     markets = live_location_service.get_live_markets_for_district(district)
     if not markets:
         raise HTTPException(status_code=404, detail=f"Could not find any markets for the district: {district}.")
-    return markets
\ No newline at end of file
+    key = ("live-markets", district.strip().lower())
+    return static_payloads.respond(request, static_payloads.get_payload(key, markets))
\ No newline at end of file
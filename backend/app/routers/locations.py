@@ -1,22 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List
-from ..services import location_service
+from ..services import location_service, static_payloads
 
 router = APIRouter(
     prefix="/api/locations",
     tags=["Local CSV Locations"],
 )
 
-@router.get("/all-markets")
-async def get_all_markets_from_csv():
+@router.get("/all-markets", response_model=List[str])
+async def get_all_markets_from_csv(request: Request):
     markets = location_service.get_all_markets()
     if not markets:
         raise HTTPException(status_code=404, detail="No markets found in local data file.")
-    return markets
+    return static_payloads.respond(request, static_payloads.get_payload("all-markets", markets))
 
-@router.get("/commodities")
-async def get_all_commodities_from_csv():
+@router.get("/commodities", response_model=List[str])
+async def get_all_commodities_from_csv(request: Request):
     commodities = location_service.get_all_commodities()
     if not commodities:
         raise HTTPException(status_code=404, detail="No commodities found in local data file.")
-    return commodities
\ No newline at end of file
+    return static_payloads.respond(request, static_payloads.get_payload("commodities", commodities))
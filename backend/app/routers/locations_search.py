@@ -1,52 +1,37 @@
-import json
 from fastapi import APIRouter, Query, HTTPException
-from pathlib import Path
+from app.services import location_search_service
 
 router = APIRouter(
     prefix="/api/locations",
     tags=["Locations"],
 )
 
-# Load the location data from the JSON file on startup
-locations_data = []
-try:
-    # This path navigation assumes this file is in backend/app/routers/
-    PROJECT_ROOT = Path(__file__).resolve().parents[3]
-    LOCATIONS_FILE = PROJECT_ROOT / 'backend' / 'app' / 'data' / 'india_locations.json'
-    with open(LOCATIONS_FILE, 'r', encoding='utf-8') as f:
-        locations_data = json.load(f)
-    print("✅ Indian locations data loaded successfully.")
-except Exception as e:
-    print(f"❌ ERROR: Could not load Indian locations data: {e}")
-
 
 @router.get("/search")
-def search_locations(q: str = Query(..., min_length=2, description="Search query for city")):
+def search_locations(
+    q: str = Query(..., min_length=2, description="Search query for city"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+):
     """
     Searches for cities in India based on a query string.
+    Results are ranked exact > prefix > substring > fuzzy match.
     """
-    if not locations_data:
+    index = location_search_service.get_index()
+    if index is None:
         raise HTTPException(status_code=500, detail="Location data is not available.")
+    return index.search(q, limit=limit)
+
 
-    search_term = q.lower()
-    results = []
-    
-    # Limit results to prevent sending too much data
-    limit = 10
-    
-    for state_data in locations_data:
-        state_name = state_data.get("state")
-        for city in state_data.get("cities", []):
-            if search_term in city.get("name", "").lower():
-                results.append({
-                    "name": city["name"],
-                    "state": state_name,
-                    "lat": city["lat"],
-                    "lon": city["lon"]
-                })
-            if len(results) >= limit:
-                break
-        if len(results) >= limit:
-            break
-            
-    return results
\ No newline at end of file
+@router.get("/nearest")
+def nearest_locations(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    k: int = Query(5, ge=1, le=50, description="Number of nearest cities to return"),
+):
+    """
+    Returns the k cities closest to a coordinate, with great-circle distance in km.
+    """
+    index = location_search_service.get_index()
+    if index is None:
+        raise HTTPException(status_code=500, detail="Location data is not available.")
+    return index.nearest(lat, lon, k=k)
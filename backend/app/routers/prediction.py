@@ -1,22 +1,66 @@
+from datetime import date
 from fastapi import APIRouter, Query, HTTPException
-from typing import List, Dict
-from app.services import prediction_service
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional
+from app.services import prediction_service, model_registry
 
 router = APIRouter(
     prefix="/api/predict",
     tags=["Prediction"],
 )
 
+# Each range is sized in the service; this only bounds the request body.
+MAX_BATCH_RANGES = 100
+
+class DateRange(BaseModel):
+    start: date
+    end: date
+
+class BatchPredictionRequest(BaseModel):
+    market: Optional[str] = None
+    commodity: Optional[str] = None
+    dates: List[date] = Field([], max_length=prediction_service.MAX_BATCH_DAYS)
+    ranges: List[DateRange] = Field([], max_length=MAX_BATCH_RANGES)
+
 @router.get("/price")
 def get_price_prediction(
-    periods: int = Query(7, description="Number of future periods (months) to forecast.", ge=1, le=24)
+    periods: int = Query(7, description="Number of future days to forecast.", ge=1, le=prediction_service.MAX_HORIZON_DAYS),
+    market: Optional[str] = Query(None, description="Market name, e.g. Ongole"),
+    commodity: Optional[str] = Query(None, description="Commodity name, e.g. Cotton"),
 ) -> List[Dict]:
     """
-    Provides a future price forecast for Cotton in the Ongole market
-    using the default pre-trained model.
+    Provides a future price forecast for a (market, commodity) series.
+    Without both parameters, the default model (Cotton in Ongole) is used.
     """
-    predictions = prediction_service.predict_future_prices(periods)
+    predictions = prediction_service.predict_future_prices(periods, market, commodity)
     if "error" in predictions[0]:
-        raise HTTPException(status_code=500, detail=predictions[0]["error"])
+        raise HTTPException(status_code=predictions[0].get("status_code", 500), detail=predictions[0]["error"])
     
-    return predictions
\ No newline at end of file
+    return predictions
+
+@router.post("/batch")
+def get_batch_prediction(request: BatchPredictionRequest) -> Dict:
+    """
+    Predicts prices for arbitrary target dates and inclusive date ranges of one
+    series in a single call, so a chart needs one round-trip instead of many.
+    """
+    for date_range in request.ranges:
+        if date_range.start > date_range.end:
+            raise HTTPException(status_code=400, detail=f"Range start {date_range.start} is after its end {date_range.end}.")
+
+    result = prediction_service.predict_batch(
+        request.dates,
+        [(r.start, r.end) for r in request.ranges],
+        request.market,
+        request.commodity,
+    )
+    if "error" in result:
+        raise HTTPException(status_code=result.get("status_code", 500), detail=result["error"])
+    return result
+
+@router.get("/series")
+def get_available_series() -> List[Dict]:
+    """
+    Lists the (market, commodity) series that have a trained model.
+    """
+    return model_registry.list_series()
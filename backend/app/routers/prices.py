@@ -1,8 +1,10 @@
 # backend/app/routers/prices.py
 
+from datetime import date
 from fastapi import APIRouter, Query, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.services.agmarknet_service import fetch_prices_from_agmarknet
+from app.services import analytics_service, nearby_price_service, prefetch_service, price_history_service
 
 router = APIRouter(
     prefix="/api/prices",
@@ -20,9 +22,48 @@ async def get_live_market_prices(
     if not all([state, district, market]):
         raise HTTPException(status_code=400, detail="State, district, and market parameters are required.")
 
+    prefetch_service.record_market(state, district, market)
     records = await fetch_prices_from_agmarknet(state, district, market)
 
     if not records:
         raise HTTPException(status_code=404, detail=f"No recent price data found for {market}.")
 
-    return records
\ No newline at end of file
+    return records
+
+
+@router.get("/best-nearby")
+def get_best_nearby_prices(
+    commodity: str = Query(..., min_length=1, description="Commodity, e.g. 'Tomato'"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the farmer"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the farmer"),
+    radius_km: float = Query(50.0, gt=0, le=2000, description="Search radius in kilometres"),
+    limit: int = Query(20, ge=1, le=200),
+) -> Dict[str, Any]:
+    """Markets within `radius_km`, best latest modal price first."""
+    result = nearby_price_service.get_index().best_nearby(commodity, lat, lon, radius_km, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No price data found for commodity '{commodity}'.")
+    return result
+
+
+@router.get("/history")
+def get_price_history(
+    market: str = Query(..., min_length=1, description="Market name, e.g. Guntur"),
+    commodity: str = Query(..., min_length=1, description="Commodity name, e.g. Tomato"),
+    start: Optional[date] = Query(None, alias="from", description="First arrival date to include"),
+    end: Optional[date] = Query(None, alias="to", description="Last arrival date to include"),
+    grain: str = Query("day", description="Resample to day, week or month"),
+    points: int = Query(price_history_service.DEFAULT_POINTS, ge=3, le=5000, description="Maximum points to return"),
+) -> Dict[str, Any]:
+    """
+    Average modal price (with the period's min and max) for a market and
+    commodity, resampled to `grain` and downsampled to at most `points` points.
+    """
+    if grain not in analytics_service.GRAINS:
+        raise HTTPException(status_code=400, detail=f"Unknown grain '{grain}'. Use one of: {', '.join(analytics_service.GRAINS)}.")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail=f"'from' ({start}) is after 'to' ({end}).")
+    result = price_history_service.get_index().history(market, commodity, grain, start, end, points)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No price history found for {commodity} in {market}.")
+    return result
@@ -1,12 +1,27 @@
 import httpx
 from fastapi import APIRouter, Query, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, List
+from app.services import prefetch_service, weather_service
 
 router = APIRouter(
     prefix="/api/weather",
     tags=["Weather"],
 )
 
-WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
+MAX_BATCH_LOCATIONS = 500
+
+class Coordinate(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+class BatchWeatherRequest(BaseModel):
+    locations: List[Coordinate] = Field(..., min_length=1, max_length=MAX_BATCH_LOCATIONS)
+
+def _upstream_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return HTTPException(status_code=exc.response.status_code, detail=f"Error response from weather service: {exc.response.text}")
+    return HTTPException(status_code=503, detail=f"An error occurred while requesting the weather service: {exc}")
 
 @router.get("/")
 async def get_weather_forecast(
@@ -18,21 +33,36 @@ async def get_weather_forecast(
 ):
     """
     Provides a 7-day weather forecast for a specific location.
+    Forecasts are cached per grid cell and refreshed in the background when stale.
+    """
+    prefetch_service.record_coordinate(lat, lon)
+    try:
+        return await weather_service.get_weather_forecast(lat, lon)
+    except (httpx.RequestError, httpx.HTTPStatusError) as exc:
+        raise _upstream_error(exc)
+
+
+@router.post("/batch")
+async def get_weather_forecasts(request: BatchWeatherRequest) -> Dict:
     """
-    # The 'params' dictionary now uses the lat and lon passed from the frontend.
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max",
-        "timezone": "auto"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(WEATHER_API_URL, params=params)
-            response.raise_for_status()
-            return response.json()
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=503, detail=f"An error occurred while requesting the weather service: {exc}")
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(status_code=exc.response.status_code, detail=f"Error response from weather service: {exc.response.text}")
\ No newline at end of file
+    7-day forecasts for many locations in one call, in request order.
+    Locations in the same grid cell share a forecast, and uncached cells are
+    fetched together with multi-coordinate upstream requests. A location whose
+    fetch failed carries an "error" instead of a "forecast".
+    """
+    for c in request.locations:
+        prefetch_service.record_coordinate(c.lat, c.lon)
+    forecasts = await weather_service.get_weather_forecasts([(c.lat, c.lon) for c in request.locations])
+    failures = [f for f in forecasts if isinstance(f, Exception)]
+    if len(failures) == len(forecasts):
+        raise _upstream_error(failures[0])
+
+    results = []
+    for coordinate, forecast in zip(request.locations, forecasts):
+        entry = {"lat": coordinate.lat, "lon": coordinate.lon}
+        if isinstance(forecast, Exception):
+            entry["error"] = _upstream_error(forecast).detail
+        else:
+            entry["forecast"] = forecast
+        results.append(entry)
+    return {"results": results}
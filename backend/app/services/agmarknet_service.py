@@ -1,19 +1,64 @@
 # backend/app/services/agmarknet_service.py
 
-from typing import List, Dict, Any
+import asyncio
+import logging
+import os
+from typing import List, Dict, Any, Optional
 import httpx
 from datetime import date, timedelta
 
+from app.services import http_clients, metrics
+from app.services.cache import TTLCache, SingleFlight
+
 API_KEY = "your genrated key from the markreted website"
 API_URL = "....from the market website url"
 
-async def fetch_prices_from_agmarknet(
-    state: str, district: str, market: str
-) -> List[Dict[str, Any]]:
+# Look back up to 7 days to find the most recent data.
+LOOKBACK_DAYS = 7
+CACHE_TTL_SECONDS = float(os.getenv("AGMARKNET_CACHE_TTL", "900"))
+# Markets with nothing in the look-back window (or a failed look-back) are
+# remembered for a shorter time, so repeated requests don't re-probe every day.
+EMPTY_CACHE_TTL_SECONDS = float(os.getenv("AGMARKNET_EMPTY_CACHE_TTL", "120"))
+
+# Keyed by (state, district, market, date) so the cache rolls over with the day.
+_price_cache = TTLCache(ttl=CACHE_TTL_SECONDS, maxsize=2048, shared_namespace="cache:agmarknet")
+_inflight = SingleFlight()
+metrics.register_cache("agmarknet_prices", _price_cache)
+
+logger = logging.getLogger(__name__)
+
+
+def market_key(state: str, district: str, market: str) -> tuple:
+    """Case- and whitespace-insensitive identity of a market, as used in cache keys."""
+    return (state.strip().lower(), district.strip().lower(), market.strip().lower())
+
+
+def _cache_key(state: str, district: str, market: str, day: date) -> tuple:
+    return (*market_key(state, district, market), day.isoformat())
+
+
+async def _fetch_day(client: httpx.AsyncClient, params: Dict[str, str], check_date: date) -> List[Dict[str, Any]]:
+    day_params = {**params, "filters[arrival_date]": check_date.strftime("%d-%b-%Y")}
+    with metrics.track_upstream("agmarknet") as call:
+        response = await client.get(API_URL, params=day_params)
+        call.status = response.status_code
+        response.raise_for_status()
+    data = response.json()
+    return (data or {}).get("records") or []
+
+
+def _consume_result(task: asyncio.Task) -> None:
+    # Probes we stop waiting for may still fail; retrieve the exception so it isn't logged as unhandled.
+    if not task.cancelled():
+        task.exception()
+
+
+async def _lookback(state: str, district: str, market: str, today: date) -> List[Dict[str, Any]]:
     """
-    Fetches live price data from the official AGMARKNET API for a specific location.
+    Probes every day of the look-back window concurrently and returns the most
+    recent non-empty day. Older probes still running are cancelled as soon as a
+    newer day answers with data.
     """
-    today = date.today()
     params = {
         "api-key": API_KEY,
         "format": "json",
@@ -23,30 +68,58 @@ async def fetch_prices_from_agmarknet(
         "filters[district]": district,
         "filters[market]": market,
     }
+    client = http_clients.get_client("agmarknet", timeout=10.0)
+    check_dates = [today - timedelta(days=i) for i in range(LOOKBACK_DAYS)]
+    tasks = [asyncio.create_task(_fetch_day(client, params, check_date)) for check_date in check_dates]
+    for task in tasks:
+        task.add_done_callback(_consume_result)
 
-    async with httpx.AsyncClient() as client:
-        # --- THIS IS THE LINE TO CHANGE ---
-        # Look back up to 7 days to find the most recent data.
-        for i in range(7):  # Changed from 3 to 7
-            # ---------------------------------
-            check_date = today - timedelta(days=i)
-            params["filters[arrival_date]"] = check_date.strftime("%d-%b-%Y")
-            
+    try:
+        for check_date, task in zip(check_dates, tasks):
             try:
-                response = await client.get(API_URL, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-
-                if data and data.get("records"):
-                    print(f"Successfully fetched {len(data['records'])} records for {market} on {check_date}")
-                    return data["records"]
-                    
+                records = await task
             except httpx.RequestError as exc:
-                print(f"An error occurred while requesting {exc.request.url!r}.")
+                logger.warning("Agmarknet request failed: %s", exc, extra={"market": market})
                 return []
             except httpx.HTTPStatusError as exc:
-                print(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
+                logger.warning("Agmarknet returned %d", exc.response.status_code, extra={"market": market})
                 return []
 
-    print(f"No recent data found for {market} in the last 7 days.")
+            if records:
+                logger.info("Fetched Agmarknet prices", extra={"market": market, "day": check_date.isoformat(), "records": len(records)})
+                return records
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    logger.info("No recent Agmarknet prices", extra={"market": market, "lookback_days": LOOKBACK_DAYS})
     return []
+
+
+async def fetch_prices_from_agmarknet(
+    state: str, district: str, market: str
+) -> List[Dict[str, Any]]:
+    """
+    Fetches live price data from the official AGMARKNET API for a specific location.
+    Results are cached per (state, district, market, date), and identical
+    concurrent requests share a single upstream look-back.
+    """
+    key = _cache_key(state, district, market, date.today())
+    cached: Optional[List[Dict[str, Any]]] = await _price_cache.get_async(key)
+    if cached is not None:
+        return cached
+    return await refresh_prices(state, district, market)
+
+
+async def refresh_prices(state: str, district: str, market: str) -> List[Dict[str, Any]]:
+    """Runs the look-back regardless of the cache and stores the result (briefly, if empty)."""
+    today = date.today()
+    key = _cache_key(state, district, market, today)
+    records = await _inflight.run(key, lambda: _lookback(state, district, market, today))
+    _price_cache.set(key, records, ttl=None if records else EMPTY_CACHE_TTL_SECONDS)
+    return records
+
+
+async def cache_expires_in(state: str, district: str, market: str) -> Optional[float]:
+    """Seconds until today's cached prices for a market expire; None if not cached."""
+    return await _price_cache.expires_in_async(_cache_key(state, district, market, date.today()))
@@ -0,0 +1,332 @@
+# backend/app/services/alert_service.py
+"""
+Alert rules evaluated on IoT readings as they are ingested.
+
+Rules live in ``alert_rules.json`` (IOT_ALERT_RULES overrides the path) and are
+reloaded when the file changes. Each rule watches one sensor field:
+
+* ``threshold``: the reading compared with ``value`` (``op`` is <, <=, > or >=),
+* ``rate``: change per minute against an earlier reading of the field (at least
+  IOT_RATE_MIN_INTERVAL seconds old, default 30),
+* ``ewma``: distance from the device's exponentially weighted mean, in
+  exponentially weighted standard deviations (``alpha``, ``k``; checked after
+  ``min_samples`` readings).
+
+A rule applies to every device unless it lists ``devices`` or ``crops`` (the
+crop a device last reported). Alerts are edge-triggered: a rule fires when its
+condition becomes true for a device and re-arms once it clears.
+
+Rules are compiled into per-rule arrays, and the per-device state (previous
+value and time per field, EWMA mean/variance and armed flag per rule) is a row
+of fixed-size arrays, updated in O(1) per reading. A batch is checked against
+all rules at once as a (readings x rules) matrix. Fired alerts are published on
+``alert_hub`` (topic: device id) and kept in a short in-memory log. State is
+per process and, like the sensor store, kept for at most IOT_MAX_DEVICES
+devices: a new device takes over the row of the one heard from least recently.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import metrics
+from app.services.pubsub import alert_hub
+from app.services.sensor_store import MAX_DEVICES, SENSOR_FIELDS
+
+RULES_FILE_PATH = os.getenv("IOT_ALERT_RULES", os.path.join(os.path.dirname(__file__), '..', 'data', 'alert_rules.json'))
+# How often the rules file is checked for changes, in seconds.
+RULES_CHECK_SECONDS = 1.0
+RECENT_ALERTS = int(os.getenv("IOT_RECENT_ALERTS", "500"))
+# Rates are measured over at least this many seconds, so jitter between
+# back-to-back readings doesn't read as a steep change.
+RATE_MIN_INTERVAL_SECONDS = float(os.getenv("IOT_RATE_MIN_INTERVAL", "30"))
+
+KINDS = ("threshold", "rate", "ewma")
+OPERATORS = {"<": (-1.0, False), "<=": (-1.0, True), ">": (1.0, False), ">=": (1.0, True)}
+
+logger = logging.getLogger(__name__)
+
+alerts_fired = metrics.Counter("iot_alerts_total", "IoT alerts fired by rule and severity.", ("rule", "severity"))
+
+
+# --- Rules ---
+def _normalize_rule(rule: Dict) -> Dict:
+    """Validates one rule from the config and fills in its defaults. Raises ValueError."""
+    rule_id = rule.get("id")
+    if not rule_id:
+        raise ValueError(f"Alert rule without an id: {rule}")
+    kind = rule.get("kind")
+    if kind not in KINDS:
+        raise ValueError(f"Rule '{rule_id}': kind must be one of {', '.join(KINDS)}")
+    if rule.get("field") not in SENSOR_FIELDS:
+        raise ValueError(f"Rule '{rule_id}': field must be one of {', '.join(SENSOR_FIELDS)}")
+
+    normalized = {
+        "id": str(rule_id),
+        "kind": kind,
+        "field": rule["field"],
+        "severity": rule.get("severity", "warning"),
+        "message": rule.get("message", ""),
+        "devices": sorted(rule["devices"]) if rule.get("devices") else None,
+        "crops": sorted(c.strip().lower() for c in rule["crops"]) if rule.get("crops") else None,
+    }
+    if kind == "ewma":
+        alpha = float(rule.get("alpha", 0.1))
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Rule '{rule_id}': alpha must be in (0, 1]")
+        normalized.update(op=">", value=float(rule.get("k", 3.0)), alpha=alpha, min_samples=int(rule.get("min_samples", 10)))
+    else:
+        if rule.get("op") not in OPERATORS:
+            raise ValueError(f"Rule '{rule_id}': op must be one of {', '.join(OPERATORS)}")
+        if "value" not in rule:
+            raise ValueError(f"Rule '{rule_id}': value is required")
+        normalized.update(op=rule["op"], value=float(rule["value"]), alpha=0.0, min_samples=0)
+    return normalized
+
+
+class RuleSet:
+    """Rules compiled to arrays with one column per rule."""
+
+    def __init__(self, rules: Sequence[Dict]):
+        self.rules = [_normalize_rule(rule) for rule in rules]
+        ids = [rule["id"] for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Alert rule ids must be unique")
+        self.field = np.array([SENSOR_FIELDS.index(r["field"]) for r in self.rules], dtype=np.int64)
+        self.is_rate = np.array([r["kind"] == "rate" for r in self.rules], dtype=bool)
+        self.is_ewma = np.array([r["kind"] == "ewma" for r in self.rules], dtype=bool)
+        self.sign = np.array([OPERATORS[r["op"]][0] for r in self.rules])
+        self.inclusive = np.array([OPERATORS[r["op"]][1] for r in self.rules], dtype=bool)
+        self.value = np.array([r["value"] for r in self.rules])
+        self.alpha = np.array([r["alpha"] for r in self.rules])
+        self.min_samples = np.array([r["min_samples"] for r in self.rules], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def applies(self, device_id: str, crop: Optional[str]) -> np.ndarray:
+        """Which rules cover a device, given the crop it reported."""
+        crop = crop.strip().lower() if crop else None
+        return np.array([
+            (rule["devices"] is None or device_id in rule["devices"])
+            and (rule["crops"] is None or crop in rule["crops"])
+            for rule in self.rules
+        ], dtype=bool)
+
+
+def load_rules(path: str = RULES_FILE_PATH) -> RuleSet:
+    """Reads and compiles the rules file. Raises OSError or ValueError."""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return RuleSet(config.get("rules", []) if isinstance(config, dict) else config)
+
+
+# --- Engine ---
+class AlertEngine:
+    # Initial value of each per-device state array
+    FILLS = {"last_value": np.nan, "last_time": np.nan, "applies": False, "active": False,
+             "ewma_mean": 0.0, "ewma_var": 0.0, "ewma_count": 0}
+
+    def __init__(self, rules: RuleSet, capacity: int = 64, max_devices: int = MAX_DEVICES):
+        self.max_devices = max_devices
+        capacity = min(capacity, max_devices)
+        # device id -> row, least recently heard from first
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self.device_ids: List[str] = []
+        self.crops: List[Optional[str]] = []
+        # Per device and field: the reference reading for rate rules.
+        self.last_value = np.full((capacity, len(SENSOR_FIELDS)), np.nan)
+        self.last_time = np.full((capacity, len(SENSOR_FIELDS)), np.nan)
+        self.set_rules(rules)
+
+    def set_rules(self, rules: RuleSet) -> None:
+        """Swaps in new rules. Per-rule state (EWMA statistics, armed flags) starts over."""
+        self.rules = rules
+        shape = (len(self.last_value), len(rules))
+        self.applies = np.zeros(shape, dtype=bool)
+        self.active = np.zeros(shape, dtype=bool)
+        self.ewma_mean = np.zeros(shape)
+        self.ewma_var = np.zeros(shape)
+        self.ewma_count = np.zeros(shape, dtype=np.int64)
+        for row, (device_id, crop) in enumerate(zip(self.device_ids, self.crops)):
+            self.applies[row] = rules.applies(device_id, crop)
+
+    def _grow(self) -> None:
+        capacity = min(2 * len(self.last_value), self.max_devices)
+        for name, fill in self.FILLS.items():
+            old = getattr(self, name)
+            new = np.full((capacity, old.shape[1]), fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _row(self, device_id: str, crop: Optional[str]) -> int:
+        row = self._rows.get(device_id)
+        if row is None:
+            if len(self._rows) >= self.max_devices:
+                _, row = self._rows.popitem(last=False)
+                for name, fill in self.FILLS.items():
+                    getattr(self, name)[row] = fill
+                self.device_ids[row], self.crops[row] = device_id, crop
+            else:
+                row = len(self.device_ids)
+                if row == len(self.last_value):
+                    self._grow()
+                self.device_ids.append(device_id)
+                self.crops.append(crop)
+            self._rows[device_id] = row
+            self.applies[row] = self.rules.applies(device_id, crop)
+            return row
+        self._rows.move_to_end(device_id)
+        if crop and crop != self.crops[row]:
+            self.crops[row] = crop
+            self.applies[row] = self.rules.applies(device_id, crop)
+        return row
+
+    def evaluate(self, readings: Sequence[Dict[str, Any]]) -> List[Dict]:
+        """
+        Checks a batch of readings (dicts with device_id, the sensor fields and
+        optionally crop and timestamp) and returns the alerts they fire.
+        """
+        if not readings or not len(self.rules):
+            return []
+        now = time.time()
+        rows = np.empty(len(readings), dtype=np.int64)
+        times = np.empty(len(readings))
+        waves = np.empty(len(readings), dtype=np.int64)
+        seen: Dict[int, int] = {}
+        for i, reading in enumerate(readings):
+            rows[i] = self._row(reading["device_id"], reading.get("crop"))
+            times[i] = reading.get("timestamp") or now
+            # A device's readings must be applied in order, so each one goes in a later wave.
+            waves[i] = seen.get(rows[i], 0)
+            seen[rows[i]] = waves[i] + 1
+        values = np.array(
+            [[np.nan if reading.get(f) is None else reading[f] for f in SENSOR_FIELDS] for reading in readings],
+            dtype=np.float64,
+        )
+
+        alerts: List[Dict] = []
+        for wave in range(int(waves.max()) + 1):
+            selected = np.flatnonzero(waves == wave)
+            alerts += self._evaluate_wave(selected, rows[selected], times[selected], values[selected], readings)
+        return alerts
+
+    def _evaluate_wave(self, selected, rows, times, values, readings) -> List[Dict]:
+        """One reading per device: every (reading, rule) pair is checked at once."""
+        rules = self.rules
+        observed = values[:, rules.field]
+        present = ~np.isnan(observed)
+        applies = self.applies[rows]
+
+        previous = self.last_value[rows][:, rules.field]
+        elapsed = times[:, None] - self.last_time[rows][:, rules.field]
+        mean, var, count = self.ewma_mean[rows], self.ewma_var[rows], self.ewma_count[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(elapsed >= RATE_MIN_INTERVAL_SECONDS, (observed - previous) * 60.0 / elapsed, np.nan)
+            deviation = np.where(var > 0, np.abs(observed - mean) / np.sqrt(var), np.nan)
+        metric = np.where(rules.is_rate, rate, np.where(rules.is_ewma, deviation, observed))
+
+        checkable = present & applies & ~np.isnan(metric) & (count >= rules.min_samples)
+        condition = checkable & (
+            (rules.sign * metric > rules.sign * rules.value) | (rules.inclusive & (metric == rules.value))
+        )
+        fired = condition & ~self.active[rows]
+        self.active[rows] = np.where(checkable, condition, self.active[rows])
+
+        # EWMA statistics; the first reading seeds the mean.
+        update = present & applies & rules.is_ewma
+        diff = observed - mean
+        first = count == 0
+        self.ewma_mean[rows] = np.where(update, np.where(first, observed, mean + rules.alpha * diff), mean)
+        self.ewma_var[rows] = np.where(update & ~first, (1 - rules.alpha) * (var + rules.alpha * diff * diff), var)
+        self.ewma_count[rows] = count + update
+
+        # The reference reading moves on only once it is old enough to measure a rate against.
+        last_time = self.last_time[rows]
+        refresh = ~np.isnan(values) & ~(times[:, None] - last_time < RATE_MIN_INTERVAL_SECONDS)
+        self.last_value[rows] = np.where(refresh, values, self.last_value[rows])
+        self.last_time[rows] = np.where(refresh, times[:, None], last_time)
+
+        alerts = []
+        for i, r in zip(*np.nonzero(fired)):
+            rule = rules.rules[r]
+            reading = readings[selected[i]]
+            alert = {
+                "device_id": reading["device_id"],
+                "crop": self.crops[rows[i]],
+                "rule_id": rule["id"],
+                "kind": rule["kind"],
+                "severity": rule["severity"],
+                "field": rule["field"],
+                "reading": float(observed[i, r]),
+                "threshold": rule["value"],
+                "message": rule["message"],
+                "timestamp": float(times[i]),
+            }
+            if rule["kind"] != "threshold":
+                alert["metric"] = round(float(metric[i, r]), 4)
+            alerts.append(alert)
+        return alerts
+
+
+_engine: Optional[AlertEngine] = None
+_rules_signature: Optional[Tuple[int, int]] = None
+_rules_checked = 0.0
+_recent: Deque[Dict] = deque(maxlen=RECENT_ALERTS)
+
+
+def _signature() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(RULES_FILE_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_engine() -> AlertEngine:
+    """The engine, (re)loading the rules when the file has changed. A broken file keeps the previous rules."""
+    global _engine, _rules_signature, _rules_checked
+    now = time.monotonic()
+    if _engine is not None and now - _rules_checked < RULES_CHECK_SECONDS:
+        return _engine
+    _rules_checked = now
+    signature = _signature()
+    if _engine is not None and signature == _rules_signature:
+        return _engine
+    try:
+        rules = load_rules() if signature is not None else RuleSet([])
+    except (OSError, ValueError) as e:
+        logger.error("Could not load alert rules: %s", e)
+        rules = _engine.rules if _engine is not None else RuleSet([])
+    else:
+        logger.info("Loaded %d alert rules", len(rules))
+    if _engine is None:
+        _engine = AlertEngine(rules)
+    elif rules is not _engine.rules:
+        _engine.set_rules(rules)
+    _rules_signature = signature
+    return _engine
+
+
+def process_readings(readings: Sequence[Dict[str, Any]]) -> List[Dict]:
+    """Evaluates ingested readings, then records and publishes the alerts they fire."""
+    alerts = get_engine().evaluate(readings)
+    for alert in alerts:
+        _recent.append(alert)
+        alerts_fired.inc(alert["rule_id"], alert["severity"])
+        alert_hub.publish(alert["device_id"], alert)
+    return alerts
+
+
+def recent_alerts(device_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    """The most recent alerts, newest first."""
+    matching = (a for a in reversed(_recent) if device_id is None or a["device_id"] == device_id)
+    return [alert for _, alert in zip(range(limit), matching)]
+
+
+def list_rules() -> List[Dict]:
+    return get_engine().rules.rules
@@ -0,0 +1,239 @@
+# backend/app/services/analytics_service.py
+"""
+Precomputed price rollup cube over the market history.
+
+At data load the raw rows are reduced once per time grain (day, week, month)
+into cells keyed by (state, district, market, commodity, variety, period) with
+count, min(min_price), max(max_price) and sum(modal_price). Dimension values are
+stored as int32 ids into shared vocabularies and measures as compact arrays.
+
+Queries filter the cube cells and re-aggregate them to the requested group-by
+with grouped NumPy reductions; the raw rows are never touched again. Ingested
+parts are reduced on their own and merged into the existing cells.
+"""
+import copy
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services import data_store
+
+DIMENSIONS = ("state", "district", "market", "commodity", "variety")
+GRAINS = ("day", "week", "month")
+
+
+
+def period_index(days: np.ndarray, grain: str) -> np.ndarray:
+    """Maps datetime64[D] values to an integer period number for a grain."""
+    day_numbers = days.astype("datetime64[D]").astype(np.int64)
+    if grain == "day":
+        return day_numbers
+    if grain == "week":
+        # 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday.
+        return (day_numbers + 3) // 7
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def period_start(periods: np.ndarray, grain: str) -> np.ndarray:
+    """Inverse of period_index: the first day of each period."""
+    periods = np.asarray(periods, dtype=np.int64)
+    if grain == "day":
+        return periods.astype("datetime64[D]")
+    if grain == "week":
+        return (periods * 7 - 3).astype("datetime64[D]")
+    return periods.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _group_reduce(keys: List[np.ndarray], count, min_price, max_price, modal_sum):
+    """
+    Groups rows by the given key columns and reduces the measures.
+    Returns (key columns of each group, count, min, max, modal_sum), sorted by key.
+    """
+    if not len(count):
+        return [k[:0] for k in keys], count[:0], min_price[:0], max_price[:0], modal_sum[:0]
+    order = np.lexsort(keys[::-1]) if keys else np.arange(len(count))
+    sorted_keys = [k[order] for k in keys]
+    changed = np.zeros(len(order), dtype=bool)
+    changed[0] = True
+    for k in sorted_keys:
+        changed[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(changed)
+    return (
+        [k[starts] for k in sorted_keys],
+        np.add.reduceat(count[order], starts),
+        np.minimum.reduceat(min_price[order], starts),
+        np.maximum.reduceat(max_price[order], starts),
+        np.add.reduceat(modal_sum[order], starts),
+    )
+
+
+def _empty_cells() -> Dict[str, np.ndarray]:
+    empty_i = np.zeros(0, dtype=np.int32)
+    empty_f = np.zeros(0, dtype=np.float32)
+    return {**{dim: empty_i for dim in DIMENSIONS}, "period": empty_i, "count": empty_i,
+            "min_price": empty_f, "max_price": empty_f, "modal_sum": np.zeros(0)}
+
+
+def _reduce_cells(keys: List[np.ndarray], count, min_price, max_price, modal_sum) -> Dict[str, np.ndarray]:
+    group_keys, count, min_price, max_price, modal_sum = _group_reduce(keys, count, min_price, max_price, modal_sum)
+    cells = {dim: k.astype(np.int32) for dim, k in zip(DIMENSIONS, group_keys)}
+    cells["period"] = group_keys[-1].astype(np.int32)
+    cells["count"] = count.astype(np.int32)
+    cells["min_price"] = min_price.astype(np.float32)
+    cells["max_price"] = max_price.astype(np.float32)
+    cells["modal_sum"] = modal_sum
+    return cells
+
+
+class PriceCube:
+    def __init__(self, tables: Sequence[data_store.ColumnarTable] = ()):
+        self.vocab: Dict[str, List[str]] = {dim: [] for dim in DIMENSIONS}
+        self._ids: Dict[str, Dict[str, int]] = {dim: {} for dim in DIMENSIONS}
+        self.cells: Dict[str, Dict[str, np.ndarray]] = {grain: _empty_cells() for grain in GRAINS}
+        self.num_rows = 0
+        self.min_day: Optional[np.datetime64] = None
+        self.max_day: Optional[np.datetime64] = None
+        self.add_tables(tables)
+
+    def add_tables(self, tables: Sequence[data_store.ColumnarTable]) -> None:
+        """Reduces the rows of `tables` and merges them into the existing cells."""
+        columns = [self._table_columns(table) for table in tables if not table.empty]
+        columns = [c for c in columns if c is not None and len(c["day"])]
+        if not columns:
+            return
+        data = {key: np.concatenate([c[key] for c in columns]) for key in columns[0]}
+
+        self.num_rows += len(data["day"])
+        lo, hi = data["day"].min(), data["day"].max()
+        self.min_day = lo if self.min_day is None else min(self.min_day, lo)
+        self.max_day = hi if self.max_day is None else max(self.max_day, hi)
+
+        for grain in GRAINS:
+            new_cells = self._build_grain(data, grain)
+            old_cells = self.cells[grain]
+            if len(old_cells["count"]):
+                # Cells are additive (count, sum) or idempotent (min, max), so
+                # merging is one more grouped reduction over old + new cells.
+                both = {key: np.concatenate([old_cells[key], new_cells[key]]) for key in new_cells}
+                new_cells = _reduce_cells(
+                    [both[dim] for dim in DIMENSIONS] + [both["period"]],
+                    both["count"].astype(np.int64), both["min_price"], both["max_price"], both["modal_sum"],
+                )
+            self.cells[grain] = new_cells
+
+    def _global_ids(self, dim: str, table: data_store.ColumnarTable) -> np.ndarray:
+        """Remaps a table's dictionary codes onto the cube's shared vocabulary (missing -> -1)."""
+        ids = self._ids[dim]
+        vocab = self.vocab[dim]
+        mapping = np.empty(len(table.categories(dim)) + 1, dtype=np.int32)
+        for code, value in enumerate(table.categories(dim)):
+            if value not in ids:
+                ids[value] = len(vocab)
+                vocab.append(value)
+            mapping[code] = ids[value]
+        mapping[-1] = -1
+        return mapping[table.codes(dim)]
+
+    def _table_columns(self, table: data_store.ColumnarTable) -> Optional[Dict[str, np.ndarray]]:
+        required = DIMENSIONS + ("arrival_date", "min_price", "max_price", "modal_price")
+        if any(col not in table for col in required):
+            return None
+        days = np.asarray(table.column("arrival_date"))
+        valid = ~np.isnat(days)
+        data = {dim: self._global_ids(dim, table)[valid] for dim in DIMENSIONS}
+        data["day"] = days[valid]
+        for col in ("min_price", "max_price", "modal_price"):
+            data[col] = np.asarray(table.column(col), dtype=np.float64)[valid]
+        return data
+
+    def _build_grain(self, data: Dict[str, np.ndarray], grain: str) -> Dict[str, np.ndarray]:
+        modal = data["modal_price"]
+        has_modal = ~np.isnan(modal)
+        return _reduce_cells(
+            [data[dim] for dim in DIMENSIONS] + [period_index(data["day"], grain)],
+            has_modal.astype(np.int64),
+            np.where(np.isnan(data["min_price"]), np.inf, data["min_price"]),
+            np.where(np.isnan(data["max_price"]), -np.inf, data["max_price"]),
+            np.where(has_modal, modal, 0.0),
+        )
+
+    def lookup_ids(self, dim: str, value: str) -> np.ndarray:
+        """Case-insensitive match of a dimension value to its vocabulary ids."""
+        folded = value.strip().casefold()
+        return np.array([i for i, v in enumerate(self.vocab[dim]) if v.casefold() == folded], dtype=np.int32)
+
+    def query(
+        self,
+        grain: str = "month",
+        group_by: Sequence[str] = ("commodity",),
+        filters: Optional[Dict[str, str]] = None,
+        start: Optional[np.datetime64] = None,
+        end: Optional[np.datetime64] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Dict:
+        cells = self.cells[grain]
+        mask = np.ones(len(cells["count"]), dtype=bool)
+        for dim, value in (filters or {}).items():
+            mask &= np.isin(cells[dim], self.lookup_ids(dim, value))
+        if start is not None:
+            mask &= cells["period"] >= period_index(np.array([start], dtype="datetime64[D]"), grain)[0]
+        if end is not None:
+            mask &= cells["period"] <= period_index(np.array([end], dtype="datetime64[D]"), grain)[0]
+
+        keys = [cells[col][mask] for col in group_by]
+        group_keys, count, min_price, max_price, modal_sum = _group_reduce(
+            keys, cells["count"][mask].astype(np.int64), cells["min_price"][mask],
+            cells["max_price"][mask], cells["modal_sum"][mask],
+        )
+
+        total = len(count)
+        page = slice(offset, offset + limit)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            modal_mean = modal_sum[page] / count[page]
+
+        columns = {}
+        for col, values in zip(group_by, group_keys):
+            values = values[page]
+            if col == "period":
+                columns[col] = [str(day) for day in period_start(values, grain)]
+            else:
+                vocab = self.vocab[col] + [None]
+                columns[col] = [vocab[i] for i in values.tolist()]
+
+        def clean(values):
+            return [None if not np.isfinite(v) else round(float(v), 2) for v in values]
+
+        rows = []
+        measures = zip(count[page].tolist(), clean(min_price[page]), clean(max_price[page]), clean(modal_mean))
+        for i, (n, lo, hi, modal) in enumerate(measures):
+            row = {col: columns[col][i] for col in group_by}
+            row.update({"count": n, "min_price": lo, "max_price": hi, "modal_price": modal})
+            rows.append(row)
+
+        return {"grain": grain, "group_by": list(group_by), "total": total, "limit": limit, "offset": offset, "rows": rows}
+
+
+def _merge_parts(cube: PriceCube, parts: List[data_store.ColumnarTable]) -> PriceCube:
+    # Merge into a copy so in-flight queries keep a consistent cube.
+    cube = copy.copy(cube)
+    cube.vocab = {dim: list(values) for dim, values in cube.vocab.items()}
+    cube._ids = {dim: dict(ids) for dim, ids in cube._ids.items()}
+    cube.cells = dict(cube.cells)
+    cube.add_tables(parts)
+    return cube
+
+
+_cube = data_store.DerivedIndex(("training",), lambda tables, parts: PriceCube([*tables, *parts]), _merge_parts)
+
+
+def get_cube() -> PriceCube:
+    """
+    Returns the cube, rebuilding it when the training table changes and merging
+    any newly ingested parts into it.
+    """
+    return _cube.get()
+
+
+def is_loaded() -> bool:
+    return _cube.loaded
@@ -0,0 +1,260 @@
+# backend/app/services/cache.py
+"""
+Small in-process caching primitives shared by the services.
+
+* ``TTLCache``: a dict with per-entry expiry and LRU eviction once ``maxsize`` is reached.
+  With ``stale_ttl`` set, expired entries are kept for that much longer and can
+  still be served while a refresh runs (stale-while-revalidate).
+* ``SingleFlight``: coalesces concurrent calls for the same key into one awaitable,
+  so N simultaneous callers trigger a single upstream fetch.
+* ``get_or_fetch``: ties the two together.
+
+A TTLCache created with ``shared_namespace`` also writes its entries through to
+the state backend and falls back to it on a local miss, so with
+STATE_BACKEND=sqlite one worker's upstream fetch serves the others. A stale
+local entry is only served after the backend has been checked for a fresher one.
+Values must then be JSON-serializable. With the default memory backend nothing
+changes.
+
+Coroutines use the ``*_async`` lookups, which run the backend read in a worker
+thread instead of on the event loop. Writes never block: the SQLite backend
+queues them for its flusher thread.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from app.services import state_backend
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 1024, stale_ttl: float = 0.0, shared_namespace: Optional[str] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.shared_namespace = shared_namespace
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _shared_backend(self):
+        if self.shared_namespace is None:
+            return None
+        backend = state_backend.get_backend()
+        return backend if backend.shared else None
+
+    def _local(self, key: Hashable, now: float) -> Optional[tuple]:
+        """This process's entry for `key` if it is inside its stale window."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] <= now:
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def _backend_to_check(self, entry: Optional[tuple], now: float):
+        # The shared backend is read on a local miss, and before a stale local copy
+        # is served, since another worker may already have refreshed the key.
+        if entry is not None and entry[1] > now:
+            return None
+        return self._shared_backend()
+
+    def _merge_shared(self, key: Hashable, entry: Optional[tuple], item: Optional[dict], now: float) -> Optional[tuple]:
+        """The fresher of the local entry and the shared `item`, keeping the shared one locally if it wins."""
+        if item is None:
+            return entry
+        # Shared entries carry wall-clock deadlines; convert them to this process's monotonic clock.
+        offset = now - time.time()
+        shared = (item["value"], item["expires_at"] + offset, item["stale_until"] + offset)
+        if shared[2] <= now or (entry is not None and shared[1] <= entry[1]):
+            return entry
+        with self._lock:
+            self._store(key, shared)
+        return shared
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[tuple]:
+        """The freshest entry for `key` inside its stale window, here or in the shared backend."""
+        entry = self._local(key, now)
+        backend = self._backend_to_check(entry, now)
+        if backend is None:
+            return entry
+        return self._merge_shared(key, entry, backend.get(self.shared_namespace, json.dumps(key, default=str)), now)
+
+    async def _lookup_async(self, key: Hashable, now: float) -> Optional[tuple]:
+        """`_lookup` with the backend read (an SQLite query) run in a worker thread."""
+        entry = self._local(key, now)
+        backend = self._backend_to_check(entry, now)
+        if backend is None:
+            return entry
+        item = await asyncio.to_thread(backend.get, self.shared_namespace, json.dumps(key, default=str))
+        return self._merge_shared(key, entry, item, now)
+
+    def _store(self, key: Hashable, entry: tuple) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _value(self, entry: Optional[tuple], now: float, default: Any) -> Any:
+        if entry is None or entry[1] <= now:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[0]
+
+    def _value_and_freshness(self, entry: Optional[tuple], now: float) -> Optional[Tuple[Any, bool]]:
+        if entry is None:
+            self.misses += 1
+            return None
+        fresh = entry[1] > now
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry[0], fresh
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        return self._value(self._lookup(key, now), now, default)
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        return self._value(await self._lookup_async(key, now), now, default)
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """Returns (value, is_fresh) for entries still inside their stale window, else None."""
+        now = time.monotonic()
+        return self._value_and_freshness(self._lookup(key, now), now)
+
+    async def get_entry_async(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        now = time.monotonic()
+        return self._value_and_freshness(await self._lookup_async(key, now), now)
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds until `key` stops being fresh (negative while stale), or None if
+        it isn't cached. Not counted as a hit or miss.
+        """
+        now = time.monotonic()
+        entry = self._lookup(key, now)
+        return None if entry is None else entry[1] - now
+
+    async def expires_in_async(self, key: Hashable) -> Optional[float]:
+        now = time.monotonic()
+        entry = await self._lookup_async(key, now)
+        return None if entry is None else entry[1] - now
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._store(key, (value, expires_at, expires_at + self.stale_ttl))
+        backend = self._shared_backend()
+        if backend is not None:
+            wall_expires_at = time.time() + ttl
+            backend.set(
+                self.shared_namespace,
+                json.dumps(key, default=str),
+                {"value": value, "expires_at": wall_expires_at, "stale_until": wall_expires_at + self.stale_ttl},
+                expires_at=wall_expires_at + self.stale_ttl,
+            )
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `fn()` unless a call for `key` is already in flight, in which case the
+        caller waits for that result instead. The shared task is shielded, so one
+        caller disconnecting does not cancel the fetch for everyone else.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def lead(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        For callers that produce the result themselves (e.g. while streaming it).
+        Returns a future the caller must resolve if it is now the leader for `key`,
+        or None if another call is already in flight (use `run`/`wait` instead).
+        """
+        if key in self._inflight:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    def wait(self, key: Hashable) -> Awaitable[Any]:
+        """
+        An awaitable for the in-flight call for `key`, which must be in flight.
+        Taken eagerly, so it stays valid after the call finishes.
+        """
+        return asyncio.shield(self._inflight[key])
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def get_or_fetch(
+    cache: TTLCache,
+    flight: SingleFlight,
+    key: Hashable,
+    fetch: Callable[[], Awaitable[Any]],
+    should_cache: Callable[[Any], bool] = lambda value: True,
+) -> Any:
+    """
+    Serves `key` from `cache`, fetching through `flight` on a miss. A stale entry
+    is returned immediately and refreshed in the background, so hot keys never
+    wait on the upstream. A failed background refresh keeps the stale value.
+    """
+    async def refresh():
+        value = await fetch()
+        if should_cache(value):
+            cache.set(key, value)
+        return value
+
+    entry = await cache.get_entry_async(key)
+    if entry is None:
+        return await flight.run(key, refresh)
+
+    value, fresh = entry
+    if not fresh and key not in flight:
+        run_in_background(flight.run(key, refresh))
+    return value
+
+
+def run_in_background(awaitable: Awaitable[Any]) -> asyncio.Future:
+    """Schedules a refresh without awaiting it; failures are swallowed (the stale value stays)."""
+    task = asyncio.ensure_future(awaitable)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
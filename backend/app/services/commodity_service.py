@@ -1,43 +1,93 @@
 # backend/app/services/commodity_service.py
-import pandas as pd
+import bisect
+import json
+import logging
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'market_data_for_training.csv')
+import numpy as np
+
+from app.services import data_store
+
+# Ordered keyword taxonomy: the first category whose keyword appears in the
+# commodity name wins, anything unmatched falls into the default category.
+TAXONOMY_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'commodity_taxonomy.json')
+
+logger = logging.getLogger(__name__)
+
+def _taxonomy_signature() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(TAXONOMY_FILE_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_taxonomy() -> Dict:
+    """Reads the category taxonomy, falling back to a single default bucket."""
+    try:
+        with open(TAXONOMY_FILE_PATH, 'r', encoding='utf-8') as f:
+            taxonomy = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Error loading commodity taxonomy: %s", e)
+        taxonomy = {}
+    return {
+        "default": taxonomy.get("default", "Other"),
+        "categories": taxonomy.get("categories", []),
+    }
+
+
+def assign_categories(names: List[str], taxonomy: Dict) -> np.ndarray:
+    """Vectorized keyword matching: one substring scan per keyword over all distinct names."""
+    lowered = np.char.lower(np.asarray(names, dtype=str))
+    labels = np.full(len(names), taxonomy["default"], dtype=object)
+    unassigned = np.ones(len(names), dtype=bool)
+    for category in taxonomy["categories"]:
+        matched = np.zeros(len(names), dtype=bool)
+        for keyword in category.get("keywords", []):
+            matched |= np.char.find(lowered, keyword.lower()) >= 0
+        matched &= unassigned
+        labels[matched] = category["name"]
+        unassigned &= ~matched
+    return labels
+
+
+def _build_categories(tables, parts) -> Dict[str, List[str]]:
+    names = sorted(set().union(*(source.unique('commodity') for source in [*tables, *parts])))
+    if not names:
+        return {}
+    labels = assign_categories(names, load_taxonomy())
+
+    # `names` is already sorted, so each category's list comes out sorted too.
+    categorized: Dict[str, List[str]] = {}
+    for name, label in zip(names, labels):
+        categorized.setdefault(label, []).append(name)
+    return categorized
+
+
+def _merge_parts(categorized: Dict[str, List[str]], parts) -> Dict[str, List[str]]:
+    """Categorizes only the commodity names that ingested parts add."""
+    known = {name for names in categorized.values() for name in names}
+    new_names = sorted(set().union(*(part.unique('commodity') for part in parts)) - known)
+    if not new_names:
+        return categorized
+    merged = {label: list(names) for label, names in categorized.items()}
+    for name, label in zip(new_names, assign_categories(new_names, load_taxonomy())):
+        bisect.insort(merged.setdefault(label, []), name)
+    return merged
+
+
+# Rebuilt when the training data or the taxonomy file changes
+_categories = data_store.DerivedIndex(("training",), _build_categories, _merge_parts, _taxonomy_signature)
 
-try:
-    df = pd.read_csv(DATA_FILE_PATH)
-    df.columns = [col.strip().lower() for col in df.columns]
-except FileNotFoundError:
-    df = pd.DataFrame()
 
 def categorize_commodities() -> Dict[str, List[str]]:
     """
-    Reads the data and groups commodities into categories.
+    Returns commodities grouped into categories. The grouping is computed once per
+    distinct commodity name and cached until the data or the taxonomy changes.
     """
-    if df.empty:
-        return {}
+    return _categories.get()
+
 
-    # Simple categorization based on keywords
-    def get_category(commodity_name):
-        commodity_name = str(commodity_name).lower()
-        if any(veg in commodity_name for veg in ['potato', 'onion', 'tomato', 'brinjal', 'cabbage', 'carrot', 'cauliflower', 'lemon']):
-            return 'Vegetables'
-        if any(millet in commodity_name for millet in ['bajra', 'jowar', 'ragi']):
-            return 'Millets'
-        if any(cereal in commodity_name for cereal in ['wheat', 'paddy', 'maize', 'rice']):
-            return 'Cereals & Grains'
-        if 'cotton' in commodity_name:
-            return 'Fibers'
-        if 'chilli' in commodity_name:
-            return 'Spices'
-        return 'Other'
-
-    df['category'] = df['commodity'].apply(get_category)
-    
-    categorized = {}
-    for category in df['category'].unique():
-        commodities = df[df['category'] == category]['commodity'].unique().tolist()
-        categorized[category] = sorted(commodities)
-        
-    return categorized
\ No newline at end of file
+def is_loaded() -> bool:
+    return _categories.loaded
@@ -0,0 +1,483 @@
+# backend/app/services/data_store.py
+"""
+Shared columnar store for the market data CSVs.
+
+Each CSV is compiled once into a directory of ``.npy`` column files plus a
+``meta.json`` describing them:
+
+* text columns are dictionary-encoded (sorted categories + int32 codes, -1 = missing),
+* date columns are stored as ``datetime64[D]``,
+* numeric columns keep their NumPy dtype.
+
+At runtime the column files are opened with ``np.load(mmap_mode='r')`` so every
+uvicorn worker shares the same page-cache copy and services get zero-copy views.
+A table is recompiled automatically when its source CSV changes (mtime/size).
+
+New exports ingested at runtime (see ingest_service) are appended as small
+column directories under ``partitions/arrival_date=YYYY-MM-DD/part-*``, in the
+same format. ``partitions/parts.log`` lists them in write order, so
+``list_parts()`` picks up new parts (also those written by other workers) by
+reading only the tail of the log, and ``DerivedIndex`` keeps a structure built
+from a dataset up to date by merging just the parts it hasn't seen. Writers that must not race (ingest's
+check-then-write) hold ``writer_lock()``, an exclusive lock on the log file.
+
+Compile ahead of time (e.g. in the Docker build) with:
+
+    python -m app.services.data_store compile
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are then only serialized within one process
+    fcntl = None
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+COLUMNAR_DIR = os.path.join(DATA_DIR, 'columnar')
+PARTITIONS_DIR = os.path.join(DATA_DIR, 'partitions')
+PARTS_LOG = os.path.join(PARTITIONS_DIR, 'parts.log')
+
+# Logical dataset name -> source CSV in app/data
+DATASETS = {
+    "training": "market_data_for_training.csv",
+    "app": "app_data.csv",
+    "live": "9ef84268-d588-465a-a308-a864a43d0070.csv",
+}
+
+FORMAT_VERSION = 1
+DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d-%b-%Y"]
+
+logger = logging.getLogger(__name__)
+
+def normalize_column_name(col: str) -> str:
+    """Single place for the header cleanup the services used to do ad hoc."""
+    return str(col).strip().lower().replace('_x0020_', '_')
+
+
+class ColumnarTable:
+    """A read-only, column-oriented view over one compiled dataset."""
+
+    def __init__(self, name: str, meta: Dict, arrays: Dict[str, np.ndarray]):
+        self.name = name
+        self.meta = meta
+        self._arrays = arrays
+        self.num_rows = int(meta.get("num_rows", 0))
+        self.columns: List[str] = list(meta.get("columns", {}).keys())
+        self.version: Tuple[int, int] = (meta.get("source_mtime_ns", 0), meta.get("source_size", 0))
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __contains__(self, col: str) -> bool:
+        return col in self._arrays
+
+    @property
+    def empty(self) -> bool:
+        return self.num_rows == 0
+
+    def kind(self, col: str) -> str:
+        return self.meta["columns"][col]["kind"]
+
+    def column(self, col: str) -> np.ndarray:
+        """Raw column array (codes for text columns). Zero-copy when memory-mapped."""
+        return self._arrays[col]
+
+    def codes(self, col: str) -> np.ndarray:
+        if self.kind(col) != "category":
+            raise ValueError(f"Column '{col}' is not a text column.")
+        return self._arrays[col]
+
+    def categories(self, col: str) -> List[str]:
+        """Sorted distinct non-null values of a text column."""
+        return self.meta["columns"][col]["categories"]
+
+    def unique(self, col: str) -> List[str]:
+        if col not in self._arrays:
+            return []
+        if self.kind(col) == "category":
+            return list(self.categories(col))
+        values = np.asarray(self._arrays[col])
+        return np.unique(values[~_isnull(values)]).tolist()
+
+    def decode(self, col: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Materializes a text column (or a subset of its rows) as an object array."""
+        codes = self.codes(col) if rows is None else self.codes(col)[rows]
+        lookup = np.array(self.categories(col) + [None], dtype=object)
+        return lookup[codes]
+
+    def to_frame(self, columns: Optional[List[str]] = None):
+        """Builds a pandas DataFrame. Text columns become pandas Categoricals over the codes."""
+        import pandas as pd
+
+        data = {}
+        for col in columns or self.columns:
+            if self.kind(col) == "category":
+                data[col] = pd.Categorical.from_codes(self._arrays[col], categories=self.categories(col))
+            else:
+                data[col] = self._arrays[col]
+        return pd.DataFrame(data)
+
+
+def _isnull(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind in "fc":
+        return np.isnan(values)
+    if values.dtype.kind == "M":
+        return np.isnat(values)
+    return np.zeros(values.shape, dtype=bool)
+
+
+def _source_path(name: str) -> str:
+    return os.path.join(DATA_DIR, DATASETS[name])
+
+
+def _table_dir(name: str) -> str:
+    return os.path.join(COLUMNAR_DIR, name)
+
+
+def _source_signature(name: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(_source_path(name))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _parse_dates(series):
+    import pandas as pd
+
+    best = None
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+        if best is None or parsed.notna().sum() > best.notna().sum():
+            best = parsed
+    return best.values.astype('datetime64[D]')
+
+
+def encode_frame(df) -> Tuple[Dict[str, Dict], Dict[str, np.ndarray]]:
+    """Converts a DataFrame with normalized column names to column metadata and arrays."""
+    import pandas as pd
+
+    arrays: Dict[str, np.ndarray] = {}
+    columns: Dict[str, Dict] = {}
+    for col in df.columns:
+        series = df[col]
+        if col.endswith('date'):
+            arrays[col] = _parse_dates(series)
+            columns[col] = {"kind": "date"}
+        elif pd.api.types.is_numeric_dtype(series):
+            arrays[col] = series.to_numpy()
+            columns[col] = {"kind": "numeric"}
+        else:
+            codes, uniques = pd.factorize(series.astype('string').str.strip(), sort=True)
+            arrays[col] = codes.astype(np.int32)
+            columns[col] = {"kind": "category", "categories": [str(u) for u in uniques]}
+    return columns, arrays
+
+
+def _encode_csv(name: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Reads a source CSV with pandas and converts it to column arrays."""
+    import pandas as pd
+
+    signature = _source_signature(name)
+    df = pd.read_csv(_source_path(name))
+    df.columns = [normalize_column_name(col) for col in df.columns]
+    columns, arrays = encode_frame(df)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "source": DATASETS[name],
+        "source_mtime_ns": signature[0],
+        "source_size": signature[1],
+        "num_rows": len(df),
+        "columns": columns,
+    }
+    return meta, arrays
+
+
+def _write_table_dir(target: str, meta: Dict, arrays: Dict[str, np.ndarray]) -> None:
+    staging = f"{target}.tmp-{os.getpid()}"
+    retired = f"{target}.old-{os.getpid()}"
+
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for col, values in arrays.items():
+        np.save(os.path.join(staging, f"{col}.npy"), values, allow_pickle=False)
+    with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    # Swap directories so readers never observe a half-written table. Files that
+    # are already memory-mapped stay valid after the old directory is removed.
+    if os.path.isdir(target):
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def compile_dataset(name: str) -> Dict:
+    """Compiles one dataset's CSV into its column directory and returns the metadata."""
+    meta, arrays = _encode_csv(name)
+    _write_table_dir(_table_dir(name), meta, arrays)
+    return meta
+
+
+def _open_table_dir(name: str, directory: str) -> Optional[ColumnarTable]:
+    try:
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            return None
+        arrays = {
+            col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode='r', allow_pickle=False)
+            for col in meta["columns"]
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    return ColumnarTable(name, meta, arrays)
+
+
+def _open_compiled(name: str) -> Optional[ColumnarTable]:
+    return _open_table_dir(name, _table_dir(name))
+
+
+def _empty_table(name: str) -> ColumnarTable:
+    return ColumnarTable(name, {"num_rows": 0, "columns": {}}, {})
+
+
+_tables: Dict[str, ColumnarTable] = {}
+_tables_lock = threading.Lock()
+
+
+def _load_table(name: str, signature: Optional[Tuple[int, int]]) -> ColumnarTable:
+    if signature is None:
+        logger.warning("Data file for '%s' not found at %s", name, _source_path(name))
+        return _empty_table(name)
+
+    table = _open_compiled(name)
+    if table is not None and table.version == signature:
+        return table
+
+    try:
+        compile_dataset(name)
+        table = _open_compiled(name)
+        if table is not None:
+            return table
+    except OSError as e:
+        # Read-only deployments: fall back to in-memory columns.
+        logger.warning("Could not write columnar cache for '%s': %s", name, e)
+    except Exception:
+        logger.exception("Error loading data for '%s'", name)
+        return _empty_table(name)
+
+    meta, arrays = _encode_csv(name)
+    return ColumnarTable(name, meta, arrays)
+
+
+def get_table(name: str) -> ColumnarTable:
+    """
+    Returns the columnar table for a dataset, compiling or reloading it when the
+    source CSV has changed. Callers can compare ``table.version`` (or identity)
+    to invalidate anything they derived from it.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}'. Expected one of: {', '.join(DATASETS)}")
+
+    signature = _source_signature(name)
+    table = _tables.get(name)
+    if table is not None and (table.version == signature or (signature is None and table.empty)):
+        return table
+
+    with _tables_lock:
+        table = _tables.get(name)
+        if table is not None and (table.version == signature or (signature is None and table.empty)):
+            return table
+        table = _load_table(name, signature)
+        _tables[name] = table
+        return table
+
+
+def is_loaded(name: str) -> bool:
+    return name in _tables
+
+
+# --- Ingested partitions ---
+_parts: List[ColumnarTable] = []
+_parts_offset = 0
+_parts_lock = threading.Lock()
+
+
+def write_part(day: str, df, source: str) -> str:
+    """
+    Writes the rows of one arrival date as a new part and appends it to the parts
+    log. `df` must have normalized column names. Returns the part's name.
+    """
+    columns, arrays = encode_frame(df)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "source": source,
+        "partition": day,
+        "num_rows": len(df),
+        "columns": columns,
+    }
+    name = f"arrival_date={day}/part-{time.time_ns()}-{os.getpid()}"
+    _write_table_dir(os.path.join(PARTITIONS_DIR, name), meta, arrays)
+    # A single short O_APPEND write, so concurrent writers don't interleave lines.
+    with open(PARTS_LOG, 'a', encoding='utf-8') as f:
+        f.write(name + "\n")
+    return name
+
+
+@contextlib.contextmanager
+def writer_lock() -> Iterator[None]:
+    """Holds an exclusive lock on the parts log, shared by every process that writes parts."""
+    os.makedirs(PARTITIONS_DIR, exist_ok=True)
+    with open(PARTS_LOG, 'a', encoding='utf-8') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def list_parts() -> List[ColumnarTable]:
+    """
+    All ingested parts in write order. The list only ever grows (a new list object
+    is returned when it does), so callers can remember how many parts they have
+    already applied and merge just the rest. If the log is removed, it starts over.
+    """
+    global _parts, _parts_offset
+    try:
+        size = os.path.getsize(PARTS_LOG)
+    except OSError:
+        size = 0
+    if size == _parts_offset:
+        return _parts
+
+    with _parts_lock:
+        if size < _parts_offset:
+            _parts, _parts_offset = [], 0
+        if size > _parts_offset:
+            with open(PARTS_LOG, 'rb') as f:
+                f.seek(_parts_offset)
+                tail = f.read(size - _parts_offset)
+            # Leave a partially written last line for the next call.
+            complete = tail[:tail.rfind(b"\n") + 1]
+            new_parts = []
+            for name in complete.decode('utf-8').splitlines():
+                table = _open_table_dir(name, os.path.join(PARTITIONS_DIR, name))
+                if table is not None:
+                    new_parts.append(table)
+            _parts = _parts + new_parts
+            _parts_offset += len(complete)
+        return _parts
+
+
+# --- Derived indexes ---
+class DerivedIndex:
+    """
+    A value derived from some datasets plus the ingested parts, kept current.
+
+    ``build(tables, parts)`` makes it from scratch; it is called on first use and
+    whenever a source table is reloaded, ``version()`` changes or the parts log
+    starts over. ``merge(value, new_parts)`` folds in parts appended since; it
+    must return a new value (or the same one, unchanged) rather than modify the
+    old one, so requests still using it see a consistent index.
+    """
+
+    def __init__(
+        self,
+        datasets: Sequence[str],
+        build: Callable[[Tuple[ColumnarTable, ...], List[ColumnarTable]], Any],
+        merge: Callable[[Any, List[ColumnarTable]], Any],
+        version: Optional[Callable[[], Hashable]] = None,
+    ):
+        self.datasets = tuple(datasets)
+        self._build = build
+        self._merge = merge
+        self._version = version
+        self._lock = threading.Lock()
+        # (value, source tables, version, parts applied), replaced as a whole
+        self._state: Optional[Tuple[Any, Tuple[ColumnarTable, ...], Hashable, int]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._state is not None
+
+    def _current(self, tables: Tuple[ColumnarTable, ...], version: Hashable) -> bool:
+        if self._state is None:
+            return False
+        _, built_from, built_version, _ = self._state
+        return built_version == version and len(tables) == len(built_from) and all(
+            a is b for a, b in zip(tables, built_from)
+        )
+
+    def get(self) -> Any:
+        tables = tuple(get_table(name) for name in self.datasets)
+        version = self._version() if self._version is not None else None
+        parts = list_parts()
+        if self._current(tables, version) and len(parts) == self._state[3]:
+            return self._state[0]
+        with self._lock:
+            if self._current(tables, version) and len(parts) >= self._state[3]:
+                value, _, _, applied = self._state
+                if len(parts) > applied:
+                    value = self._merge(value, parts[applied:])
+            else:
+                value = self._build(tables, parts)
+            self._state = (value, tables, version, len(parts))
+            return value
+
+
+# --- Converter CLI ---
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile the market data CSVs into memory-mappable column files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compile_cmd = sub.add_parser("compile", help="Compile datasets into app/data/columnar/")
+    compile_cmd.add_argument("datasets", nargs="*", help=f"Datasets to compile: {', '.join(DATASETS)} (default: all)")
+    compile_cmd.add_argument("--force", action="store_true", help="Recompile even if the source has not changed")
+
+    sub.add_parser("info", help="Show the compiled datasets")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        unknown = [name for name in args.datasets if name not in DATASETS]
+        if unknown:
+            parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+        for name in args.datasets or DATASETS:
+            signature = _source_signature(name)
+            if signature is None:
+                print(f"Skipping '{name}': {_source_path(name)} not found")
+                continue
+            existing = _open_compiled(name)
+            if existing is not None and existing.version == signature and not args.force:
+                print(f"'{name}' is up to date ({existing.num_rows} rows)")
+                continue
+            meta = compile_dataset(name)
+            print(f"Compiled '{name}': {meta['num_rows']} rows, {len(meta['columns'])} columns -> {_table_dir(name)}")
+    else:
+        for name in DATASETS:
+            table = _open_compiled(name)
+            if table is None:
+                print(f"{name}: not compiled")
+                continue
+            fresh = "fresh" if table.version == _source_signature(name) else "stale"
+            print(f"{name}: {table.num_rows} rows, columns={table.columns} ({fresh})")
+        parts = list_parts()
+        print(f"partitions: {len(parts)} parts, {sum(part.num_rows for part in parts)} rows")
+
+
+if __name__ == "__main__":
+    main()
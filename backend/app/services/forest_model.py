@@ -0,0 +1,140 @@
+# backend/app/services/forest_model.py
+"""
+Flat, memory-mappable format and NumPy-only inference for random forest regressors.
+
+A trained forest is exported to a single ``.npy`` file holding one structured
+record per node (feature, threshold, left, right, value). The layout makes the
+file self-describing:
+
+* the roots of the T trees are records 0..T-1, every other node follows them,
+* leaves have ``feature == -1`` and point to themselves as both children.
+
+Loading is ``np.load(mmap_mode='r')``, so all uvicorn workers share one physical
+copy of the pages, and no pickle or scikit-learn import is involved. Inference
+walks every tree for every sample at once until all of them sit on a leaf.
+
+Convert an existing pickled scikit-learn model with:
+
+    python -m app.services.forest_model export price_model_rf.pkl price_model_rf.npy
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+NODE_DTYPE = np.dtype([
+    ("feature", "<i4"),
+    ("left", "<i4"),
+    ("right", "<i4"),
+    ("threshold", "<f8"),
+    ("value", "<f8"),
+])
+
+# Bump when the layout changes so the trainer re-exports every model.
+FORMAT_VERSION = "flat-forest-v1"
+
+
+class FlatForest:
+    def __init__(self, nodes: np.ndarray):
+        self.nodes = nodes
+        self.feature = nodes["feature"]
+        self.left = nodes["left"]
+        self.right = nodes["right"]
+        self.threshold = nodes["threshold"]
+        self.value = nodes["value"]
+        # Non-root nodes start right after the roots, and each is some node's
+        # child, so the smallest child pointer that isn't a self-loop is T.
+        internal = self.feature >= 0
+        self.n_trees = int(self.left[internal].min()) if internal.any() else len(nodes)
+        self.n_features = int(self.feature.max()) + 1 if internal.any() else 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.nodes.nbytes
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FlatForest":
+        nodes = np.load(path, mmap_mode="r", allow_pickle=False)
+        if nodes.dtype != NODE_DTYPE:
+            raise ValueError(f"{path} is not a flat forest file.")
+        return cls(nodes)
+
+    def predict(self, X) -> np.ndarray:
+        """Mean of the per-tree predictions, matching RandomForestRegressor.predict."""
+        # scikit-learn compares float32 features against float64 thresholds.
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)[:, None]
+        nodes = np.broadcast_to(np.arange(self.n_trees), (n_samples, self.n_trees)).copy()
+        while True:
+            features = self.feature[nodes]
+            values = X[rows, np.maximum(features, 0)]
+            next_nodes = np.where(values <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        return self.value[nodes].mean(axis=1)
+
+
+def flatten_forest(model) -> np.ndarray:
+    """
+    Converts a fitted RandomForestRegressor (or anything with `estimators_[i].tree_`)
+    into the flat node layout. Uses only the public tree_ arrays; no sklearn import.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_trees = len(trees)
+    total = sum(tree.node_count for tree in trees)
+    nodes = np.zeros(total, dtype=NODE_DTYPE)
+
+    base = n_trees  # next free slot for non-root nodes
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        # Local node i -> global slot: the root goes to t, the rest are packed after the roots.
+        mapping = np.empty(count, dtype=np.int64)
+        mapping[0] = t
+        mapping[1:] = base + np.arange(count - 1)
+        base += count - 1
+
+        is_leaf = tree.children_left < 0
+        left = np.where(is_leaf, np.arange(count), tree.children_left)
+        right = np.where(is_leaf, np.arange(count), tree.children_right)
+
+        nodes["feature"][mapping] = np.where(is_leaf, -1, tree.feature)
+        nodes["left"][mapping] = mapping[left]
+        nodes["right"][mapping] = mapping[right]
+        nodes["threshold"][mapping] = np.where(is_leaf, 0.0, tree.threshold)
+        nodes["value"][mapping] = tree.value.reshape(count, -1)[:, 0]
+    return nodes
+
+
+def export_forest(model, path: Union[str, Path]) -> int:
+    """Writes the flat forest file atomically and returns its size in bytes."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, flatten_forest(model), allow_pickle=False)
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export pickled random forests to the flat .npy format.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_cmd = sub.add_parser("export", help="Convert a pickled RandomForestRegressor")
+    export_cmd.add_argument("source", help="Path to the .pkl model (trusted input only: this unpickles it)")
+    export_cmd.add_argument("target", help="Path of the .npy file to write")
+    args = parser.parse_args(argv)
+
+    import pickle
+
+    with open(args.source, "rb") as f:
+        model = pickle.load(f)
+    size = export_forest(model, args.target)
+    forest = FlatForest.load(args.target)
+    print(f"Exported {forest.n_trees} trees ({len(forest.nodes)} nodes, {size} bytes) -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# backend/app/services/gemini_service.py
+"""
+Gemini client used by the AI advisor, with response caching.
+
+Answers are cached by a caller-supplied signature (TTL + LRU), identical
+in-flight requests are coalesced, and `stream_generate` relays
+`streamGenerateContent` server-sent events as the tokens arrive.
+
+GEMINI_API_BASE can point at a local stand-in model server for testing.
+"""
+import json
+import os
+from typing import AsyncIterator, Dict, Hashable
+
+from app.services import http_clients, metrics
+from app.services.cache import TTLCache, SingleFlight
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "gemini api key") # Handled by the execution environment
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-preview-05-20")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+CACHE_TTL_SECONDS = float(os.getenv("ADVISOR_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("ADVISOR_CACHE_MAX_ENTRIES", "2048"))
+
+_advice_cache = TTLCache(ttl=CACHE_TTL_SECONDS, maxsize=CACHE_MAX_ENTRIES, shared_namespace="cache:advisor")
+_inflight = SingleFlight()
+metrics.register_cache("advisor_answers", _advice_cache)
+
+
+class EmptyResponseError(Exception):
+    """Raised when the model returns no text."""
+
+
+def _url(method: str) -> str:
+    return f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:{method}"
+
+
+def _payload(system_prompt: str, user_query: str) -> Dict:
+    return {
+        "contents": [{"parts": [{"text": user_query}]}],
+        "systemInstruction": {"parts": [{"text": system_prompt}]},
+    }
+
+
+def _extract_text(result: Dict) -> str:
+    parts = (result.get("candidates") or [{}])[0].get("content", {}).get("parts") or [{}]
+    return "".join(part.get("text", "") for part in parts)
+
+
+async def _generate_uncached(system_prompt: str, user_query: str) -> str:
+    client = http_clients.get_client("gemini", timeout=30.0)
+    with metrics.track_upstream("gemini") as call:
+        response = await client.post(_url("generateContent"), params={"key": GEMINI_API_KEY}, json=_payload(system_prompt, user_query))
+        call.status = response.status_code
+        response.raise_for_status()
+    text = _extract_text(response.json())
+    if not text:
+        raise EmptyResponseError("Received empty response from AI.")
+    return text
+
+
+async def generate(signature: Hashable, system_prompt: str, user_query: str) -> str:
+    """Returns the cached answer for `signature`, or asks Gemini once for all concurrent callers."""
+    cached = await _advice_cache.get_async(signature)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        text = await _generate_uncached(system_prompt, user_query)
+        _advice_cache.set(signature, text)
+        return text
+
+    return await _inflight.run(signature, fetch)
+
+
+async def stream_generate(signature: Hashable, system_prompt: str, user_query: str) -> AsyncIterator[str]:
+    """
+    Yields the answer in chunks. Cache hits and requests that join an identical
+    in-flight call yield the whole answer at once; otherwise chunks are relayed
+    from `streamGenerateContent` as they arrive and the full text is cached.
+    """
+    cached = await _advice_cache.get_async(signature)
+    if cached is not None:
+        yield cached
+        return
+
+    leader = _inflight.lead(signature)
+    if leader is None:
+        yield await _inflight.wait(signature)
+        return
+
+    chunks = []
+    try:
+        client = http_clients.get_client("gemini", timeout=30.0)
+        with metrics.track_upstream("gemini-stream") as call:
+            async with client.stream(
+                "POST",
+                _url("streamGenerateContent"),
+                params={"key": GEMINI_API_KEY, "alt": "sse"},
+                json=_payload(system_prompt, user_query),
+            ) as response:
+                call.status = response.status_code
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = _extract_text(json.loads(line[len("data:"):].strip()))
+                    if text:
+                        chunks.append(text)
+                        yield text
+        if not chunks:
+            raise EmptyResponseError("Received empty response from AI.")
+    except BaseException as e:
+        if not leader.done():
+            leader.set_exception(e if isinstance(e, Exception) else EmptyResponseError("Stream was interrupted."))
+            # Followers re-raise it; mark it retrieved so an unawaited future is not logged.
+            leader.exception()
+        raise
+
+    text = "".join(chunks)
+    _advice_cache.set(signature, text)
+    leader.set_result(text)
@@ -0,0 +1,37 @@
+# backend/app/services/http_clients.py
+"""
+Shared, connection-pooled httpx clients for outbound calls.
+
+Creating an ``httpx.AsyncClient`` per request throws away the connection pool
+and pays a new TCP/TLS handshake every time. Services ask for a named client
+here instead; all clients are closed from the app's lifespan hook.
+"""
+from typing import Dict
+
+import httpx
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(name: str = "default", timeout: float = 10.0) -> httpx.AsyncClient:
+    """Returns the shared client for `name`, creating it on first use."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=timeout, limits=DEFAULT_LIMITS)
+        _clients[name] = client
+    return client
+
+
+def set_client(name: str, client: httpx.AsyncClient) -> None:
+    """Replaces the shared client for `name`, e.g. with one on a local stand-in transport."""
+    _clients[name] = client
+
+
+async def aclose_all() -> None:
+    """Closes every shared client. Called on application shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,171 @@
+# backend/app/services/ingest_service.py
+"""
+Streaming, incremental ingestion of Agmarknet daily exports.
+
+An export is read in fixed-size chunks, so memory stays bounded however large the
+file is. Each chunk is normalized (column names, whitespace, ``dd/mm/yyyy``
+dates, numeric prices), deduplicated on (market, commodity, variety, grade,
+arrival_date) against itself, the bundled datasets and everything ingested
+before, and appended to the date-partitioned store in data_store.
+
+Services that read the market data (live locations, commodity categories, the
+analytics cube) merge new parts on their next access instead of reloading.
+
+    python -m app.services.ingest_service path/to/export.csv [...]
+"""
+import argparse
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, IO, Set, Tuple, Union
+
+import numpy as np
+
+from app.services import data_store
+
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))
+# How many arrival dates' dedup key sets to keep in memory.
+KEY_CACHE_DAYS = int(os.getenv("INGEST_KEY_CACHE_DAYS", "64"))
+
+KEY_COLUMNS = ("market", "commodity", "variety", "grade", "arrival_date")
+TEXT_COLUMNS = ("state", "district", "market", "commodity", "variety", "grade")
+PRICE_COLUMNS = ("min_price", "max_price", "modal_price")
+REQUIRED_COLUMNS = TEXT_COLUMNS + ("arrival_date",) + PRICE_COLUMNS
+
+# Bundled datasets in the export format; their rows count as already ingested.
+BASE_DATASETS = ("training", "live")
+
+_ingest_lock = threading.Lock()
+# day -> (dedup keys, how many of list_parts() they include)
+_day_keys: "OrderedDict[str, Tuple[Set[Tuple], int]]" = OrderedDict()
+
+
+class IngestError(ValueError):
+    pass
+
+
+def _table_keys(table: data_store.ColumnarTable, day: np.datetime64) -> Set[Tuple]:
+    if table.empty or any(col not in table for col in KEY_COLUMNS):
+        return set()
+    rows = np.flatnonzero(np.asarray(table.column("arrival_date")) == day)
+    if not len(rows):
+        return set()
+    decoded = [table.decode(col, rows) for col in KEY_COLUMNS[:-1]]
+    return {tuple(_fold(v) for v in values) for values in zip(*decoded)}
+
+
+def _fold(value) -> str:
+    return "" if value is None else str(value).strip().casefold()
+
+
+def _keys_for_day(day: str) -> Set[Tuple]:
+    """
+    Dedup keys (without the date) already stored for one arrival date, LRU-cached.
+    Parts appended since the set was built (by this or another process) are
+    folded in on every call.
+    """
+    target = np.datetime64(day, "D")
+    parts = data_store.list_parts()
+    cached = _day_keys.get(day)
+    if cached is not None and cached[1] <= len(parts):
+        keys, seen = cached
+        _day_keys.move_to_end(day)
+    else:
+        # Not cached, or the parts log was reset under us.
+        keys, seen = set(), 0
+        for name in BASE_DATASETS:
+            keys |= _table_keys(data_store.get_table(name), target)
+
+    for part in parts[seen:]:
+        if part.meta.get("partition") == day:
+            keys |= _table_keys(part, target)
+
+    _day_keys[day] = (keys, len(parts))
+    while len(_day_keys) > KEY_CACHE_DAYS:
+        _day_keys.popitem(last=False)
+    return keys
+
+
+def _normalize_chunk(df):
+    import pandas as pd
+
+    df.columns = [data_store.normalize_column_name(col) for col in df.columns]
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise IngestError(f"Export is missing column(s): {', '.join(missing)}")
+    df = df[list(REQUIRED_COLUMNS)].copy()
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].astype("string").str.strip()
+    for col in PRICE_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["arrival_date"] = data_store._parse_dates(df["arrival_date"])
+    return df
+
+
+def ingest_csv(source: Union[str, IO], source_name: str = "upload") -> Dict:
+    """
+    Ingests one export (a path or a binary/text file object) and returns counts of
+    rows read, ingested, skipped as duplicates or invalid, and parts written.
+    """
+    import pandas as pd
+
+    summary = {"source": source_name, "rows_read": 0, "ingested": 0, "duplicates": 0, "invalid": 0, "parts": [], "dates": []}
+    dates = set()
+    # The lock file serializes ingest across workers and the CLI, so a row checked
+    # here cannot be written by another process before this one writes it.
+    with _ingest_lock, data_store.writer_lock():
+        try:
+            reader = pd.read_csv(source, chunksize=CHUNK_ROWS, dtype=str, keep_default_na=False, na_values=[""])
+            for chunk in reader:
+                summary["rows_read"] += len(chunk)
+                df = _normalize_chunk(chunk)
+
+                valid = df["arrival_date"].notna() & df["market"].notna() & df["commodity"].notna()
+                summary["invalid"] += int((~valid).sum())
+                df = df[valid]
+
+                key_frame = pd.DataFrame({col: df[col].fillna("").str.casefold() for col in KEY_COLUMNS[:-1]})
+                first = ~key_frame.assign(arrival_date=df["arrival_date"]).duplicated()
+                summary["duplicates"] += int((~first).sum())
+                df, key_frame = df[first], key_frame[first]
+
+                days = df["arrival_date"].dt.strftime("%Y-%m-%d")
+                for day, rows in df.groupby(days, sort=True).groups.items():
+                    existing = _keys_for_day(day)
+                    keys = list(key_frame.loc[rows].itertuples(index=False, name=None))
+                    new = np.array([key not in existing for key in keys], dtype=bool)
+                    summary["duplicates"] += int((~new).sum())
+                    if not new.any():
+                        continue
+                    part = df.loc[rows][new]
+                    summary["parts"].append(data_store.write_part(day, part, source_name))
+                    existing.update(key for key, is_new in zip(keys, new) if is_new)
+                    summary["ingested"] += len(part)
+                    dates.add(day)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+            raise IngestError(f"Could not parse export: {e}")
+
+    summary["dates"] = sorted(dates)
+    return summary
+
+
+# --- CLI ---
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest Agmarknet CSV exports into the partitioned market store.")
+    parser.add_argument("files", nargs="+", help="CSV exports to ingest")
+    args = parser.parse_args(argv)
+    for path in args.files:
+        try:
+            summary = ingest_csv(path, os.path.basename(path))
+        except (OSError, IngestError) as e:
+            print(f"{path}: {e}")
+            continue
+        print(
+            f"{path}: read {summary['rows_read']} rows, ingested {summary['ingested']}, "
+            f"skipped {summary['duplicates']} duplicates and {summary['invalid']} invalid "
+            f"into {len(summary['parts'])} parts ({', '.join(summary['dates']) or 'no new dates'})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,117 @@
-import pandas as pd
-from typing import List
-import os
+import logging
+from typing import Dict, List
 
-DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', '9ef84268-d588-465a-a308-a864a43d0070.csv')
+import numpy as np
 
-def load_live_data():
+from app.services import data_store
+
+logger = logging.getLogger(__name__)
+
+# --- In-memory State -> District -> Market index ---
+# Built once from the memory-mapped columns of the live export into plain dicts
+# and pre-sorted lists. The data store reloads the table when the CSV's
+# mtime/size changes, and the index is rebuilt only when the table does, so the
+# request path is a single os.stat() plus a dictionary lookup. Ingested parts
+# are merged in as they appear, re-sorting only the lists they touch.
+
+
+def _empty_index() -> Dict:
+    return {"states": [], "districts": {}, "markets": {}}
+
+
+def _triples(table: data_store.ColumnarTable):
+    """Distinct (state, district, market) names in a table; missing values are None."""
+    if table.empty or 'state' not in table:
+        return []
+    names = [
+        table.categories(col) + [None] if col in table else [None]
+        for col in ('state', 'district', 'market')
+    ]
+    missing = np.full(len(table), -1, dtype=np.int32)
+    codes = np.unique(np.stack([
+        table.codes(col) if col in table else missing
+        for col in ('state', 'district', 'market')
+    ], axis=1), axis=0)
+    return [
+        (names[0][s], names[1][d], names[2][m])
+        for s, d, m in codes.tolist()
+    ]
+
+
+def _merge(index: Dict, table: data_store.ColumnarTable) -> None:
+    """Adds a table's triples to the index in place."""
+    states = set(index["states"])
+    touched_districts, touched_markets = set(), set()
+    for state, district, market in _triples(table):
+        if state is None:
+            continue
+        state_key = state.lower()
+        if state_key not in index["districts"]:
+            index["districts"][state_key] = []
+            states.add(state)
+        if district is None:
+            continue
+        if district not in index["districts"][state_key]:
+            index["districts"][state_key].append(district)
+            touched_districts.add(state_key)
+        if market is not None:
+            district_markets = index["markets"].setdefault(district.lower(), [])
+            if market not in district_markets:
+                district_markets.append(market)
+                touched_markets.add(district.lower())
+
+    if len(states) != len(index["states"]):
+        index["states"] = sorted(states)
+    for key in touched_districts:
+        index["districts"][key].sort()
+    for key in touched_markets:
+        index["markets"][key].sort()
+
+
+def _build_index(tables, parts) -> Dict:
+    """Groups the distinct (state, district, market) triples into case-insensitive lookup tables."""
+    index = _empty_index()
     try:
-        df = pd.read_csv(DATA_FILE_PATH)
-        df.columns = [col.strip().lower().replace('_x0020_', '_') for col in df.columns]
-        return df
-    except Exception as e:
-        print(f"Error loading live data: {e}")
-        return pd.DataFrame()
+        for source in [*tables, *parts]:
+            _merge(index, source)
+    except Exception:
+        logger.exception("Error loading live data")
+        index = _empty_index()
+    return index
+
+
+def _merge_parts(index: Dict, parts) -> Dict:
+    # Copy-on-write so concurrent readers never see a half-merged index.
+    merged = {
+        "states": index["states"],
+        "districts": {key: list(values) for key, values in index["districts"].items()},
+        "markets": {key: list(values) for key, values in index["markets"].items()},
+    }
+    try:
+        for part in parts:
+            _merge(merged, part)
+    except Exception:
+        logger.exception("Error merging ingested live data")
+        return index
+    return merged
+
+
+_index = data_store.DerivedIndex(("live",), _build_index, _merge_parts)
+
+
+def get_live_index() -> Dict:
+    """Returns the current index, rebuilding it if the live data table has changed."""
+    return _index.get()
+
+
+def is_loaded() -> bool:
+    return _index.loaded
 
 def get_live_states() -> List[str]:
-    df_live_data = load_live_data()
-    if not df_live_data.empty and 'state' in df_live_data.columns:
-        return sorted(df_live_data['state'].dropna().unique().tolist())
-    return []
+    return get_live_index()["states"]
 
 def get_live_districts_for_state(state: str) -> List[str]:
-    df_live_data = load_live_data()
-    if not df_live_data.empty and 'state' in df_live_data.columns:
-        state_df = df_live_data[df_live_data['state'].str.lower() == state.lower()]
-        if not state_df.empty:
-            return sorted(state_df['district'].dropna().unique().tolist())
-    return []
+    return get_live_index()["districts"].get(state.strip().lower(), [])
 
 def get_live_markets_for_district(district: str) -> List[str]:
-    df_live_data = load_live_data()
-    if not df_live_data.empty and 'district' in df_live_data.columns:
-        district_df = df_live_data[df_live_data['district'].str.lower() == district.lower()]
-        if not district_df.empty:
-            return sorted(district_df['market'].dropna().unique().tolist())
-    return []
\ No newline at end of file
+    return get_live_index()["markets"].get(district.strip().lower(), [])
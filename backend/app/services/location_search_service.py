@@ -0,0 +1,187 @@
+# backend/app/services/location_search_service.py
+"""
+Search index over the Indian city gazetteer (india_locations.json).
+
+Built once on first use:
+* names are folded (diacritics stripped, case-folded, whitespace collapsed),
+* a sorted name list answers prefix queries with bisect,
+* a bigram index narrows substring and typo-tolerant (fuzzy) candidates,
+* a KD-tree over unit-sphere coordinates answers nearest-city queries.
+
+Results are ranked exact > prefix > substring > fuzzy.
+"""
+import bisect
+import json
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# This path navigation assumes this file is in backend/app/services/
+LOCATIONS_FILE = Path(__file__).resolve().parents[1] / 'data' / 'india_locations.json'
+
+EARTH_RADIUS_KM = 6371.0088
+
+logger = logging.getLogger(__name__)
+
+def fold(text: str) -> str:
+    """Case- and diacritic-insensitive form used for matching."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance with an early exit once it exceeds max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r)])
+
+
+class LocationIndex:
+    def __init__(self, locations_data: List[Dict]):
+        self.entries: List[Dict] = []
+        for state_data in locations_data:
+            state_name = state_data.get("state")
+            for city in state_data.get("cities", []):
+                if not city.get("name"):
+                    continue
+                self.entries.append({
+                    "name": city["name"],
+                    "state": state_name,
+                    "lat": city["lat"],
+                    "lon": city["lon"],
+                })
+
+        self.folded = [fold(entry["name"]) for entry in self.entries]
+        self.exact: Dict[str, List[int]] = {}
+        self.bigrams: Dict[str, List[int]] = {}
+        for idx, name in enumerate(self.folded):
+            self.exact.setdefault(name, []).append(idx)
+            for gram in _bigrams(name):
+                self.bigrams.setdefault(gram, []).append(idx)
+        self.sorted_names = sorted((name, idx) for idx, name in enumerate(self.folded))
+        self._sorted_keys = [name for name, _ in self.sorted_names]
+
+        self.tree = None
+        if self.entries:
+            from scipy.spatial import cKDTree
+
+            lat = np.array([entry["lat"] for entry in self.entries], dtype=float)
+            lon = np.array([entry["lon"] for entry in self.entries], dtype=float)
+            self.tree = cKDTree(_to_unit_vectors(lat, lon))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        start = bisect.bisect_left(self._sorted_keys, query)
+        end = bisect.bisect_left(self._sorted_keys, query + '\U0010ffff')
+        return [idx for _, idx in self.sorted_names[start:end]]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        q = fold(query)
+        if not q:
+            return []
+
+        ranked: List[int] = []
+        seen = set()
+
+        def take(ids):
+            for idx in ids:
+                if idx not in seen:
+                    seen.add(idx)
+                    ranked.append(idx)
+
+        # 1. Exact, 2. prefix (shortest names first)
+        take(self.exact.get(q, []))
+        take(sorted(self._prefix_matches(q), key=lambda i: (len(self.folded[i]), self.folded[i])))
+        if len(ranked) >= limit:
+            return [self.entries[i] for i in ranked[:limit]]
+
+        # 3. Substring: intersect the bigram postings, then verify.
+        grams = _bigrams(q) or {q}
+        postings = sorted((self.bigrams.get(gram, []) for gram in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:]) if postings and postings[0] else set()
+        substring = [i for i in candidates if i not in seen and q in self.folded[i]]
+        take(sorted(substring, key=lambda i: (self.folded[i].index(q), len(self.folded[i]), self.folded[i])))
+        if len(ranked) >= limit:
+            return [self.entries[i] for i in ranked[:limit]]
+
+        # 4. Fuzzy: names sharing enough bigrams, within a small edit distance of
+        # either the whole name or its prefix of the query's length.
+        max_distance = max(1, len(q) // 4)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self.bigrams.get(gram, []))
+        min_shared = max(1, len(grams) - 2 * max_distance)
+        fuzzy = []
+        for idx, shared in overlap.items():
+            if idx in seen or shared < min_shared:
+                continue
+            name = self.folded[idx]
+            distance = min(_edit_distance(q, name, max_distance), _edit_distance(q, name[:len(q)], max_distance))
+            if distance <= max_distance:
+                fuzzy.append((distance, -shared, len(name), name, idx))
+        take(idx for *_, idx in sorted(fuzzy))
+
+        return [self.entries[i] for i in ranked[:limit]]
+
+    def nearest(self, lat: float, lon: float, k: int = 5) -> List[Dict]:
+        if self.tree is None:
+            return []
+        k = min(k, len(self.entries))
+        chords, ids = self.tree.query(_to_unit_vectors(np.array([lat]), np.array([lon]))[0], k=k)
+        chords, ids = np.atleast_1d(chords), np.atleast_1d(ids)
+        # Chord length on the unit sphere -> great-circle distance
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0.0, 1.0))
+        return [
+            {**self.entries[idx], "distance_km": round(float(dist), 2)}
+            for dist, idx in zip(distances, ids)
+        ]
+
+
+_index: Optional[LocationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[LocationIndex]:
+    """Loads the gazetteer and builds the index on first use. Returns None if unavailable."""
+    global _index
+    if _index is not None:
+        return _index or None
+    with _index_lock:
+        if _index is None:
+            try:
+                with open(LOCATIONS_FILE, 'r', encoding='utf-8') as f:
+                    _index = LocationIndex(json.load(f))
+                logger.info("Indian locations data loaded (%d cities indexed)", len(_index))
+            except Exception as e:
+                logger.error("Could not load Indian locations data: %s", e)
+                _index = LocationIndex([])
+    return _index or None
+
+
+def is_loaded() -> bool:
+    return _index is not None
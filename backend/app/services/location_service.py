@@ -1,23 +1,26 @@
-import pandas as pd
-from typing import List
-import os
+import threading
+from typing import Dict, List, Tuple
+from app.services import data_store
 
-DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'app_data.csv')
+# (column) -> (table it was read from, sorted values). Handing out the same list
+# until app_data.csv changes lets the routers reuse its encoded response.
+_unique_cache: Dict[str, Tuple[data_store.ColumnarTable, List[str]]] = {}
+_unique_lock = threading.Lock()
 
-try:
-    df_app_data = pd.read_csv(DATA_FILE_PATH)
-    df_app_data.columns = [x.lower().strip() for x in df_app_data.columns]
-except FileNotFoundError:
-    df_app_data = pd.DataFrame()
+def _unique(col: str) -> List[str]:
+    table = data_store.get_table("app")
+    entry = _unique_cache.get(col)
+    if entry is not None and entry[0] is table:
+        return entry[1]
+    values = table.unique(col) if not table.empty and col in table else []
+    with _unique_lock:
+        _unique_cache[col] = (table, values)
+    return values
 
 def get_all_commodities() -> List[str]:
     """Returns a sorted list of unique commodities from app_data.csv."""
-    if not df_app_data.empty and 'commodity' in df_app_data.columns:
-        return sorted(df_app_data['commodity'].dropna().unique().tolist())
-    return []
+    return _unique('commodity')
 
 def get_all_markets() -> List[str]:
     """Returns a sorted list of unique markets from app_data.csv."""
-    if not df_app_data.empty and 'market' in df_app_data.columns:
-        return sorted(df_app_data['market'].dropna().unique().tolist())
-    return []
\ No newline at end of file
+    return _unique('market')
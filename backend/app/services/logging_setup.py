@@ -0,0 +1,90 @@
+# backend/app/services/logging_setup.py
+"""
+Structured, non-blocking logging for the app.
+
+Modules log with ``logging.getLogger(__name__)``, which puts them under the
+``app`` logger. ``configure()`` gives that logger a QueueHandler: the request
+path only enqueues the record, and a QueueListener thread formats and writes it,
+so a slow terminal or log pipe never stalls the event loop.
+
+Records are written as one JSON object per line; fields passed with
+``extra={...}`` become top-level keys. LOG_FORMAT=text switches to plain lines
+and LOG_LEVEL sets the threshold (default INFO).
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep exc_info as text and merge the args, but leave formatting to the listener.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure() -> None:
+    """Routes the `app` logger through a background writer thread. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "text":
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    logger = logging.getLogger("app")
+    logger.handlers = [_PreparedQueueHandler(records)]
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    _listener = QueueListener(records, stream)
+    _listener.start()
+
+
+def shutdown() -> None:
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logging.getLogger("app").handlers = []
+    logging.getLogger("app").propagate = True
@@ -0,0 +1,212 @@
+# backend/app/services/metrics.py
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+* ``MetricsMiddleware`` records a latency histogram and a status counter per
+  route template (``/api/iot/latest-data/{device_id}``, not the raw path).
+* ``track_upstream`` times each outbound call and counts it by status code or
+  error type.
+* Caches registered with ``register_cache`` report hits, stale hits, misses,
+  size and hit ratio, read from the cache's own counters at scrape time.
+
+GET /metrics renders everything; there is no external dependency.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers cached in-process lookups up to slow upstream calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry_lock = threading.Lock()
+_metrics: List["_Metric"] = []
+_caches: Dict[str, object] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _metrics.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = self._header()
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# --- HTTP and upstream metrics ---
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"))
+http_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route template, until the last body byte.", ("method", "route"))
+upstream_requests = Counter("upstream_requests_total", "Outbound calls by upstream and status code (or error type).", ("upstream", "status"))
+upstream_duration = Histogram("upstream_request_duration_seconds", "Outbound call latency by upstream.", ("upstream",))
+
+
+class _UpstreamCall:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status: Optional[int] = None
+
+
+@contextmanager
+def track_upstream(upstream: str) -> Iterator[_UpstreamCall]:
+    """
+    Times one outbound call. Set ``call.status`` to the response status code;
+    an exception is counted by its type name and re-raised.
+    """
+    call = _UpstreamCall()
+    started = time.perf_counter()
+    status = "unknown"
+    try:
+        yield call
+        status = str(call.status) if call.status is not None else "ok"
+    except BaseException as e:
+        # A raise_for_status() inside the block still knows the code it failed on.
+        status = str(call.status) if call.status is not None else type(e).__name__
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, upstream)
+        upstream_requests.inc(upstream, status)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are measured to their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_duration.observe(time.perf_counter() - started, method, route)
+            http_requests.inc(method, route, str(status))
+
+
+# --- Caches ---
+def register_cache(name: str, cache) -> None:
+    """Exposes a TTLCache's hit/miss counters and size under `name`."""
+    with _registry_lock:
+        _caches[name] = cache
+
+
+def _render_caches() -> List[str]:
+    with _registry_lock:
+        caches = sorted(_caches.items())
+    series = {
+        "cache_hits_total": ("counter", "Fresh cache hits.", lambda c: c.hits),
+        "cache_stale_hits_total": ("counter", "Stale entries served while refreshing.", lambda c: c.stale_hits),
+        "cache_misses_total": ("counter", "Cache misses.", lambda c: c.misses),
+        "cache_entries": ("gauge", "Entries currently held.", len),
+        "cache_hit_ratio": (
+            "gauge",
+            "Share of lookups answered from the cache (fresh or stale).",
+            lambda c: (c.hits + c.stale_hits) / max(1, c.hits + c.stale_hits + c.misses),
+        ),
+    }
+    lines = []
+    for metric, (kind, documentation, read) in series.items():
+        lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{_escape(name)}"}} {_number(read(cache))}' for name, cache in caches]
+    return lines
+
+
+def render() -> str:
+    with _registry_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    lines += _render_caches()
+    return "\n".join(lines) + "\n"
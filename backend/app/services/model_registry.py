@@ -0,0 +1,140 @@
+# backend/app/services/model_registry.py
+"""
+Registry of price models keyed by (market, commodity).
+
+`ml_trainer.py --series` trains one model per series into app/ml/models/ and
+writes a manifest.json index. Models are stored as flat forest files (see
+forest_model.py) and memory-mapped lazily on first request, so workers share
+the pages and never unpickle anything. Loaded models are kept in an LRU bounded
+by MODEL_CACHE_MAX_BYTES, so a worker only maps the series it actually serves.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.forest_model import FlatForest
+
+# This assumes this file is in backend/app/services/
+ML_DIR = Path(__file__).resolve().parents[1] / 'ml'
+DEFAULT_MODEL_PATH = ML_DIR / 'price_model_rf.npy'
+MODELS_DIR = ML_DIR / 'models'
+MANIFEST_PATH = MODELS_DIR / 'manifest.json'
+
+MAX_CACHE_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+DEFAULT_KEY = "__default__"
+
+
+class ModelNotFoundError(LookupError):
+    """Raised when no trained model exists for the requested series."""
+
+
+def series_key(market: str, commodity: str) -> str:
+    return f"{' '.join(market.casefold().split())}|{' '.join(commodity.casefold().split())}"
+
+
+def series_filename(market: str, commodity: str) -> str:
+    """Filesystem-safe, collision-free artifact name for a series."""
+    key = series_key(market, commodity)
+    slug = "".join(ch if ch.isalnum() else "_" for ch in key)[:60]
+    return f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]}"
+
+
+_lock = threading.Lock()
+_models: "OrderedDict[str, Tuple[FlatForest, int]]" = OrderedDict()
+_cached_bytes = 0
+_manifest: Dict[str, Dict] = {}
+_manifest_signature: Optional[Tuple[int, int]] = None
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _refresh_manifest() -> None:
+    """Reloads the manifest when it changes; models from older trainings are dropped."""
+    global _manifest, _manifest_signature, _cached_bytes
+    signature = _file_signature(MANIFEST_PATH)
+    if signature == _manifest_signature:
+        return
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            _manifest = json.load(f).get("series", {})
+    except (OSError, ValueError):
+        _manifest = {}
+    _manifest_signature = signature
+    default = _models.get(DEFAULT_KEY)
+    _models.clear()
+    _cached_bytes = 0
+    if default is not None:
+        _models[DEFAULT_KEY] = default
+        _cached_bytes = default[1]
+
+
+def list_series() -> List[Dict]:
+    """Returns the (market, commodity) series that have a trained model."""
+    with _lock:
+        _refresh_manifest()
+        return [{"market": entry["market"], "commodity": entry["commodity"]} for entry in _manifest.values()]
+
+
+def _load(path: Path) -> Tuple[FlatForest, int]:
+    model = FlatForest.load(path)
+    return model, model.nbytes
+
+
+def _evict() -> None:
+    global _cached_bytes
+    while _cached_bytes > MAX_CACHE_BYTES and len(_models) > 1:
+        _, (_, nbytes) = _models.popitem(last=False)
+        _cached_bytes -= nbytes
+
+
+def get_model(market: Optional[str] = None, commodity: Optional[str] = None) -> FlatForest:
+    """
+    Returns the model for a series, loading it on first use. Without a market and
+    commodity the default (Ongole cotton) model is returned.
+    Raises ModelNotFoundError if the series has no trained model.
+    """
+    global _cached_bytes
+    with _lock:
+        if market and commodity:
+            _refresh_manifest()
+            key = series_key(market, commodity)
+            entry = _manifest.get(key)
+            if entry is None:
+                raise ModelNotFoundError(f"No trained model for {commodity} in {market}.")
+            path = MODELS_DIR / entry["file"]
+        else:
+            key, path = DEFAULT_KEY, DEFAULT_MODEL_PATH
+
+        cached = _models.get(key)
+        if cached is not None:
+            _models.move_to_end(key)
+            return cached[0]
+
+        try:
+            model, nbytes = _load(path)
+        except FileNotFoundError:
+            raise ModelNotFoundError(f"Model file not found at {path}")
+        _models[key] = (model, nbytes)
+        _cached_bytes += nbytes
+        _evict()
+        return model
+
+
+def cache_info() -> Dict[str, int]:
+    return {"models": len(_models), "bytes": _cached_bytes, "max_bytes": MAX_CACHE_BYTES}
+
+
+def is_loaded(market: Optional[str] = None, commodity: Optional[str] = None) -> bool:
+    key = series_key(market, commodity) if market and commodity else DEFAULT_KEY
+    return key in _models
@@ -0,0 +1,300 @@
+# backend/app/services/nearby_price_service.py
+"""
+Best modal price for a commodity among the markets within a radius.
+
+Two structures, both built at data load and extended as parts are ingested:
+
+* a latest-price index: for every (commodity, market) pair, the modal price on
+  the most recent arrival date (the best variety when a day has several),
+  kept as flat arrays sorted by (commodity, market) so one commodity is a
+  contiguous slice;
+* a KD-tree over the unit-sphere coordinates of the geocoded markets, so a
+  radius query is one ``query_ball_point`` call.
+
+A query intersects the markets in the radius with the commodity's slice
+(``searchsorted``), then ranks by price.
+
+Markets are geocoded from ``market_coordinates.csv`` (State, District, Market,
+Latitude, Longitude) and then from the city gazetteer: by the exact market name,
+then by the name without a parenthesized suffix (``Pune(Pimpri)`` -> ``Pune``),
+then by district name. Only exact matches are precise; the other two are
+flagged ``approximate``. Markets that resolve to none are left out of the
+spatial index.
+"""
+import copy
+import csv
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import data_store, location_search_service
+from app.services.location_search_service import EARTH_RADIUS_KM, _to_unit_vectors, fold
+
+COORDINATES_FILE = Path(__file__).resolve().parents[1] / 'data' / 'market_coordinates.csv'
+SOURCE_DATASETS = ("training", "live")
+
+logger = logging.getLogger(__name__)
+
+
+# --- Geocoding ---
+def _market_key(name: str) -> str:
+    """Folded market name without suffixes like '(Uzhavar Sandhai )'."""
+    return fold(re.sub(r'\(.*?\)', ' ', name))
+
+
+class _Geocoder:
+    def __init__(self):
+        self.markets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        # Keyed by the name without its suffix; only used for approximate matches.
+        self.base_markets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.districts: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        try:
+            with open(COORDINATES_FILE, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+        except FileNotFoundError:
+            rows = []
+        district_points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        for row in rows:
+            try:
+                point = (float(row["Latitude"]), float(row["Longitude"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            state, market = fold(row.get("State") or ""), row.get("Market") or ""
+            self.markets[(state, fold(market))] = point
+            self.base_markets.setdefault((state, _market_key(market)), point)
+            district_points.setdefault((state, fold(row.get("District") or "")), []).append(point)
+        # A district's markets are close together; their centroid stands in for the district.
+        self.districts = {
+            key: (float(np.mean([p[0] for p in points])), float(np.mean([p[1] for p in points])))
+            for key, points in district_points.items()
+        }
+        self.gazetteer = location_search_service.get_index()
+
+    def _gazetteer_point(self, state: str, name: str) -> Optional[Tuple[float, float]]:
+        if self.gazetteer is None or not name:
+            return None
+        matches = [self.gazetteer.entries[i] for i in self.gazetteer.exact.get(name, [])]
+        for entry in matches:
+            if fold(entry["state"] or "") == state:
+                return entry["lat"], entry["lon"]
+        return None
+
+    def locate(self, state: str, district: str, market: str) -> Optional[Tuple[float, float, bool]]:
+        """(lat, lon, approximate) for a market, or None when it can't be placed."""
+        state, district, base, market = fold(state), fold(district), _market_key(market), fold(market)
+        point = self.markets.get((state, market)) or self._gazetteer_point(state, market)
+        if point is not None:
+            return point[0], point[1], False
+        # A suffixed market ('Pune(Pimpri)') is only somewhere near its base name's location.
+        point = (
+            self.base_markets.get((state, base))
+            or (self._gazetteer_point(state, base) if base != market else None)
+            or self.districts.get((state, district))
+            or self._gazetteer_point(state, district)
+        )
+        if point is not None:
+            return point[0], point[1], True
+        return None
+
+
+# --- Index ---
+def _latest_per_pair(commodity, market, day, modal, variety) -> Tuple[np.ndarray, ...]:
+    """Keeps one row per (commodity, market): the latest day, and on that day the highest price."""
+    order = np.lexsort((modal, day, market, commodity))
+    commodity, market = commodity[order], market[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (commodity[1:] != commodity[:-1]) | (market[1:] != market[:-1])
+    return commodity[last], market[last], day[order][last], modal[order][last], variety[order][last]
+
+
+class NearbyPriceIndex:
+    def __init__(self, tables: Sequence[data_store.ColumnarTable] = ()):
+        self._geocoder = _Geocoder()
+        self.markets: List[Tuple[str, str, str]] = []
+        self._market_ids: Dict[Tuple[str, str, str], int] = {}
+        self.commodities: List[str] = []
+        self._commodity_ids: Dict[str, int] = {}
+
+        # Per market id; NaN when not geocoded.
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        self.approximate = np.empty(0, dtype=bool)
+        self.tree = None
+        self._tree_markets = np.empty(0, dtype=np.int64)
+
+        # Latest price per (commodity, market), sorted by (commodity, market).
+        self.commodity = np.empty(0, dtype=np.int64)
+        self.market = np.empty(0, dtype=np.int64)
+        self.day = np.empty(0, dtype='datetime64[D]')
+        self.modal = np.empty(0)
+        self.variety = np.empty(0, dtype=object)
+        self.add_tables(tables)
+
+    def copy(self) -> "NearbyPriceIndex":
+        """A copy that can be extended without disturbing readers of this one."""
+        index = copy.copy(self)
+        index.markets = list(self.markets)
+        index._market_ids = dict(self._market_ids)
+        index.commodities = list(self.commodities)
+        index._commodity_ids = dict(self._commodity_ids)
+        return index
+
+    def _market_column(self, table: data_store.ColumnarTable) -> np.ndarray:
+        """Global market ids for a table's rows (-1 where the market is missing)."""
+        names = [table.categories(col) for col in ('state', 'district', 'market')]
+        triples, inverse = np.unique(
+            np.stack([table.codes(col) for col in ('state', 'district', 'market')], axis=1),
+            axis=0, return_inverse=True,
+        )
+        mapping = np.full(len(triples), -1, dtype=np.int64)
+        for i, (s, d, m) in enumerate(triples.tolist()):
+            if m < 0:
+                continue
+            key = (names[0][s] if s >= 0 else "", names[1][d] if d >= 0 else "", names[2][m])
+            market_id = self._market_ids.get(key)
+            if market_id is None:
+                market_id = self._market_ids[key] = len(self.markets)
+                self.markets.append(key)
+            mapping[i] = market_id
+        return mapping[inverse.reshape(-1)]
+
+    def _commodity_column(self, table: data_store.ColumnarTable) -> np.ndarray:
+        mapping = np.empty(len(table.categories('commodity')) + 1, dtype=np.int64)
+        for code, name in enumerate(table.categories('commodity')):
+            key = fold(name)
+            if key not in self._commodity_ids:
+                self._commodity_ids[key] = len(self.commodities)
+                self.commodities.append(name)
+            mapping[code] = self._commodity_ids[key]
+        mapping[-1] = -1
+        return mapping[table.codes('commodity')]
+
+    def add_tables(self, tables: Sequence[data_store.ColumnarTable]) -> None:
+        """Folds the rows of `tables` into the latest-price index and places any new markets."""
+        known_markets = len(self.markets)
+        required = ('state', 'district', 'market', 'commodity', 'variety', 'arrival_date', 'modal_price')
+        batches = []
+        for table in tables:
+            if table.empty or any(col not in table for col in required):
+                continue
+            market = self._market_column(table)
+            commodity = self._commodity_column(table)
+            day = np.asarray(table.column('arrival_date'))
+            modal = np.asarray(table.column('modal_price'), dtype=np.float64)
+            valid = (market >= 0) & (commodity >= 0) & ~np.isnat(day) & (modal > 0)
+            variety = table.decode('variety', np.flatnonzero(valid))
+            batches.append((commodity[valid], market[valid], day[valid], modal[valid], variety))
+
+        if batches:
+            columns = [
+                np.concatenate([old, *(batch[i] for batch in batches)])
+                for i, old in enumerate((self.commodity, self.market, self.day, self.modal, self.variety))
+            ]
+            self.commodity, self.market, self.day, self.modal, self.variety = _latest_per_pair(*columns)
+
+        if len(self.markets) > known_markets:
+            self._place_markets(known_markets)
+
+    def _place_markets(self, start: int) -> None:
+        placed = [self._geocoder.locate(*key) for key in self.markets[start:]]
+        self.lat = np.concatenate([self.lat, [p[0] if p else np.nan for p in placed]])
+        self.lon = np.concatenate([self.lon, [p[1] if p else np.nan for p in placed]])
+        self.approximate = np.concatenate([self.approximate, [bool(p and p[2]) for p in placed]])
+        if not any(placed) and self.tree is not None:
+            return
+
+        self._tree_markets = np.flatnonzero(~np.isnan(self.lat))
+        self.tree = None
+        if len(self._tree_markets):
+            from scipy.spatial import cKDTree
+
+            self.tree = cKDTree(_to_unit_vectors(self.lat[self._tree_markets], self.lon[self._tree_markets]))
+
+    @property
+    def geocoded_markets(self) -> int:
+        return len(self._tree_markets)
+
+    def best_nearby(self, commodity: str, lat: float, lon: float, radius_km: float, limit: int = 20) -> Optional[Dict]:
+        """Markets within `radius_km` ranked by their latest modal price; None for an unknown commodity."""
+        commodity_id = self._commodity_ids.get(fold(commodity))
+        if commodity_id is None:
+            return None
+        result = {
+            "commodity": self.commodities[commodity_id],
+            "latitude": lat,
+            "longitude": lon,
+            "radius_km": radius_km,
+            "total": 0,
+            "results": [],
+        }
+        if self.tree is None:
+            return result
+
+        origin = _to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        # Great-circle radius -> straight-line (chord) radius on the unit sphere.
+        chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+        in_radius = np.asarray(self.tree.query_ball_point(origin, chord), dtype=np.int64)
+        if not len(in_radius):
+            return result
+
+        # This commodity's rows are one slice, sorted by market id.
+        lo, hi = np.searchsorted(self.commodity, [commodity_id, commodity_id + 1])
+        priced = self.market[lo:hi]
+        if not len(priced):
+            return result
+        nearby = np.sort(self._tree_markets[in_radius])
+        pos = np.minimum(np.searchsorted(priced, nearby), len(priced) - 1)
+        hit = priced[pos] == nearby
+        rows, markets = lo + pos[hit], nearby[hit]
+        if not len(rows):
+            return result
+
+        points = _to_unit_vectors(self.lat[markets], self.lon[markets])
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.linalg.norm(points - origin, axis=1) / 2, 0.0, 1.0))
+        # Highest price first; the nearer market wins a tie.
+        order = np.lexsort((distances, -self.modal[rows]))[:limit]
+
+        result["total"] = int(len(rows))
+        for i in order.tolist():
+            row, market_id = rows[i], markets[i]
+            state, district, market = self.markets[market_id]
+            result["results"].append({
+                "state": state,
+                "district": district,
+                "market": market,
+                "latitude": float(self.lat[market_id]),
+                "longitude": float(self.lon[market_id]),
+                "approximate": bool(self.approximate[market_id]),
+                "distance_km": round(float(distances[i]), 2),
+                "modal_price": float(self.modal[row]),
+                "variety": self.variety[row],
+                "arrival_date": str(self.day[row]),
+            })
+        return result
+
+
+def _build(tables, parts: List[data_store.ColumnarTable]) -> NearbyPriceIndex:
+    index = NearbyPriceIndex([*tables, *parts])
+    logger.info("Nearby price index built (%d markets, %d geocoded)", len(index.markets), index.geocoded_markets)
+    return index
+
+
+def _merge_parts(index: NearbyPriceIndex, parts: List[data_store.ColumnarTable]) -> NearbyPriceIndex:
+    index = index.copy()
+    index.add_tables(parts)
+    return index
+
+
+_index = data_store.DerivedIndex(SOURCE_DATASETS, _build, _merge_parts)
+
+
+def get_index() -> NearbyPriceIndex:
+    """Returns the index, rebuilt when a source table changes and extended as parts are ingested."""
+    return _index.get()
+
+
+def is_loaded() -> bool:
+    return _index.loaded
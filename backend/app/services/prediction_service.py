@@ -1,58 +1,123 @@
-import pickle
-import pandas as pd
-from pathlib import Path
-from typing import List, Dict
-
-# --- 1. Robust Model Path Loading ---
-# This new method dynamically finds the model file, making it much more reliable.
-model = None
-model_path_str = ""
-try:
-    # This assumes this script is in backend/app/services/
-    # It navigates up three parent directories to find the project root.
-    PROJECT_ROOT = Path(__file__).resolve().parents[3]
-    MODEL_PATH = PROJECT_ROOT / 'backend' / 'app' / 'ml' / 'price_model_rf.pkl'
-    model_path_str = str(MODEL_PATH)
-
-    with open(MODEL_PATH, 'rb') as f:
-        model = pickle.load(f)
-    print("✅ Prediction model loaded successfully.")
-except FileNotFoundError:
-    print(f" ERROR: Model file not found at the calculated path: {model_path_str}")
-    model = None
-except Exception as e:
-    print(f" An error occurred while loading the model: {e}")
-    model = None
-
-
-def predict_future_prices(periods: int) -> List[Dict]:
+import logging
+import weakref
+from datetime import date
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services import metrics, model_registry
+from app.services.cache import TTLCache
+
+# Longest forecast served by /api/predict/price; the daily table covers this horizon.
+MAX_HORIZON_DAYS = 24
+# Upper bound on the number of days a single batch request may expand to.
+MAX_BATCH_DAYS = 5000
+
+# (series, day) -> (weakref to model, dates, prices). The weakref ties a table to
+# the exact model object, so a retrained or evicted model never serves old values.
+_forecast_tables = TTLCache(ttl=24 * 3600, maxsize=4096)
+metrics.register_cache("forecast_tables", _forecast_tables)
+
+MODEL_NOT_LOADED = "Model is not loaded. Check the backend server's terminal for detailed errors."
+
+logger = logging.getLogger(__name__)
+
+def _get_model(market: Optional[str], commodity: Optional[str]):
+    """Returns (model, None) or (None, error dict) in the shape the router expects."""
+    try:
+        return model_registry.get_model(market, commodity), None
+    except model_registry.ModelNotFoundError as e:
+        if market and commodity:
+            return None, {"error": str(e), "status_code": 404}
+        # This error is sent back to the frontend if the default model is missing.
+        logger.error("Default model unavailable: %s", e)
+        return None, {"error": MODEL_NOT_LOADED}
+    except Exception:
+        logger.exception("An error occurred while loading the model")
+        return None, {"error": MODEL_NOT_LOADED}
+
+
+def predict_for_dates(model, days: np.ndarray) -> np.ndarray:
+    """
+    Predicts prices for an array of datetime64[D] days with a single model.predict call.
+    The models only use (year, month), so each distinct month is predicted once and
+    broadcast back to the requested days.
+    """
+    months = days.astype('datetime64[M]')
+    unique_months, inverse = np.unique(months, return_inverse=True)
+    month_numbers = unique_months.astype(np.int64)
+    features = np.column_stack([1970 + month_numbers // 12, month_numbers % 12 + 1])
+    return np.round(model.predict(features), 2)[inverse]
+
+
+def _daily_table(key: Tuple, model) -> Tuple[np.ndarray, np.ndarray]:
+    """Forecast for today .. today + MAX_HORIZON_DAYS, computed once per model per day."""
+    entry = _forecast_tables.get(key)
+    if entry is not None and entry[0]() is model:
+        return entry[1], entry[2]
+    days = np.datetime64(key[-1], 'D') + np.arange(MAX_HORIZON_DAYS)
+    prices = predict_for_dates(model, days)
+    _forecast_tables.set(key, (weakref.ref(model), days, prices))
+    return days, prices
+
+
+def _format(days: np.ndarray, prices: np.ndarray) -> List[Dict]:
+    return [
+        {"date": str(day), "predicted_price": price}
+        for day, price in zip(days.tolist(), prices.tolist())
+    ]
+
+
+def predict_future_prices(periods: int, market: Optional[str] = None, commodity: Optional[str] = None) -> List[Dict]:
     """
     Predicts prices for a given number of future days.
+    Uses the (market, commodity) model from the registry, or the default model
+    when no series is given. Answers are sliced from the day's precomputed table.
     """
-    if model is None:
-        # This error is sent back to the frontend if the model didn't load on startup.
-        return [{"error": "Model is not loaded. Check the backend server's terminal for detailed errors."}]
-
-    # --- 2. Daily Prediction Logic ---
-    # This now generates a forecast for the next 'n' days, not months.
-    today = pd.to_datetime('today').normalize() # Use normalize() to get the date at midnight
-    future_dates = pd.date_range(start=today, periods=periods, freq='D')
-    
-    # Create the features (year, month) that the model was trained on
-    future_features = pd.DataFrame({
-        'year': future_dates.year,
-        'month': future_dates.month
-    })
-
-    # Make predictions using the loaded model
-    future_predictions = model.predict(future_features)
-
-    # Format the results into a clean list of dictionaries
-    results = []
-    for date, price in zip(future_dates, future_predictions):
-        results.append({
-            "date": date.strftime('%Y-%m-%d'),
-            "predicted_price": round(price, 2)
-        })
-        
-    return results
\ No newline at end of file
+    model, error = _get_model(market, commodity)
+    if error:
+        return [error]
+
+    series = model_registry.series_key(market, commodity) if market and commodity else model_registry.DEFAULT_KEY
+    days, prices = _daily_table((series, date.today().isoformat()), model)
+    return _format(days[:periods], prices[:periods])
+
+
+def predict_batch(
+    dates: List[date],
+    ranges: List[Tuple[date, date]],
+    market: Optional[str] = None,
+    commodity: Optional[str] = None,
+) -> Dict:
+    """
+    Answers many target dates and inclusive date ranges with one vectorized predict call.
+    Returns {"error": ...} on failure.
+    """
+    model, error = _get_model(market, commodity)
+    if error:
+        return error
+
+    # Size the batch from the range bounds before allocating any day arrays.
+    total_days = len(dates) + sum(max(0, (end - start).days + 1) for start, end in ranges)
+    if total_days > MAX_BATCH_DAYS:
+        return {"error": f"Batch expands to {total_days} days; the limit is {MAX_BATCH_DAYS}.", "status_code": 400}
+
+    requested_days = [np.array(dates, dtype='datetime64[D]')]
+    bounds = []
+    offset = len(dates)
+    for start, end in ranges:
+        span = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+        requested_days.append(span)
+        bounds.append((offset, offset + len(span)))
+        offset += len(span)
+
+    days = np.concatenate(requested_days) if offset else np.array([], dtype='datetime64[D]')
+    prices = predict_for_dates(model, days) if offset else np.array([])
+
+    return {
+        "dates": _format(days[:len(dates)], prices[:len(dates)]),
+        "ranges": [
+            {"start": start.isoformat(), "end": end.isoformat(), "predictions": _format(days[lo:hi], prices[lo:hi])}
+            for (start, end), (lo, hi) in zip(ranges, bounds)
+        ],
+    }
@@ -0,0 +1,196 @@
+# backend/app/services/prefetch_service.py
+"""
+Keeps the caches of popular markets and forecast cells warm.
+
+The prices and weather routers report each request here. Popularity is a
+request count that decays with a half-life of PREFETCH_HALF_LIFE seconds, kept
+per market and per snapped weather cell (O(1) per request, bounded to
+PREFETCH_MAX_TRACKED keys each).
+
+A background task started from the app lifespan wakes every
+PREFETCH_INTERVAL seconds (with up to PREFETCH_JITTER seconds of random
+spread). It takes the PREFETCH_TOP_MARKETS / PREFETCH_TOP_CELLS hottest keys
+whose score is at least PREFETCH_MIN_SCORE and refreshes those that are missing
+from their cache or would expire before the next pass. Refreshes go through the
+services' normal fetch paths (Agmarknet look-back, Open-Meteo multi-coordinate
+batches), at most PREFETCH_CONCURRENCY at a time, each delayed by a random
+jitter so upstreams see a trickle rather than a burst.
+
+Disable with PREFETCH_ENABLED=0. Popularity and scheduling are per worker.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import random
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.services import agmarknet_service, metrics, weather_service
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1").lower() in ("1", "true", "yes")
+INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL", "300"))
+JITTER_SECONDS = float(os.getenv("PREFETCH_JITTER", "30"))
+HALF_LIFE_SECONDS = float(os.getenv("PREFETCH_HALF_LIFE", "3600"))
+MIN_SCORE = float(os.getenv("PREFETCH_MIN_SCORE", "2"))
+TOP_MARKETS = int(os.getenv("PREFETCH_TOP_MARKETS", "25"))
+TOP_CELLS = int(os.getenv("PREFETCH_TOP_CELLS", "100"))
+CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+MAX_TRACKED = int(os.getenv("PREFETCH_MAX_TRACKED", "10000"))
+RETRY_SECONDS = float(os.getenv("PREFETCH_RETRY", "1800"))
+
+logger = logging.getLogger(__name__)
+
+prefetches = metrics.Counter("prefetch_refreshes_total", "Background cache refreshes by kind and outcome.", ("kind", "outcome"))
+
+
+class DecayingCounter:
+    """Per-key request counts that halve every `half_life` seconds."""
+
+    def __init__(self, half_life: float, maxsize: int):
+        self._decay = math.log(2) / half_life
+        self.maxsize = maxsize
+        # key -> (score, time it was last brought up to date)
+        self._scores: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._scores
+
+    def _decayed(self, entry: Tuple[float, float], now: float) -> float:
+        score, updated = entry
+        return score * math.exp(-self._decay * (now - updated))
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        entry = self._scores.get(key)
+        self._scores[key] = ((self._decayed(entry, now) if entry else 0.0) + 1.0, now)
+        if len(self._scores) > self.maxsize:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        # Drop the coldest tenth in one pass, so pruning is rare.
+        keep = heapq.nlargest(int(self.maxsize * 0.9), self._scores.items(), key=lambda item: self._decayed(item[1], now))
+        self._scores = dict(keep)
+
+    def top(self, n: int, min_score: float = 0.0, now: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """The `n` hottest keys with a score of at least `min_score`, hottest first."""
+        now = time.monotonic() if now is None else now
+        scored = ((key, self._decayed(entry, now)) for key, entry in self._scores.items())
+        return heapq.nlargest(n, (item for item in scored if item[1] >= min_score), key=lambda item: item[1])
+
+
+_markets = DecayingCounter(HALF_LIFE_SECONDS, MAX_TRACKED)
+_cells = DecayingCounter(HALF_LIFE_SECONDS, MAX_TRACKED)
+# market key -> spelling of the last request, which is what the upstream is queried with
+_market_names: Dict[Hashable, Tuple[str, str, str]] = {}
+# key -> (time of the last refresh attempt, whether it produced data)
+_attempts: Dict[Hashable, Tuple[float, bool]] = {}
+
+
+def _forget_untracked() -> None:
+    """Drops names and attempts of keys the counters have pruned."""
+    global _market_names, _attempts
+    _market_names = {key: names for key, names in _market_names.items() if key in _markets}
+    _attempts = {key: attempt for key, attempt in _attempts.items() if key in _markets or key in _cells}
+
+
+def record_market(state: str, district: str, market: str) -> None:
+    """Counts a live-price request for a market."""
+    key = agmarknet_service.market_key(state, district, market)
+    _markets.hit(key)
+    _market_names[key] = (state.strip(), district.strip(), market.strip())
+    if len(_market_names) > MAX_TRACKED:
+        _forget_untracked()
+
+
+def record_coordinate(latitude: float, longitude: float) -> None:
+    """Counts a forecast request for the grid cell containing the location."""
+    _cells.hit(weather_service.snap_to_grid(latitude, longitude))
+    if len(_attempts) > 2 * MAX_TRACKED:
+        _forget_untracked()
+
+
+def _record_attempt(key: Hashable, succeeded: bool) -> None:
+    _attempts[key] = (time.monotonic(), succeeded)
+
+
+def _fresh(expires_in: Optional[float]) -> bool:
+    # Cached, and will not expire before the next pass (and its jittered refresh) gets to it.
+    return expires_in is not None and expires_in >= INTERVAL_SECONDS + 2 * JITTER_SECONDS
+
+
+def _due(key: Hashable, expires_in: Optional[float], now: Optional[float] = None) -> bool:
+    if _fresh(expires_in):
+        return False
+    attempt = _attempts.get(key)
+    if attempt is None or attempt[1]:
+        return True
+    # The last refresh came back empty or failed; don't ask again on every pass.
+    now = time.monotonic() if now is None else now
+    return now - attempt[0] >= RETRY_SECONDS
+
+
+async def _refresh_market(semaphore: asyncio.Semaphore, key: Hashable) -> None:
+    state, district, market = _market_names[key]
+    await asyncio.sleep(random.uniform(0, JITTER_SECONDS))
+    async with semaphore:
+        try:
+            records = await agmarknet_service.refresh_prices(state, district, market)
+        except Exception:
+            logger.exception("Price prefetch failed", extra={"market": market})
+            prefetches.inc("prices", "error")
+            _record_attempt(key, False)
+            return
+    prefetches.inc("prices", "ok" if records else "empty")
+    _record_attempt(key, bool(records))
+
+
+async def _refresh_cells(semaphore: asyncio.Semaphore, cells: List[Tuple[float, float]]) -> None:
+    await asyncio.sleep(random.uniform(0, JITTER_SECONDS))
+    async with semaphore:
+        try:
+            refreshed = await weather_service.refresh_forecasts(cells)
+        except Exception:
+            logger.exception("Weather prefetch failed", extra={"cells": len(cells)})
+            prefetches.inc("weather", "error", amount=len(cells))
+        else:
+            prefetches.inc("weather", "ok", amount=refreshed)
+            if refreshed < len(cells):
+                prefetches.inc("weather", "error", amount=len(cells) - refreshed)
+    for cell in cells:
+        # Only the cells the batch actually stored come back fresh.
+        _record_attempt(cell, _fresh(await weather_service.cache_expires_in(cell)))
+
+
+async def prefetch_once() -> Dict[str, int]:
+    """One pass: refreshes the hot markets and cells that are due. Returns how many of each were scheduled."""
+    now = time.monotonic()
+    markets = [
+        key for key, _ in _markets.top(TOP_MARKETS, MIN_SCORE)
+        if key in _market_names and _due(key, await agmarknet_service.cache_expires_in(*_market_names[key]), now)
+    ]
+    cells = [key for key, _ in _cells.top(TOP_CELLS, MIN_SCORE) if _due(key, await weather_service.cache_expires_in(key), now)]
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    jobs = [_refresh_market(semaphore, key) for key in markets]
+    # Cells are refreshed in upstream-sized multi-coordinate batches.
+    batch = weather_service.BATCH_SIZE
+    jobs += [_refresh_cells(semaphore, cells[i:i + batch]) for i in range(0, len(cells), batch)]
+    if jobs:
+        await asyncio.gather(*jobs)
+        logger.info("Prefetch pass finished", extra={"markets": len(markets), "cells": len(cells)})
+    return {"markets": len(markets), "cells": len(cells)}
+
+
+async def run() -> None:
+    """Runs prefetch passes until cancelled."""
+    while True:
+        await asyncio.sleep(INTERVAL_SECONDS + random.uniform(0, JITTER_SECONDS))
+        try:
+            await prefetch_once()
+        except Exception:
+            logger.exception("Prefetch pass failed")
@@ -0,0 +1,209 @@
+# backend/app/services/price_history_service.py
+"""
+Resampled price histories per (market, commodity), sized for charts.
+
+At data load every row is assigned a series id (folded market + commodity) and
+the rows are stored as flat arrays sorted by (series, day), with an offsets
+array marking where each series starts. A request slices its series directly,
+narrows it to the date range with ``searchsorted``, resamples to day, week or
+month with grouped reductions (the slice is already in day order), and, if that
+leaves more periods than the point budget, downsamples with
+Largest-Triangle-Three-Buckets. The work and the response size depend on the
+series and the budget, not on the size of the whole history.
+
+Ingested parts are merged into a copy of the index as they appear: the new rows
+are sorted on their own and inserted into the existing order, so an append
+costs a linear merge rather than a re-sort of the whole history.
+"""
+import copy
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import data_store
+from app.services.analytics_service import period_index, period_start
+from app.services.location_search_service import fold
+
+SOURCE_DATASETS = ("training", "live")
+DEFAULT_POINTS = 500
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the
+    visual shape of (x, y). The first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold - 2 buckets between the fixed end points
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # The next bucket's average point stands in for the not-yet-chosen third vertex.
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - y[previous])
+        )
+        previous = lo + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+class PriceHistoryIndex:
+    def __init__(self, tables: Sequence[data_store.ColumnarTable] = ()):
+        self.names: List[Tuple[str, str]] = []
+        self._series_ids: Dict[Tuple[str, str], int] = {}
+        self.series = np.empty(0, dtype=np.int64)
+        self.day = np.empty(0, dtype=np.int64)
+        self.modal = np.empty(0)
+        self.min_price = np.empty(0)
+        self.max_price = np.empty(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.add_tables(tables)
+
+    def copy(self) -> "PriceHistoryIndex":
+        """A copy that can be extended without disturbing readers of this one."""
+        index = copy.copy(self)
+        index.names = list(self.names)
+        index._series_ids = dict(self._series_ids)
+        return index
+
+    def _series_column(self, table: data_store.ColumnarTable) -> np.ndarray:
+        """Series ids for a table's rows (-1 where market or commodity is missing)."""
+        markets, commodities = table.categories('market'), table.categories('commodity')
+        pairs, inverse = np.unique(
+            np.stack([table.codes('market'), table.codes('commodity')], axis=1), axis=0, return_inverse=True,
+        )
+        mapping = np.full(len(pairs), -1, dtype=np.int64)
+        for i, (m, c) in enumerate(pairs.tolist()):
+            if m < 0 or c < 0:
+                continue
+            key = (fold(markets[m]), fold(commodities[c]))
+            series_id = self._series_ids.get(key)
+            if series_id is None:
+                series_id = self._series_ids[key] = len(self.names)
+                self.names.append((markets[m], commodities[c]))
+            mapping[i] = series_id
+        return mapping[inverse.reshape(-1)]
+
+    @staticmethod
+    def _sort_key(series: np.ndarray, day: np.ndarray) -> np.ndarray:
+        # One int64 ordering (series, day): day numbers fit comfortably in 32 bits.
+        return (series << 32) + (day + (1 << 31))
+
+    def add_tables(self, tables: Sequence[data_store.ColumnarTable]) -> None:
+        """
+        Adds the rows of `tables`. Only the new rows are sorted; they are then
+        merged into the existing (series, day) order in one linear pass.
+        """
+        required = ('market', 'commodity', 'arrival_date', 'min_price', 'max_price', 'modal_price')
+        batches = []
+        for table in tables:
+            if table.empty or any(col not in table for col in required):
+                continue
+            series = self._series_column(table)
+            days = np.asarray(table.column('arrival_date'))
+            modal = np.asarray(table.column('modal_price'), dtype=np.float64)
+            valid = (series >= 0) & ~np.isnat(days) & np.isfinite(modal)
+            batches.append((
+                series[valid],
+                days[valid].astype('datetime64[D]').astype(np.int64),
+                modal[valid],
+                np.asarray(table.column('min_price'), dtype=np.float64)[valid],
+                np.asarray(table.column('max_price'), dtype=np.float64)[valid],
+            ))
+        if batches:
+            new = [np.concatenate([batch[i] for batch in batches]) for i in range(5)]
+            order = np.lexsort((new[1], new[0]))
+            new = [column[order] for column in new]
+            # New rows go after existing rows with the same (series, day).
+            at = np.searchsorted(self._sort_key(self.series, self.day), self._sort_key(new[0], new[1]), side='right')
+            self.series, self.day, self.modal, self.min_price, self.max_price = (
+                np.insert(old, at, added)
+                for old, added in zip((self.series, self.day, self.modal, self.min_price, self.max_price), new)
+            )
+        self.offsets = np.searchsorted(self.series, np.arange(len(self.names) + 1))
+
+    def history(
+        self,
+        market: str,
+        commodity: str,
+        grain: str = "day",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        points: int = DEFAULT_POINTS,
+    ) -> Optional[Dict]:
+        """The resampled, downsampled series; None when the pair has no history."""
+        series_id = self._series_ids.get((fold(market), fold(commodity)))
+        if series_id is None:
+            return None
+        base = int(self.offsets[series_id])
+        days = self.day[base:int(self.offsets[series_id + 1])]
+        # Days are sorted within the series, so the date range is another slice.
+        lo = base + (int(np.searchsorted(days, np.datetime64(start, 'D').astype(np.int64))) if start else 0)
+        hi = base + (int(np.searchsorted(days, np.datetime64(end, 'D').astype(np.int64), side='right')) if end else len(days))
+        market_name, commodity_name = self.names[series_id]
+        result = {
+            "market": market_name,
+            "commodity": commodity_name,
+            "grain": grain,
+            "from": start.isoformat() if start else None,
+            "to": end.isoformat() if end else None,
+            "total_periods": 0,
+            "points": [],
+        }
+        if hi <= lo:
+            return result
+
+        periods = period_index(self.day[lo:hi].astype('datetime64[D]'), grain)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        count = np.diff(np.r_[starts, len(periods)])
+        modal = np.add.reduceat(self.modal[lo:hi], starts) / count
+        min_price = np.fmin.reduceat(self.min_price[lo:hi], starts)
+        max_price = np.fmax.reduceat(self.max_price[lo:hi], starts)
+        periods = periods[starts]
+
+        keep = lttb(periods.astype(np.float64), modal, points)
+        dates = period_start(periods[keep], grain).astype(str)
+        result["total_periods"] = int(len(periods))
+        result["points"] = [
+            {
+                "date": d,
+                "modal_price": round(float(m), 2),
+                "min_price": None if np.isnan(lo_) else float(lo_),
+                "max_price": None if np.isnan(hi_) else float(hi_),
+                "count": int(c),
+            }
+            for d, m, lo_, hi_, c in zip(
+                dates.tolist(), modal[keep].tolist(), min_price[keep].tolist(), max_price[keep].tolist(), count[keep].tolist(),
+            )
+        ]
+        return result
+
+
+def _merge_parts(index: PriceHistoryIndex, parts: List[data_store.ColumnarTable]) -> PriceHistoryIndex:
+    index = index.copy()
+    index.add_tables(parts)
+    return index
+
+
+_index = data_store.DerivedIndex(
+    SOURCE_DATASETS, lambda tables, parts: PriceHistoryIndex([*tables, *parts]), _merge_parts,
+)
+
+
+def get_index() -> PriceHistoryIndex:
+    """Returns the index, rebuilt when a source table changes and extended as parts are ingested."""
+    return _index.get()
+
+
+def is_loaded() -> bool:
+    return _index.loaded
@@ -0,0 +1,66 @@
+# backend/app/services/pubsub.py
+"""
+In-process publish/subscribe hub used to push live data to dashboards.
+
+Every subscriber gets its own bounded queue. Publishing never blocks: when a slow
+subscriber's queue is full the oldest message is dropped (and counted), so one
+stalled client cannot hold up ingest or the other subscribers.
+"""
+import asyncio
+import os
+from typing import Any, Dict, Hashable, Set
+
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+ALL_TOPICS = "*"
+
+
+class Subscription:
+    def __init__(self, topic: Hashable, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message: Any) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+
+    def subscribe(self, topic: Hashable) -> Subscription:
+        """Subscribes to one topic, or to every topic with ALL_TOPICS."""
+        subscription = Subscription(topic)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.topic]
+
+    def publish(self, topic: Hashable, message: Any) -> int:
+        """Delivers to the topic's and the wildcard subscribers. Returns the number of deliveries."""
+        delivered = 0
+        for key in ((topic,) if topic == ALL_TOPICS else (topic, ALL_TOPICS)):
+            for subscription in self._subscribers.get(key, ()):
+                subscription.offer(message)
+                delivered += 1
+        return delivered
+
+    def subscriber_count(self, topic: Hashable) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+
+# Sensor readings, keyed by device_id
+sensor_hub = Hub()
+# Fired IoT alerts, keyed by device_id
+alert_hub = Hub()
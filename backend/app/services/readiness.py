@@ -0,0 +1,87 @@
+# backend/app/services/readiness.py
+"""
+Start-up state of the lazily initialized subsystems.
+
+Nothing heavy runs at import time: data tables, indexes and the default model are
+built on first use. Setting WARM_ON_STARTUP=1 warms them from the app's lifespan
+hook instead (in a worker thread, so the server starts accepting immediately),
+and GET /ready reports 503 until that has finished.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.services import (
+    analytics_service,
+    commodity_service,
+    data_store,
+    live_location_service,
+    location_search_service,
+    model_registry,
+    nearby_price_service,
+    price_history_service,
+)
+
+WARM_ON_STARTUP = os.getenv("WARM_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+# name -> (initializer, "is it loaded?" probe)
+SUBSYSTEMS: Dict[str, tuple] = {
+    "market_data": (
+        lambda: [data_store.get_table(name) for name in data_store.DATASETS],
+        lambda: all(data_store.is_loaded(name) for name in data_store.DATASETS),
+    ),
+    "live_locations": (live_location_service.get_live_index, live_location_service.is_loaded),
+    "commodity_categories": (commodity_service.categorize_commodities, commodity_service.is_loaded),
+    "location_search": (location_search_service.get_index, location_search_service.is_loaded),
+    "default_model": (model_registry.get_model, model_registry.is_loaded),
+    "price_cube": (analytics_service.get_cube, analytics_service.is_loaded),
+    "nearby_prices": (nearby_price_service.get_index, nearby_price_service.is_loaded),
+    "price_history": (price_history_service.get_index, price_history_service.is_loaded),
+}
+
+_lock = threading.Lock()
+_warm_results: Dict[str, Dict] = {}
+_warming = False
+
+
+def warm(names: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Initializes the given subsystems (default: all) and records how long each took."""
+    global _warming
+    _warming = True
+    try:
+        for name in names or list(SUBSYSTEMS):
+            initializer: Callable = SUBSYSTEMS[name][0]
+            started = time.perf_counter()
+            try:
+                initializer()
+                result = {"status": "ready"}
+            except Exception as e:
+                logger.exception("Warm-up of '%s' failed", name)
+                result = {"status": "failed", "error": str(e)}
+            result["seconds"] = round(time.perf_counter() - started, 4)
+            with _lock:
+                _warm_results[name] = result
+    finally:
+        _warming = False
+    return dict(_warm_results)
+
+
+def status() -> Dict:
+    """Readiness summary: ready unless a requested warm-up is still running or failed."""
+    subsystems = {}
+    for name, (_, probe) in SUBSYSTEMS.items():
+        entry = {"loaded": bool(probe())}
+        entry.update(_warm_results.get(name, {}))
+        subsystems[name] = entry
+
+    warmed = not WARM_ON_STARTUP or (not _warming and len(_warm_results) == len(SUBSYSTEMS))
+    failed = any(entry.get("status") == "failed" for entry in subsystems.values())
+    return {
+        "ready": warmed and not failed,
+        "warm_on_startup": WARM_ON_STARTUP,
+        "subsystems": subsystems,
+    }
@@ -0,0 +1,221 @@
+# backend/app/services/sensor_store.py
+"""
+Compact per-device time-series store for IoT sensor readings.
+
+Each device gets NumPy ring buffers that start small and double up to their
+retention, so memory per device is bounded no matter how often it posts and a
+device that has sent little costs little:
+
+* raw readings: float64 timestamps + one float32 column per sensor field,
+* 1-minute and 1-hour rollups: count / min / mean / max per field, updated
+  incrementally as readings arrive (the open bucket is kept as running sums).
+
+Retention is configurable with IOT_RAW_RETENTION (readings), IOT_MINUTE_RETENTION
+(1-minute buckets) and IOT_HOUR_RETENTION (1-hour buckets). At most
+IOT_MAX_DEVICES devices are kept; the one heard from least recently is dropped
+to make room for a new one.
+
+Buffers are kept in time order, so a reading older than the device's last one
+is dropped rather than recorded.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SENSOR_FIELDS = ("soil_moisture", "temperature", "humidity", "soil_fertility", "light_intensity")
+
+RAW_RETENTION = int(os.getenv("IOT_RAW_RETENTION", "2048"))
+MINUTE_RETENTION = int(os.getenv("IOT_MINUTE_RETENTION", str(24 * 60)))
+HOUR_RETENTION = int(os.getenv("IOT_HOUR_RETENTION", str(30 * 24)))
+MAX_DEVICES = int(os.getenv("IOT_MAX_DEVICES", "10000"))
+# Rows a ring buffer is first allocated with
+INITIAL_ROWS = 16
+
+RESOLUTIONS = {"1m": 60, "1h": 3600}
+
+
+class RingBuffer:
+    """
+    Rows of (timestamp, float32 values) up to `capacity`, oldest overwritten first.
+    Storage grows by doubling until it reaches `capacity`; only then does it wrap.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        rows = min(capacity, INITIAL_ROWS)
+        self.timestamps = np.zeros(rows, dtype=np.float64)
+        self.values = np.full((rows, width), np.nan, dtype=np.float32)
+        self.start = 0
+        self.size = 0
+
+    def _grow(self) -> None:
+        # Called only before the buffer has wrapped, so rows are still in slots 0..size-1.
+        rows = min(self.capacity, 2 * len(self.timestamps))
+        timestamps = np.zeros(rows, dtype=np.float64)
+        values = np.full((rows, self.values.shape[1]), np.nan, dtype=np.float32)
+        timestamps[:self.size], values[:self.size] = self.timestamps, self.values
+        self.timestamps, self.values = timestamps, values
+
+    def append(self, timestamp: float, row: np.ndarray) -> None:
+        if self.size == len(self.timestamps) < self.capacity:
+            self._grow()
+        slot = (self.start + self.size) % len(self.timestamps)
+        self.timestamps[slot] = timestamp
+        self.values[slot] = row
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def window(self, start: float, end: float):
+        """Rows with start <= timestamp <= end, in chronological order."""
+        order = (self.start + np.arange(self.size)) % len(self.timestamps)
+        timestamps = self.timestamps[order]
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+        rows = order[lo:hi]
+        return self.timestamps[rows], self.values[rows]
+
+
+class Rollup:
+    """Fixed-width time buckets with count/min/mean/max per field."""
+
+    def __init__(self, bucket_seconds: int, capacity: int, num_fields: int):
+        self.bucket_seconds = bucket_seconds
+        # Columns per field: count, min, mean, max
+        self.ring = RingBuffer(capacity, 4 * num_fields)
+        self.num_fields = num_fields
+        self.open_start: Optional[float] = None
+        self._count = np.zeros(num_fields, dtype=np.int64)
+        self._sum = np.zeros(num_fields, dtype=np.float64)
+        self._min = np.full(num_fields, np.inf)
+        self._max = np.full(num_fields, -np.inf)
+
+    def add(self, timestamp: float, row: np.ndarray) -> None:
+        bucket = math.floor(timestamp / self.bucket_seconds) * self.bucket_seconds
+        if self.open_start is not None and bucket != self.open_start:
+            self._flush()
+        self.open_start = bucket
+        present = ~np.isnan(row)
+        self._count += present
+        self._sum += np.where(present, row, 0.0)
+        self._min = np.where(present, np.minimum(self._min, row), self._min)
+        self._max = np.where(present, np.maximum(self._max, row), self._max)
+
+    def _open_row(self) -> np.ndarray:
+        has_data = self._count > 0
+        nan = np.full(self.num_fields, np.nan)
+        mean = np.divide(self._sum, self._count, out=nan.copy(), where=has_data)
+        return np.concatenate([
+            self._count,
+            np.where(has_data, self._min, nan),
+            mean,
+            np.where(has_data, self._max, nan),
+        ])
+
+    def _flush(self) -> None:
+        self.ring.append(self.open_start, self._open_row())
+        self._count[:] = 0
+        self._sum[:] = 0.0
+        self._min[:] = np.inf
+        self._max[:] = -np.inf
+
+    def window(self, start: float, end: float):
+        """Buckets overlapping [start, end], keyed by bucket start time."""
+        start = math.floor(start / self.bucket_seconds) * self.bucket_seconds
+        timestamps, rows = self.ring.window(start, end)
+        if self.open_start is not None and start <= self.open_start <= end:
+            timestamps = np.append(timestamps, self.open_start)
+            rows = np.vstack([rows, self._open_row().astype(np.float32)])
+        return timestamps, rows
+
+
+class DeviceSeries:
+    def __init__(self):
+        self.raw = RingBuffer(RAW_RETENTION, len(SENSOR_FIELDS))
+        self.rollups = {
+            "1m": Rollup(RESOLUTIONS["1m"], MINUTE_RETENTION, len(SENSOR_FIELDS)),
+            "1h": Rollup(RESOLUTIONS["1h"], HOUR_RETENTION, len(SENSOR_FIELDS)),
+        }
+        self.last_timestamp = -math.inf
+
+    def add(self, timestamp: float, row: np.ndarray) -> bool:
+        """Appends a reading; returns False (and stores nothing) if it is older than the last one."""
+        if timestamp < self.last_timestamp:
+            return False
+        self.last_timestamp = timestamp
+        self.raw.append(timestamp, row)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, row)
+        return True
+
+
+# Least recently heard from first
+_devices: "OrderedDict[str, DeviceSeries]" = OrderedDict()
+
+
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    return [None if math.isnan(v) else round(v, 3) for v in values.tolist()]
+
+
+def record_reading(device_id: str, values: Dict[str, Optional[float]], timestamp: Optional[float] = None) -> bool:
+    """
+    Appends one reading. Missing fields are stored as NaN and ignored by the rollups.
+    Returns False when the reading is out of order and was dropped.
+    """
+    row = np.array([np.nan if values.get(f) is None else values[f] for f in SENSOR_FIELDS], dtype=np.float64)
+    series = _devices.get(device_id)
+    if series is None:
+        series = _devices[device_id] = DeviceSeries()
+        while len(_devices) > MAX_DEVICES:
+            _devices.popitem(last=False)
+    else:
+        _devices.move_to_end(device_id)
+    return series.add(time.time() if timestamp is None else timestamp, row)
+
+
+def get_history(
+    device_id: str,
+    start: float,
+    end: float,
+    resolution: str = "1m",
+    fields: Sequence[str] = SENSOR_FIELDS,
+) -> Optional[Dict]:
+    """
+    Returns a columnar history for a device between `start` and `end` (epoch seconds).
+    `resolution` is "raw", "1m" or "1h"; rollups return min/mean/max per field.
+    Returns None for unknown devices.
+    """
+    series = _devices.get(device_id)
+    if series is None:
+        return None
+    columns = [SENSOR_FIELDS.index(f) for f in fields]
+
+    if resolution == "raw":
+        timestamps, rows = series.raw.window(start, end)
+        data = {f: _to_list(rows[:, col]) for f, col in zip(fields, columns)}
+    else:
+        timestamps, rows = series.rollups[resolution].window(start, end)
+        n = len(SENSOR_FIELDS)
+        data = {
+            f: {
+                "count": rows[:, col].astype(np.int64).tolist(),
+                "min": _to_list(rows[:, n + col]),
+                "mean": _to_list(rows[:, 2 * n + col]),
+                "max": _to_list(rows[:, 3 * n + col]),
+            }
+            for f, col in zip(fields, columns)
+        }
+
+    return {
+        "device_id": device_id,
+        "resolution": resolution,
+        "from": start,
+        "to": end,
+        "timestamps": timestamps.tolist(),
+        **data,
+    }
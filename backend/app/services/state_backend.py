@@ -0,0 +1,226 @@
+# backend/app/services/state_backend.py
+"""
+Pluggable key/value state shared by the uvicorn workers.
+
+* ``MemoryBackend`` (default): a per-process dict, fine for a single worker.
+* ``SQLiteBackend``: one SQLite database in WAL mode that every worker opens.
+  Reads are point lookups on a per-thread connection (tens of microseconds, and
+  WAL readers never wait for the writer). Writes are coalesced per key in memory
+  and flushed by a background thread in one transaction every
+  STATE_FLUSH_INTERVAL seconds, so a burst of readings costs one fsync. A worker
+  sees its own writes immediately; other workers see them after the next flush.
+
+Select with STATE_BACKEND=memory|sqlite; STATE_DB_PATH sets the database file.
+Values are JSON-serializable dicts; an optional ``expires_at`` (epoch seconds)
+lets the TTL caches share entries across workers. Coroutines read through
+``get_async`` so an SQLite query never runs on the event loop; ``set`` only
+queues the write and is safe to call anywhere.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'state', 'state.db'))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("STATE_FLUSH_INTERVAL", "0.05"))
+# Flush early once this many keys are waiting.
+MAX_PENDING = int(os.getenv("STATE_MAX_PENDING", "1000"))
+# Expired rows are deleted at most this often.
+PURGE_INTERVAL_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-process state. `shared` is False, so callers can skip work that only pays off across workers."""
+
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], Tuple[Any, Optional[float], float]] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._data.get((namespace, key))
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop((namespace, key), None)
+            return None
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: Optional[float] = None, updated_at: Optional[float] = None) -> None:
+        """Stores `value` unless the entry already holds a newer `updated_at` (default: now)."""
+        updated_at = time.time() if updated_at is None else updated_at
+        current = self._data.get((namespace, key))
+        if current is None or updated_at >= current[2]:
+            self._data[(namespace, key)] = (value, expires_at, updated_at)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        # (namespace, key) -> (json value, expires_at, updated_at); the newest write per key wins.
+        self._pending: Dict[Tuple[str, str], Tuple[str, Optional[float], float]] = {}
+        # The batch being written; still visible to this worker's reads until committed.
+        self._flushing: Dict[Tuple[str, str], Tuple[str, Optional[float], float]] = {}
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        conn.commit()
+
+        self._flusher = threading.Thread(target=self._run, name="state-flusher", daemon=True)
+        self._flusher.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Commits survive a crash of the process; only an OS crash can drop the last flush.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._pending_lock:
+            pending = self._pending.get((namespace, key)) or self._flushing.get((namespace, key))
+        if pending is not None:
+            value, expires_at, _ = pending
+        else:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            return None
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: Optional[float] = None, updated_at: Optional[float] = None) -> None:
+        """
+        Queues a write. With several workers writing the same key, the row with
+        the newest `updated_at` (default: now) is kept.
+        """
+        encoded = json.dumps(value, separators=(",", ":"), default=str)
+        updated_at = time.time() if updated_at is None else updated_at
+        with self._pending_lock:
+            current = self._pending.get((namespace, key))
+            if current is not None and current[2] > updated_at:
+                return
+            self._pending[(namespace, key)] = (encoded, expires_at, updated_at)
+            if len(self._pending) >= MAX_PENDING:
+                self._wake.set()
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+        conn = self._connection()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO kv (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (namespace, key) DO UPDATE SET"
+                    " value = excluded.value, expires_at = excluded.expires_at, updated_at = excluded.updated_at"
+                    " WHERE excluded.updated_at >= kv.updated_at",
+                    [(ns, key, value, expires_at, updated_at) for (ns, key), (value, expires_at, updated_at) in batch.items()],
+                )
+        except sqlite3.Error:
+            logger.exception("State flush failed; retrying %d keys", len(batch))
+            with self._pending_lock:
+                # Keep anything written since the batch was taken.
+                self._pending = {**batch, **self._pending}
+        finally:
+            with self._pending_lock:
+                self._flushing = {}
+
+    def _purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+                self._purge()
+            except Exception:
+                logger.exception("State flusher error")
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=5.0)
+        self.flush()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend selected by STATE_BACKEND, created on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STATE_BACKEND == "sqlite":
+                    _backend = SQLiteBackend(STATE_DB_PATH)
+                else:
+                    if STATE_BACKEND != "memory":
+                        logger.warning("Unknown STATE_BACKEND '%s'; using memory", STATE_BACKEND)
+                    _backend = MemoryBackend()
+    return _backend
+
+
+async def get_async(namespace: str, key: str) -> Optional[Any]:
+    """`get_backend().get` for coroutines; a shared backend is read in a worker thread."""
+    backend = get_backend()
+    if not backend.shared:
+        return backend.get(namespace, key)
+    return await asyncio.to_thread(backend.get, namespace, key)
+
+
+def close() -> None:
+    """Flushes pending writes. Called on application shutdown."""
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if backend is not None:
+        backend.close()
@@ -0,0 +1,94 @@
+# backend/app/services/static_payloads.py
+"""
+Pre-serialized responses for reference data that only changes with the data files.
+
+Each payload is encoded to JSON once per data version, gzipped once, and given
+a strong ETag (a hash of the bytes). Requests then cost a dictionary lookup and
+a header comparison: matching ``If-None-Match`` gets a bodiless 304, everything
+else gets the stored bytes with ``Cache-Control`` so CDNs and clients can reuse
+them. REFERENCE_CACHE_MAX_AGE sets the max-age in seconds (default 300).
+
+Services return the same cached list or dict until their data changes, so the
+content object itself serves as the data version: an identity check is enough
+to know when to re-encode.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+MAX_AGE_SECONDS = int(os.getenv("REFERENCE_CACHE_MAX_AGE", "300"))
+# Below this size gzip saves less than it costs the client to inflate.
+MIN_GZIP_BYTES = 512
+
+
+class EncodedPayload:
+    __slots__ = ("body", "gzipped", "etag", "gzip_etag")
+
+    def __init__(self, content: Any):
+        self.body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        if len(self.body) >= MIN_GZIP_BYTES:
+            # mtime=0 keeps the bytes (and so the ETag) identical across workers and restarts.
+            self.gzipped: Optional[bytes] = gzip.compress(self.body, compresslevel=9, mtime=0)
+            self.gzip_etag: Optional[str] = f'"{digest}-gzip"'
+        else:
+            self.gzipped = None
+            self.gzip_etag = None
+
+
+_lock = threading.Lock()
+_payloads: Dict[Hashable, Tuple[Any, EncodedPayload]] = {}
+
+
+def get_payload(key: Hashable, content: Any) -> EncodedPayload:
+    """Returns the encoded payload for `key`, re-encoding only when `content` is a different object."""
+    entry = _payloads.get(key)
+    if entry is not None and entry[0] is content:
+        return entry[1]
+    payload = EncodedPayload(content)
+    with _lock:
+        _payloads[key] = (content, payload)
+    return payload
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _matches(if_none_match: str, etags) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags if etag)
+
+
+def respond(request: Request, payload: EncodedPayload) -> Response:
+    """The payload as a conditional, cacheable response (304 when the client's copy is current)."""
+    use_gzip = payload.gzipped is not None and _accepts_gzip(request)
+    etag = payload.gzip_etag if use_gzip else payload.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MAX_AGE_SECONDS}",
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, (payload.etag, payload.gzip_etag)):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(payload.gzipped, media_type="application/json", headers=headers)
+    return Response(payload.body, media_type="application/json", headers=headers)
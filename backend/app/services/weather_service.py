@@ -1,63 +1,188 @@
-import openmeteo_requests
-import requests_cache
-from retry_requests import retry
-import pandas as pd
+# backend/app/services/weather_service.py
+"""
+Open-Meteo daily forecasts behind a grid-snapped, stale-while-revalidate cache.
+
+Coordinates are snapped to a configurable grid (WEATHER_GRID_DEGREES, default
+0.05° ≈ 5.5 km) so nearby farms share one cache entry. Fresh entries are served
+directly; stale ones are served immediately while a single background refresh
+runs, so hot locations never block on the upstream.
+
+``get_weather_forecasts`` serves many locations at once: it snaps and dedupes
+them, answers what it can from the same cache, and fetches the rest with
+Open-Meteo's comma-separated multi-coordinate requests, WEATHER_BATCH_SIZE cells
+per call. Each location of a batch response is cached on its own, so batch and
+single requests share entries.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.services import http_clients, metrics
+from app.services.cache import TTLCache, SingleFlight, get_or_fetch, run_in_background
+
+WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY_VARIABLES = "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max"
+
+GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.05"))
+CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL", "1800"))
+STALE_TTL_SECONDS = float(os.getenv("WEATHER_STALE_TTL", "21600"))
+# Grid cells per upstream call; keeps the request URL well under common length limits.
+BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "100"))
+
+logger = logging.getLogger(__name__)
+
+_forecast_cache = TTLCache(
+    ttl=CACHE_TTL_SECONDS, maxsize=4096, stale_ttl=STALE_TTL_SECONDS, shared_namespace="cache:weather",
+)
+_inflight = SingleFlight()
+metrics.register_cache("weather_forecasts", _forecast_cache)
 
-def get_weather_forecast(latitude: float = 15.5057, longitude: float = 80.0463):
-    """
-    Fetches and processes a 7-day daily weather forecast for a specific location.
-    Defaults to Ongole, Andhra Pradesh.
-    """
-    # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
 
-    # Define the API URL and the specific daily parameters needed for the app
-    url = "https://api.open-meteo.com/v1/forecast"
+def snap_to_grid(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Rounds a coordinate to the centre of its forecast grid cell."""
+    if GRID_DEGREES <= 0:
+        return round(latitude, 4), round(longitude, 4)
+    return (
+        round(round(latitude / GRID_DEGREES) * GRID_DEGREES, 4),
+        round(round(longitude / GRID_DEGREES) * GRID_DEGREES, 4),
+    )
+
+
+async def _fetch_forecast(latitude: float, longitude: float) -> Dict[str, Any]:
     params = {
         "latitude": latitude,
         "longitude": longitude,
-        "daily": ["weathercode", "temperature_2m_max", "temperature_2m_min", "precipitation_sum", "windspeed_10m_max"],
-        "timezone": "auto"
+        "daily": DAILY_VARIABLES,
+        "timezone": "auto",
     }
+    client = http_clients.get_client("open-meteo", timeout=10.0)
+    with metrics.track_upstream("open-meteo") as call:
+        response = await client.get(WEATHER_API_URL, params=params)
+        call.status = response.status_code
+        response.raise_for_status()
+    return response.json()
+
+
+async def get_weather_forecast(latitude: float = 15.5057, longitude: float = 80.0463) -> Dict[str, Any]:
+    """
+    Returns the 7-day daily forecast for the grid cell containing the location.
+    Defaults to Ongole, Andhra Pradesh. Raises httpx errors if no cached
+    forecast is available and the upstream call fails.
+    """
+    key = snap_to_grid(latitude, longitude)
+    return await get_or_fetch(_forecast_cache, _inflight, key, lambda: _fetch_forecast(*key))
 
-    # Fetch the data
-    responses = openmeteo.weather_api(url, params=params)
-    response = responses[0]
-
-    print(f"Processing forecast for: {response.Latitude()}°N, {response.Longitude()}°E")
-
-    # Process the daily data
-    daily = response.Daily()
-    daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-    daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-    daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-    daily_precipitation_sum = daily.Variables(3).ValuesAsNumpy()
-    daily_windspeed_10m_max = daily.Variables(4).ValuesAsNumpy()
-
-    # Create a dictionary with the processed data, ready for an API response
-    daily_data = {
-        "time": pd.to_datetime(daily.Time(), unit="s", utc=True).strftime('%Y-%m-%d').tolist(),
-        "weathercode": daily_weather_code.tolist(),
-        "temperature_2m_max": [round(val, 1) for val in daily_temperature_2m_max],
-        "temperature_2m_min": [round(val, 1) for val in daily_temperature_2m_min],
-        "precipitation_sum": [round(val, 2) for val in daily_precipitation_sum],
-        "windspeed_10m_max": [round(val, 1) for val in daily_windspeed_10m_max]
+
+# --- Batches ---
+async def _fetch_forecasts(keys: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    """One upstream call for several grid cells; returns their forecasts in order."""
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in keys),
+        "longitude": ",".join(str(lon) for _, lon in keys),
+        "daily": DAILY_VARIABLES,
+        "timezone": "auto",
     }
+    client = http_clients.get_client("open-meteo", timeout=10.0)
+    with metrics.track_upstream("open-meteo") as call:
+        response = await client.get(WEATHER_API_URL, params=params)
+        call.status = response.status_code
+        response.raise_for_status()
+    body = response.json()
+    # Open-Meteo answers a single coordinate with an object and several with a list.
+    forecasts = body if isinstance(body, list) else [body]
+    if len(forecasts) != len(keys):
+        raise ValueError(f"Open-Meteo returned {len(forecasts)} forecasts for {len(keys)} locations")
+    return forecasts
+
+
+async def _fetch_batch(keys: Sequence[Tuple[float, float]], futures: Dict[Tuple[float, float], asyncio.Future]) -> None:
+    """Fetches `keys` in upstream-sized chunks, caching each forecast and resolving its future."""
+    async def fetch_chunk(chunk):
+        try:
+            forecasts = await _fetch_forecasts(chunk)
+        except Exception as e:
+            for key in chunk:
+                futures[key].set_exception(e)
+                # Callers may have stopped waiting; don't warn about an unretrieved exception.
+                futures[key].exception()
+            return
+        for key, forecast in zip(chunk, forecasts):
+            _forecast_cache.set(key, forecast)
+            futures[key].set_result(forecast)
+
+    chunks = [keys[i:i + BATCH_SIZE] for i in range(0, len(keys), BATCH_SIZE)]
+    await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+
+async def get_weather_forecasts(locations: Sequence[Tuple[float, float]]) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Forecasts for many (latitude, longitude) pairs, in input order. A location
+    whose upstream call failed gets the exception instead of a forecast, so one
+    bad chunk doesn't fail the whole batch. Stale cells are returned as-is and
+    refreshed together in the background.
+    """
+    keys = [snap_to_grid(lat, lon) for lat, lon in locations]
+    results: Dict[Tuple[float, float], Any] = {}
+    waiting: Dict[Tuple[float, float], asyncio.Future] = {}
+    missing: Dict[Tuple[float, float], asyncio.Future] = {}
+    stale: Dict[Tuple[float, float], asyncio.Future] = {}
+
+    for key in dict.fromkeys(keys):
+        entry = await _forecast_cache.get_entry_async(key)
+        if entry is not None:
+            results[key] = entry[0]
+            if not entry[1] and key not in _inflight:
+                stale[key] = _inflight.lead(key)
+        elif key in _inflight:
+            waiting[key] = _inflight.wait(key)
+        else:
+            missing[key] = _inflight.lead(key)
+
+    if stale:
+        run_in_background(_fetch_batch(list(stale), stale))
+    if missing:
+        # Runs detached, so a caller disconnecting doesn't strand the other waiters.
+        run_in_background(_fetch_batch(list(missing), missing))
+        waiting.update({key: asyncio.shield(future) for key, future in missing.items()})
+    if waiting:
+        outcomes = await asyncio.gather(*waiting.values(), return_exceptions=True)
+        results.update(zip(waiting, outcomes))
+    return [results[key] for key in keys]
+
+
+async def refresh_forecasts(keys: Sequence[Tuple[float, float]]) -> int:
+    """
+    Re-fetches grid cells (already snapped) with multi-coordinate calls,
+    skipping cells already being fetched. Returns how many were refreshed.
+    """
+    futures = {key: _inflight.lead(key) for key in dict.fromkeys(keys) if key not in _inflight}
+    if not futures:
+        return 0
+    await _fetch_batch(list(futures), futures)
+    return sum(1 for future in futures.values() if future.exception() is None)
+
+
+async def cache_expires_in(key: Tuple[float, float]) -> Optional[float]:
+    """Seconds until a grid cell's cached forecast goes stale; None if not cached."""
+    return await _forecast_cache.expires_in_async(key)
 
-    return {"daily": daily_data}
 
 # This block allows you to run the file directly to test the function
 if __name__ == "__main__":
+    import asyncio
     import json
 
-    # 1. Get forecast for the default location (Ongole)
-    ongole_forecast = get_weather_forecast()
-    print("\n--- Forecast for Ongole, Andhra Pradesh ---")
-    print(json.dumps(ongole_forecast, indent=2))
+    async def _demo():
+        # 1. Get forecast for the default location (Ongole)
+        ongole_forecast = await get_weather_forecast()
+        print("\n--- Forecast for Ongole, Andhra Pradesh ---")
+        print(json.dumps(ongole_forecast, indent=2))
+
+        # 2. Get forecast for a different location (e.g., Bengaluru)
+        bengaluru_forecast = await get_weather_forecast(latitude=12.9716, longitude=77.5946)
+        print("\n--- Forecast for Bengaluru, Karnataka ---")
+        print(json.dumps(bengaluru_forecast, indent=2))
+        await http_clients.aclose_all()
 
-    # 2. Get forecast for a different location (e.g., Bengaluru)
-    bengaluru_forecast = get_weather_forecast(latitude=12.9716, longitude=77.5946)
-    print("\n--- Forecast for Bengaluru, Karnataka ---")
-    print(json.dumps(bengaluru_forecast, indent=2))
\ No newline at end of file
+    asyncio.run(_demo())
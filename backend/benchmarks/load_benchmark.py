@@ -0,0 +1,390 @@
+"""
+Endpoint load-testing benchmark for the backend.
+
+Runs the FastAPI app in-process (through httpx's ASGI transport, with its
+lifespan) and replaces the Agmarknet, Open-Meteo and Gemini clients with local
+stand-ins on an ``httpx.MockTransport`` that answer after a configurable latency
+and fail at a configurable rate. Each scenario drives one router at a fixed
+concurrency with varied parameters and reports throughput and p50/p95/p99
+latency. Client and server share one event loop, so absolute numbers include
+the client's overhead; compare runs made on the same machine.
+
+Run from the backend directory:
+
+    python benchmarks/load_benchmark.py [--concurrency 16] [--requests 500]
+        [--latency-ms 50] [--error-rate 0.0] [--scenarios prices,weather]
+        [--output load.json] [--baseline load_baseline.json]
+
+With --baseline, each scenario is compared against the stored result; a drop in
+throughput or a rise in p95 latency beyond --tolerance is reported as a
+regression (exit status 1 with --fail-on-regression).
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.main import app  # noqa: E402
+from app.services import (  # noqa: E402
+    agmarknet_service,
+    http_clients,
+    live_location_service,
+    model_registry,
+)
+
+AGMARKNET_STAND_IN_URL = "https://agmarknet.local/resource"
+CROPS = ["Cotton", "Rice", "Wheat", "Tomato", "Onion", "Chilli", "Groundnut", "Maize"]
+# Rough bounding box of India for random coordinates.
+LAT_RANGE, LON_RANGE = (8.0, 34.0), (69.0, 89.0)
+
+Request = Tuple[str, str, Dict]
+
+
+class FakeUpstreams:
+    """Answers Agmarknet, Open-Meteo and Gemini requests locally."""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, seed: int):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls[host] += 1
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            return httpx.Response(503, json={"error": "stand-in failure"})
+        if "agmarknet" in host:
+            return self._agmarknet(request)
+        if "open-meteo" in host:
+            return self._open_meteo(request)
+        return self._gemini(request)
+
+    def _agmarknet(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        record = {
+            "state": params.get("filters[state]"),
+            "district": params.get("filters[district]"),
+            "market": params.get("filters[market]"),
+            "arrival_date": params.get("filters[arrival_date]"),
+        }
+        records = [
+            {**record, "commodity": crop, "modal_price": str(self.rng.randint(1000, 9000))}
+            for crop in CROPS[: self.rng.randint(1, len(CROPS))]
+        ]
+        return httpx.Response(200, json={"records": records})
+
+    def _open_meteo(self, request: httpx.Request) -> httpx.Response:
+        latitudes = request.url.params.get("latitude", "0").split(",")
+        days = [(date.today() + timedelta(days=i)).isoformat() for i in range(7)]
+
+        def forecast(lat):
+            return {
+                "latitude": float(lat),
+                "daily": {
+                    "time": days,
+                    "weathercode": [self.rng.choice([0, 1, 2, 3, 61]) for _ in days],
+                    "temperature_2m_max": [round(self.rng.uniform(25, 40), 1) for _ in days],
+                    "temperature_2m_min": [round(self.rng.uniform(15, 25), 1) for _ in days],
+                },
+            }
+
+        body = [forecast(lat) for lat in latitudes] if len(latitudes) > 1 else forecast(latitudes[0])
+        return httpx.Response(200, json=body)
+
+    def _gemini(self, request: httpx.Request) -> httpx.Response:
+        chunks = ["* Irrigate early in the morning.\n", "* Check the soil again tomorrow.\n"]
+        if request.url.params.get("alt") == "sse":
+            body = "".join(
+                f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': chunk}]}}]})}\n\n"
+                for chunk in chunks
+            )
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "".join(chunks)}]}}]})
+
+
+def install_fake_upstreams(upstreams: FakeUpstreams) -> None:
+    transport = httpx.MockTransport(upstreams.handle)
+    agmarknet_service.API_URL = AGMARKNET_STAND_IN_URL
+    for name in ("agmarknet", "open-meteo", "gemini"):
+        http_clients.set_client(name, httpx.AsyncClient(transport=transport))
+
+
+# --- Scenarios: each returns a factory of varied (method, url, kwargs) requests ---
+def _locations() -> List[Tuple[str, str, str]]:
+    index = live_location_service.get_live_index()
+    triples = []
+    for state in index["states"]:
+        for district in index["districts"].get(state.lower(), []):
+            for market in index["markets"].get(district.lower(), []):
+                triples.append((state, district, market))
+    return triples or [("Andhra Pradesh", "Guntur", "Guntur")]
+
+
+def _random_coordinate(rng: random.Random) -> Tuple[float, float]:
+    return round(rng.uniform(*LAT_RANGE), 4), round(rng.uniform(*LON_RANGE), 4)
+
+
+def prices_scenario() -> Callable[[random.Random], Request]:
+    triples = _locations()
+
+    def make(rng):
+        state, district, market = rng.choice(triples)
+        return "GET", "/api/prices/live", {"params": {"state": state, "district": district, "market": market}}
+    return make
+
+
+def weather_scenario() -> Callable[[random.Random], Request]:
+    def make(rng):
+        lat, lon = _random_coordinate(rng)
+        return "GET", "/api/weather/", {"params": {"lat": lat, "lon": lon}}
+    return make
+
+
+def weather_batch_scenario() -> Callable[[random.Random], Request]:
+    def make(rng):
+        locations = [dict(zip(("lat", "lon"), _random_coordinate(rng))) for _ in range(rng.randint(10, 50))]
+        return "POST", "/api/weather/batch", {"json": {"locations": locations}}
+    return make
+
+
+def ai_advisor_scenario() -> Callable[[random.Random], Request]:
+    def make(rng):
+        if rng.random() < 0.5:
+            body = {
+                "crop_name": rng.choice(CROPS),
+                "soil_moisture": round(rng.uniform(5, 60), 1),
+                "temperature": round(rng.uniform(15, 40), 1),
+                "humidity": round(rng.uniform(20, 90), 1),
+            }
+            path = "/api/advisor/soil-suggestion" + ("/stream" if rng.random() < 0.3 else "")
+            return "POST", path, {"json": body}
+        days = [
+            {"date": (date.today() + timedelta(days=i)).isoformat(), "weather": {"description": rng.choice(["Clear sky", "Rain"])}, "tempMax": rng.randint(25, 40)}
+            for i in range(7)
+        ]
+        body = {"crop_name": rng.choice(CROPS), "location_name": rng.choice(["Ongole", "Guntur", "Nashik"]), "weather_data": days}
+        return "POST", "/api/advisor/weather-suggestion", {"json": body}
+    return make
+
+
+def iot_scenario() -> Callable[[random.Random], Request]:
+    def make(rng):
+        device = f"bench-{rng.randint(1, 50)}"
+        roll = rng.random()
+        if roll < 0.6:
+            body = {"device_id": device, "soil_moisture": round(rng.uniform(5, 60), 1), "temperature": round(rng.uniform(15, 40), 1)}
+            return "POST", "/api/iot/sensor-data", {"json": body}
+        if roll < 0.9:
+            return "GET", f"/api/iot/latest-data/{device}", {}
+        return "GET", f"/api/iot/history/{device}", {"params": {"resolution": "1m"}}
+    return make
+
+
+def live_locations_scenario() -> Callable[[random.Random], Request]:
+    triples = _locations()
+
+    def make(rng):
+        state, district, _ = rng.choice(triples)
+        return rng.choice([
+            ("GET", "/api/live-locations/states", {}),
+            ("GET", "/api/live-locations/districts", {"params": {"state": state}}),
+            ("GET", "/api/live-locations/markets", {"params": {"district": district}}),
+        ])
+    return make
+
+
+def locations_search_scenario() -> Callable[[random.Random], Request]:
+    names = [market for _, _, market in _locations()]
+
+    def make(rng):
+        if rng.random() < 0.7:
+            name = rng.choice(names)
+            return "GET", "/api/locations/search", {"params": {"q": name[: rng.randint(2, max(2, len(name)))]}}
+        lat, lon = _random_coordinate(rng)
+        return "GET", "/api/locations/nearest", {"params": {"lat": lat, "lon": lon}}
+    return make
+
+
+def predict_scenario() -> Callable[[random.Random], Request]:
+    series = [(s["market"], s["commodity"]) for s in model_registry.list_series()]
+
+    def make(rng):
+        params = {"periods": rng.randint(1, 24)}
+        if series and rng.random() < 0.7:
+            params["market"], params["commodity"] = rng.choice(series)
+        if rng.random() < 0.8:
+            return "GET", "/api/predict/price", {"params": params}
+        start = date.today() + timedelta(days=rng.randint(0, 30))
+        body = {
+            "market": params.get("market"),
+            "commodity": params.get("commodity"),
+            "ranges": [{"start": start.isoformat(), "end": (start + timedelta(days=rng.randint(0, 90))).isoformat()}],
+        }
+        return "POST", "/api/predict/batch", {"json": body}
+    return make
+
+
+SCENARIOS = {
+    "prices": prices_scenario,
+    "weather": weather_scenario,
+    "weather_batch": weather_batch_scenario,
+    "ai_advisor": ai_advisor_scenario,
+    "iot": iot_scenario,
+    "live_locations": live_locations_scenario,
+    "locations_search": locations_search_scenario,
+    "predict": predict_scenario,
+}
+
+
+async def run_scenario(client: httpx.AsyncClient, make: Callable, total: int, concurrency: int, rng: random.Random) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = make(rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+        "status_counts": dict(sorted(statuses.items())),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> Dict:
+    """Per-scenario relative change against a stored run; flags regressions beyond `tolerance`."""
+    comparison = {}
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        throughput_change = (current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"] if previous["throughput_rps"] else 0.0
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        comparison[name] = {
+            "throughput_change": round(throughput_change, 4),
+            "p95_change": round(p95_change, 4),
+            "regression": throughput_change < -tolerance or p95_change > tolerance,
+        }
+    return comparison
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    upstreams = FakeUpstreams(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    results = {
+        "python": sys.version.split()[0],
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        install_fake_upstreams(upstreams)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            print(f"{'scenario':18} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+            for name in args.scenarios:
+                make = SCENARIOS[name]()
+                # Unmeasured warm-up: lazy loads and first cache fills.
+                await run_scenario(client, make, args.warmup, args.concurrency, rng)
+                calls_before = sum(upstreams.calls.values())
+                result = await run_scenario(client, make, args.requests, args.concurrency, rng)
+                result["upstream_calls"] = sum(upstreams.calls.values()) - calls_before
+                results["scenarios"][name] = result
+                print(
+                    f"{name:18} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.2f} "
+                    f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}  {result['status_counts']}"
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated scenarios (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per scenario before measuring")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean latency of the upstream stand-ins")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Standard deviation of the upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls answered with a 503")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previously written JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if any scenario regressed")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        print(f"\n{'scenario':18} {'throughput':>11} {'p95':>9}")
+        for name, change in results["comparison"].items():
+            flag = "  REGRESSION" if change["regression"] else ""
+            print(f"{name:18} {change['throughput_change']:>+11.1%} {change['p95_change']:>+9.1%}{flag}")
+            regressed |= change["regression"]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
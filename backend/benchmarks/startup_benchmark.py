@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark for the backend.
+
+Measures, each in a fresh interpreter so nothing is already cached in-process:
+* the cumulative import time of app.main and of every router/service module
+  (from ``python -X importtime``),
+* the initialization time of each lazily loaded subsystem (readiness.SUBSYSTEMS).
+
+Run from the backend directory:
+
+    python benchmarks/startup_benchmark.py [--repeat 3] [--output startup.json]
+
+The JSON output can be stored and compared between runs as the data grows.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+MODULES = [
+    "app.main",
+    *sorted(f"app.routers.{p.stem}" for p in (BACKEND_DIR / "app" / "routers").glob("*.py") if p.stem != "__init__"),
+    *sorted(f"app.services.{p.stem}" for p in (BACKEND_DIR / "app" / "services").glob("*.py") if p.stem != "__init__"),
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+INIT_SNIPPET = """
+import json, time
+from app.services import readiness
+started = time.perf_counter()
+result = readiness.warm([{name!r}])
+print(json.dumps({{"seconds": time.perf_counter() - started, "status": result[{name!r}]["status"]}}))
+"""
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+
+def measure_import(module: str) -> float:
+    """Cumulative import time of `module` in milliseconds, in a fresh interpreter."""
+    proc = _run(["-X", "importtime", "-c", f"import {module}"])
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"import {module} failed")
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000.0
+    raise RuntimeError(f"No importtime entry for {module}")
+
+
+def measure_init(name: str) -> dict:
+    """Initialization time of one subsystem in milliseconds, in a fresh interpreter."""
+    proc = _run(["-c", INIT_SNIPPET.format(name=name)])
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"warm {name} failed")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {"ms": result["seconds"] * 1000.0, "status": result["status"]}
+
+
+def _summary(samples):
+    return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2), "max_ms": round(max(samples), 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh-process runs per measurement")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.services import readiness
+
+    results = {"python": sys.version.split()[0], "repeat": args.repeat, "imports": {}, "init": {}}
+
+    print(f"{'module':45} {'import ms (median)':>20}")
+    for module in MODULES:
+        try:
+            samples = [measure_import(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            results["imports"][module] = {"error": str(e)}
+            print(f"{module:45} {'error: ' + str(e):>20}")
+            continue
+        results["imports"][module] = _summary(samples)
+        print(f"{module:45} {results['imports'][module]['median_ms']:>20.1f}")
+
+    print(f"\n{'subsystem':45} {'init ms (median)':>20}")
+    for name in readiness.SUBSYSTEMS:
+        try:
+            runs = [measure_init(name) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            results["init"][name] = {"error": str(e)}
+            print(f"{name:45} {'error: ' + str(e):>20}")
+            continue
+        results["init"][name] = {**_summary([run["ms"] for run in runs]), "status": runs[-1]["status"]}
+        print(f"{name:45} {results['init'][name]['median_ms']:>20.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
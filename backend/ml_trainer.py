@@ -1,22 +1,34 @@
-import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-import pickle
+import argparse
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
 import numpy as np
+from app.services import data_store, model_registry, forest_model
+
+# Trees per (market, commodity) model. Most series are short, so a small forest is enough.
+SERIES_N_ESTIMATORS = 20
+# Series with at least this many rows are trained in the parent process with
+# tree-level parallelism (n_jobs) instead of being packed into a worker batch.
+LARGE_SERIES_ROWS = 50_000
+# Small series are shipped to workers in batches to amortize the IPC overhead.
+BATCH_SIZE = 256
+# Bump when the features or the model change so every series is retrained.
+FEATURES_VERSION = "year-month-v1"
 
 def train_and_save_default_model():
     print("--- Starting Default Model Training (Random Forest) ---")
-    data_path = os.path.join('backend', 'app', 'data', 'app_data.csv')
-
-    try:
-        df = pd.read_csv(data_path)
-        print(f"Successfully loaded data from {data_path}")
-    except FileNotFoundError:
-        print(f"ERROR: Could not find data at {data_path}")
+    table = data_store.get_table("app")
+    if table.empty:
+        print(f"ERROR: Could not find data for '{table.name}' in {data_store.DATA_DIR}")
         return
+    df = table.to_frame(['arrival_date', 'modal_price'])
+    print(f"Successfully loaded {len(df)} rows from the '{table.name}' dataset")
 
     # Feature Engineering
-    df['arrival_date'] = pd.to_datetime(df['arrival_date'])
     df['year'] = df['arrival_date'].dt.year
     df['month'] = df['arrival_date'].dt.month
 
@@ -29,13 +41,154 @@ def train_and_save_default_model():
     model.fit(X, y)
     print("Model training complete.")
 
-    # Save the Model
-    model_dir = os.path.join('backend', 'app', 'ml')
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, 'price_model_rf.pkl')
-    with open(model_path, 'wb') as pkl:
-        pickle.dump(model, pkl)
+    # Save the Model as a flat, memory-mappable forest file
+    model_path = model_registry.DEFAULT_MODEL_PATH
+    os.makedirs(model_path.parent, exist_ok=True)
+    forest_model.export_forest(model, model_path)
     print(f"--- Model successfully saved to {model_path} ---")
 
+def _fit(X, y, n_jobs=1):
+    import pandas as pd
+
+    model = RandomForestRegressor(n_estimators=SERIES_N_ESTIMATORS, random_state=42, n_jobs=n_jobs)
+    model.fit(pd.DataFrame(X, columns=['year', 'month']), y)
+    return model
+
+def _train_batch(batch, n_jobs=1):
+    """Trains and saves a list of (key, filename, X, y) series. Runs in a worker process."""
+    results = []
+    for key, filename, X, y in batch:
+        started = time.perf_counter()
+        model = _fit(X, y, n_jobs=n_jobs)
+        forest_model.export_forest(model, model_registry.MODELS_DIR / filename)
+        results.append((key, time.perf_counter() - started))
+    return results
+
+def _series_hash(X, y):
+    digest = hashlib.sha1(f"{FEATURES_VERSION}/{forest_model.FORMAT_VERSION}".encode('utf-8'))
+    digest.update(str(SERIES_N_ESTIMATORS).encode('utf-8'))
+    digest.update(np.ascontiguousarray(X, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def _partition(table):
+    """
+    Splits the training table into (market, commodity, X, y) series with one sort
+    over the dictionary codes instead of a pandas groupby.
+    """
+    markets, commodities = table.codes('market'), table.codes('commodity')
+    days, prices = table.column('arrival_date'), table.column('modal_price')
+    valid = (markets >= 0) & (commodities >= 0) & ~np.isnat(days) & ~np.isnan(prices)
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((days[rows], commodities[rows], markets[rows]))]
+
+    market_codes, commodity_codes = markets[rows], commodities[rows]
+    months = days[rows].astype('datetime64[M]').astype(np.int64)
+    X = np.column_stack([1970 + months // 12, months % 12 + 1])
+    y = np.asarray(prices[rows], dtype=np.float64)
+
+    boundaries = np.flatnonzero((np.diff(market_codes) != 0) | (np.diff(commodity_codes) != 0)) + 1
+    market_names, commodity_names = table.categories('market'), table.categories('commodity')
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows)]):
+        yield market_names[market_codes[start]], commodity_names[commodity_codes[start]], X[start:end], y[start:end]
+
+def _load_manifest():
+    try:
+        with open(model_registry.MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get("series", {})
+    except (OSError, ValueError):
+        return {}
+
+def train_series_models(n_jobs=None, force=False):
+    """
+    Trains one model per (market, commodity) in the training data for the model registry.
+
+    Series whose input data hash matches the previous manifest are skipped. The rest
+    are scheduled largest-first: big series train in this process with n_jobs tree
+    workers, small ones are batched across a pool of n_jobs processes.
+    """
+    print("--- Starting Per-Series Model Training (Random Forest) ---")
+    run_started = time.perf_counter()
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    table = data_store.get_table("training")
+    if table.empty:
+        print(f"ERROR: Could not find data for '{table.name}' in {data_store.DATA_DIR}")
+        return
+    os.makedirs(model_registry.MODELS_DIR, exist_ok=True)
+    previous = _load_manifest()
+    series, pending = {}, []
+    for market, commodity, X, y in _partition(table):
+        key = model_registry.series_key(market, commodity)
+        data_hash = _series_hash(X, y)
+        filename = f"{model_registry.series_filename(market, commodity)}.npy"
+        entry = {"market": market, "commodity": commodity, "file": filename, "rows": len(y), "data_hash": data_hash}
+
+        old = previous.get(key)
+        if not force and old and old.get("data_hash") == data_hash and (model_registry.MODELS_DIR / old["file"]).exists():
+            series[key] = old
+            continue
+        series[key] = entry
+        pending.append((key, filename, X, y))
+
+    pending.sort(key=lambda item: len(item[3]), reverse=True)
+    large = [item for item in pending if len(item[3]) >= LARGE_SERIES_ROWS]
+    small = [item for item in pending if len(item[3]) < LARGE_SERIES_ROWS]
+    print(f"{len(series)} series: {len(pending)} to train ({len(large)} large), {len(series) - len(pending)} unchanged. n_jobs={n_jobs}")
+
+    trained_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def record(results):
+        for key, seconds in results:
+            series[key]["train_seconds"] = round(seconds, 4)
+            series[key]["trained_at"] = trained_at
+
+    for item in large:
+        record(_train_batch([item], n_jobs=n_jobs))
+
+    batches = [small[i:i + BATCH_SIZE] for i in range(0, len(small), BATCH_SIZE)]
+    if n_jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(batches))) as pool:
+            for future in as_completed([pool.submit(_train_batch, batch) for batch in batches]):
+                record(future.result())
+    else:
+        for batch in batches:
+            record(_train_batch(batch))
+
+    # Drop artifacts of series that are no longer in the data, or whose file changed.
+    current_files = {entry["file"] for entry in series.values()}
+    for key, entry in previous.items():
+        if entry.get("file") not in current_files:
+            try:
+                os.remove(model_registry.MODELS_DIR / entry["file"])
+            except OSError:
+                pass
+
+    duration = time.perf_counter() - run_started
+    manifest = {
+        "series": series,
+        "last_run": {
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "duration_seconds": round(duration, 2),
+            "n_jobs": n_jobs,
+            "trained": len(pending),
+            "skipped": len(series) - len(pending),
+            "removed": len([key for key in previous if key not in series]),
+        },
+    }
+    tmp_path = model_registry.MANIFEST_PATH.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, model_registry.MANIFEST_PATH)
+    print(f"--- Trained {len(pending)} of {len(series)} series models in {duration:.1f}s -> {model_registry.MODELS_DIR} ---")
+
 if __name__ == "__main__":
-    train_and_save_default_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the price prediction models.")
+    parser.add_argument("--series", action="store_true", help="Train one model per (market, commodity) for the model registry")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Parallel workers (default: all CPUs)")
+    parser.add_argument("--force", action="store_true", help="Retrain every series even if its data is unchanged")
+    args = parser.parse_args()
+    if args.series:
+        train_series_models(n_jobs=args.n_jobs, force=args.force)
+    else:
+        train_and_save_default_model()
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.services import agmarknet_service
+
+
+def test_empty_result_is_cached_briefly(monkeypatch):
+    calls = []
+
+    async def lookback(state, district, market, today):
+        calls.append(market)
+        return []
+
+    monkeypatch.setattr(agmarknet_service, "_lookback", lookback)
+
+    async def fetch_twice():
+        first = await agmarknet_service.fetch_prices_from_agmarknet("Kerala", "Ernakulam", "Nowhere Mandi")
+        second = await agmarknet_service.fetch_prices_from_agmarknet("kerala", "ernakulam", "nowhere mandi ")
+        return first, second
+
+    assert asyncio.run(fetch_twice()) == ([], [])
+    assert calls == ["Nowhere Mandi"]
+    expires_in = asyncio.run(agmarknet_service.cache_expires_in("Kerala", "Ernakulam", "Nowhere Mandi"))
+    assert 0 < expires_in <= agmarknet_service.EMPTY_CACHE_TTL_SECONDS
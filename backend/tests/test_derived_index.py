@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.services import data_store, price_history_service
+
+
+def test_builds_once_merges_new_parts_and_rebuilds_on_change(monkeypatch):
+    tables = {"training": object()}
+    parts = []
+    version = [1]
+    calls = []
+    monkeypatch.setattr(data_store, "get_table", lambda name: tables[name])
+    monkeypatch.setattr(data_store, "list_parts", lambda: list(parts))
+
+    def build(sources, new_parts):
+        calls.append(("build", len(new_parts)))
+        return ("built", len(new_parts))
+
+    def merge(value, new_parts):
+        calls.append(("merge", len(new_parts)))
+        return (value[0], value[1] + len(new_parts))
+
+    index = data_store.DerivedIndex(("training",), build, merge, lambda: version[0])
+    assert not index.loaded
+    assert index.get() == ("built", 0)
+    assert index.get() == ("built", 0)
+
+    parts += ["p1", "p2"]
+    assert index.get() == ("built", 2)
+    version[0] = 2
+    assert index.get() == ("built", 2)
+    tables["training"] = object()
+    parts.append("p3")
+    assert index.get() == ("built", 3)
+    assert calls == [("build", 0), ("merge", 2), ("build", 2), ("build", 3)]
+
+
+def test_price_history_merge_matches_a_full_build():
+    table = data_store.get_table("training")
+    merged = price_history_service.PriceHistoryIndex([table])
+    merged.add_tables([table])
+    built = price_history_service.PriceHistoryIndex([table, table])
+    for column in ("series", "day", "offsets"):
+        assert np.array_equal(getattr(merged, column), getattr(built, column))
+    key = merged._sort_key(merged.series, merged.day)
+    assert np.all(np.diff(key) >= 0)
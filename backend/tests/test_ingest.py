@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from io import StringIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import ingest
+from app.services import data_store, ingest_service
+
+client = TestClient(app)
+
+TOKEN = "s3cret"
+EXPORT = (
+    "State,District,Market,Commodity,Variety,Grade,Arrival_Date,Min_x0020_Price,Max_x0020_Price,Modal_x0020_Price\n"
+    "Kerala,Ernakulam,Testmarket,Banana,Nendra,FAQ,03/01/2031,3000,3600,3300\n"
+    "Kerala,Ernakulam,Testmarket,Banana,Nendra,FAQ,03/01/2031,3000,3600,3300\n"
+    "Kerala,Ernakulam,Testmarket,Onion,Big,FAQ,03/01/2031,2000,2400,2200\n"
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    partitions = tmp_path / "partitions"
+    monkeypatch.setattr(data_store, "PARTITIONS_DIR", str(partitions))
+    monkeypatch.setattr(data_store, "PARTS_LOG", str(partitions / "parts.log"))
+    monkeypatch.setattr(data_store, "_parts", [])
+    monkeypatch.setattr(data_store, "_parts_offset", 0)
+    monkeypatch.setattr(ingest_service, "_day_keys", OrderedDict())
+    monkeypatch.setattr(ingest, "INGEST_TOKEN", TOKEN)
+    return partitions
+
+
+def post(body, token=TOKEN):
+    headers = {"Content-Type": "text/csv"}
+    if token is not None:
+        headers["X-Ingest-Token"] = token
+    return client.post("/api/ingest/agmarknet", content=body, headers=headers)
+
+
+def test_refused_when_token_not_configured(store, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_TOKEN", None)
+    assert post(EXPORT, token=None).status_code == 503
+    assert not store.exists()
+
+
+@pytest.mark.parametrize("token", [None, "", "wrong"])
+def test_wrong_token_is_rejected(store, token):
+    assert post(EXPORT, token=token).status_code == 401
+    assert not store.exists()
+
+
+def test_oversized_body_is_rejected(store, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_MAX_BYTES", 100)
+    assert post(EXPORT).status_code == 413
+    assert not store.exists()
+
+
+def test_duplicates_are_skipped(store):
+    first = post(EXPORT).json()
+    assert (first["rows_read"], first["ingested"], first["duplicates"]) == (3, 2, 1)
+    assert first["dates"] == ["2031-01-03"]
+
+    again = post(EXPORT).json()
+    assert (again["ingested"], again["duplicates"]) == (0, 3)
+    assert len(data_store.list_parts()) == 1
+
+
+def test_parts_written_by_another_process_are_deduplicated(store):
+    import pandas as pd
+
+    post(EXPORT)  # caches the dedup keys for 2031-01-03
+    other = "Kerala,Ernakulam,Testmarket,Tomato,Local,FAQ,03/01/2031,900,1100,1000\n"
+    header = EXPORT.splitlines()[0] + "\n"
+
+    # Another worker (or the CLI) appends a part this process has not seen yet.
+    frame = ingest_service._normalize_chunk(pd.read_csv(StringIO(header + other), dtype=str))
+    data_store.write_part("2031-01-03", frame, "other-worker")
+
+    result = post(header + other).json()
+    assert (result["ingested"], result["duplicates"]) == (0, 1)
@@ -0,0 +1,38 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import iot
+from app.services.pubsub import Hub, sensor_hub
+
+client = TestClient(app)
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_event_stream_subscribes_only_while_streaming():
+    hub = Hub()
+    response = iot._event_stream(hub, "dev", ConnectedRequest(), {"soil_moisture": 1.0})
+    assert hub.subscriber_count("dev") == 0
+
+    async def first_event():
+        events = response.body_iterator
+        event = await events.__anext__()
+        assert hub.subscriber_count("dev") == 1
+        await events.aclose()
+        return event
+
+    assert asyncio.run(first_event()) == 'data: {"soil_moisture": 1.0}\n\n'
+    assert hub.subscriber_count("dev") == 0
+
+
+def test_websocket_unsubscribes_on_disconnect():
+    client.post("/api/iot/sensor-data", json={"device_id": "ws-test", "soil_moisture": 42.0})
+    with client.websocket_connect("/api/iot/ws/ws-test") as websocket:
+        assert websocket.receive_json()["soil_moisture"] == 42.0
+        assert sensor_hub.subscriber_count("ws-test") == 1
+    assert sensor_hub.subscriber_count("ws-test") == 0
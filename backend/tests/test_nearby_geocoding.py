@@ -0,0 +1,7 @@
+from app.services.nearby_price_service import _Geocoder
+
+
+def test_suffixed_market_is_approximate():
+    geocoder = _Geocoder()
+    assert geocoder.locate("Maharashtra", "Pune", "Pune") == (18.5204, 73.8567, False)
+    assert geocoder.locate("Maharashtra", "Pune", "Pune(Pimpri)") == (18.5204, 73.8567, True)
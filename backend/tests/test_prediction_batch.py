@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.prediction import MAX_BATCH_RANGES
+from app.services import prediction_service
+
+client = TestClient(app)
+
+
+class _NumpyWithoutExpansion:
+    """numpy for prediction_service, except that expanding a range into days fails."""
+
+    def __getattr__(self, name):
+        return getattr(np, name)
+
+    @staticmethod
+    def arange(*args, **kwargs):
+        raise AssertionError("a range was expanded before the batch size was checked")
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("predict_for_dates was called for an oversized batch")
+
+
+def test_oversized_ranges_are_rejected_before_allocating(monkeypatch):
+    monkeypatch.setattr(prediction_service, "np", _NumpyWithoutExpansion())
+    monkeypatch.setattr(prediction_service, "predict_for_dates", _fail)
+    body = {"ranges": [{"start": "0001-01-01", "end": "9999-12-31"}] * 50}
+    response = client.post("/api/predict/batch", json=body)
+    assert response.status_code == 400
+    assert "limit" in response.json()["detail"]
+
+
+def test_total_across_ranges_is_capped():
+    start = date(2025, 1, 1)
+    end = start + timedelta(days=prediction_service.MAX_BATCH_DAYS // 2)
+    result = prediction_service.predict_batch([], [(start, end)] * 2)
+    assert result["status_code"] == 400
+
+
+def test_too_many_ranges_fail_validation():
+    body = {"ranges": [{"start": "2025-01-01", "end": "2025-01-01"}] * (MAX_BATCH_RANGES + 1)}
+    assert client.post("/api/predict/batch", json=body).status_code == 422
+
+
+def test_small_batch_is_answered():
+    body = {"dates": ["2025-01-01"], "ranges": [{"start": "2025-01-01", "end": "2025-01-07"}]}
+    response = client.post("/api/predict/batch", json=body)
+    assert response.status_code == 200
+    assert len(response.json()["ranges"][0]["predictions"]) == 7
+
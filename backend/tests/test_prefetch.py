@@ -0,0 +1,40 @@
+import asyncio
+from datetime import date
+
+from app.services import agmarknet_service, prefetch_service
+
+
+def test_popularity_and_cache_share_market_keys(monkeypatch):
+    monkeypatch.setattr(prefetch_service, "_markets", prefetch_service.DecayingCounter(3600, 100))
+    monkeypatch.setattr(prefetch_service, "_market_names", {})
+    for spelling in ("Ernakulam", "ERNAKULAM ", "ernakulam"):
+        prefetch_service.record_market("Kerala", "Ernakulam", spelling)
+
+    [(key, score)] = prefetch_service._markets.top(10)
+    assert round(score) == 3
+    assert key == agmarknet_service._cache_key("Kerala", "Ernakulam", "Ernakulam", date.today())[:3]
+
+
+def test_empty_market_is_not_refetched_every_pass(monkeypatch):
+    monkeypatch.setattr(prefetch_service, "_markets", prefetch_service.DecayingCounter(3600, 100))
+    monkeypatch.setattr(prefetch_service, "_market_names", {})
+    monkeypatch.setattr(prefetch_service, "_attempts", {})
+    monkeypatch.setattr(prefetch_service, "JITTER_SECONDS", 0)
+    calls = []
+
+    async def lookback(state, district, market, today):
+        calls.append(market)
+        return []
+
+    monkeypatch.setattr(agmarknet_service, "_lookback", lookback)
+    for _ in range(5):
+        prefetch_service.record_market("Kerala", "Idukki", "Quiet Mandi")
+
+    assert asyncio.run(prefetch_service.prefetch_once())["markets"] == 1
+    assert asyncio.run(prefetch_service.prefetch_once())["markets"] == 0
+    assert calls == ["Quiet Mandi"]
+
+    key = agmarknet_service.market_key("Kerala", "Idukki", "Quiet Mandi")
+    attempted_at, succeeded = prefetch_service._attempts[key]
+    assert not succeeded
+    assert prefetch_service._due(key, None, attempted_at + prefetch_service.RETRY_SECONDS + 1)
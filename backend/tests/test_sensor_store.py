@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.services import alert_service, sensor_store
+
+
+def test_ring_buffer_grows_then_wraps():
+    ring = sensor_store.RingBuffer(capacity=40, width=1)
+    assert len(ring.timestamps) == sensor_store.INITIAL_ROWS
+    for t in range(100):
+        ring.append(float(t), np.array([t], dtype=np.float64))
+    assert len(ring.timestamps) == 40
+    timestamps, values = ring.window(0, 1000)
+    assert timestamps.tolist() == [float(t) for t in range(60, 100)]
+    assert values[:, 0].tolist() == [float(t) for t in range(60, 100)]
+
+
+def test_device_count_is_capped(monkeypatch):
+    monkeypatch.setattr(sensor_store, "MAX_DEVICES", 3)
+    monkeypatch.setattr(sensor_store, "_devices", sensor_store.OrderedDict())
+    for device in ("a", "b", "c"):
+        sensor_store.record_reading(device, {"soil_moisture": 10.0}, 1e9)
+    sensor_store.record_reading("a", {"soil_moisture": 11.0}, 1e9 + 1)  # "b" is now the least recent
+    sensor_store.record_reading("d", {"soil_moisture": 12.0}, 1e9)
+    assert list(sensor_store._devices) == ["c", "a", "d"]
+    assert sensor_store.get_history("b", 0, 2e9, "raw") is None
+
+
+def test_alert_engine_reuses_rows_of_idle_devices():
+    rules = alert_service.RuleSet([
+        {"id": "dry", "kind": "threshold", "field": "soil_moisture", "op": "<", "value": 20, "severity": "warning", "message": "dry"},
+    ])
+    engine = alert_service.AlertEngine(rules, capacity=2, max_devices=2)
+    assert len(engine.evaluate([{"device_id": "a", "soil_moisture": 10.0}])) == 1
+    engine.evaluate([{"device_id": "b", "soil_moisture": 50.0}])
+    # "c" takes over the row of "a", and starts with fresh (armed) state.
+    assert len(engine.evaluate([{"device_id": "c", "soil_moisture": 10.0}])) == 1
+    assert len(engine.last_value) == 2
+    assert sorted(engine._rows) == ["b", "c"]
@@ -0,0 +1,40 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import sensor_store
+
+client = TestClient(app)
+
+
+def test_out_of_order_reading_is_dropped():
+    now = time.time()
+    assert sensor_store.record_reading("order-test", {"soil_moisture": 30.0}, now)
+    assert not sensor_store.record_reading("order-test", {"soil_moisture": 99.0}, now - 3600)
+    assert sensor_store.record_reading("order-test", {"soil_moisture": 31.0}, now + 1)
+
+    history = sensor_store.get_history("order-test", now - 7200, now + 10, "raw", ("soil_moisture",))
+    assert history["timestamps"] == [now, now + 1]
+    assert history["soil_moisture"] == [30.0, 31.0]
+
+
+def test_late_reading_does_not_replace_latest():
+    now = time.time()
+    body = {"device_id": "order-api", "soil_moisture": 30.0, "timestamp": now}
+    assert client.post("/api/iot/sensor-data", json=body).json()["status"] == "success"
+    late = client.post("/api/iot/sensor-data", json={**body, "soil_moisture": 99.0, "timestamp": now - 60})
+    assert late.json()["status"] == "ignored"
+    assert client.get("/api/iot/latest-data/order-api").json()["soil_moisture"] == 30.0
+
+    batch = [{**body, "timestamp": now + 1}, {**body, "timestamp": now - 10}]
+    result = client.post("/api/iot/sensor-data/batch", json=batch).json()
+    assert (result["received"], result["dropped"]) == (2, 1)
+
+
+def test_bad_timestamps_are_rejected():
+    now = time.time()
+    for timestamp in (now * 1000, now + 86400, 12345):
+        body = {"device_id": "order-bad", "soil_moisture": 30.0, "timestamp": timestamp}
+        assert client.post("/api/iot/sensor-data", json=body).status_code == 422
+    assert sensor_store.get_history("order-bad", 0, now * 2, "raw") is None
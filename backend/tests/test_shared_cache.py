@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.cache import TTLCache
+from app.services.state_backend import SQLiteBackend
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two caches, each with its own connection to one database, like two uvicorn workers."""
+    backends = [SQLiteBackend(str(tmp_path / "state.db")) for _ in range(2)]
+    caches = []
+    for backend in backends:
+        cache = TTLCache(ttl=0.2, stale_ttl=60, shared_namespace="cache:test")
+        cache._shared_backend = lambda backend=backend: backend
+        caches.append(cache)
+    yield caches, backends
+    for backend in backends:
+        backend.close()
+
+
+def test_stale_entry_is_replaced_by_fresher_shared_value(workers):
+    (a, b), (backend_a, _) = workers
+    a.set("key", "v1")
+    backend_a.flush()
+    assert asyncio.run(b.get_entry_async("key")) == ("v1", True)
+
+    time.sleep(0.25)
+    assert asyncio.run(b.get_entry_async("key")) == ("v1", False)
+
+    # Worker A refreshes; worker B must not keep serving its stale copy.
+    a.set("key", "v2")
+    backend_a.flush()
+    assert asyncio.run(b.get_entry_async("key")) == ("v2", True)
+    assert b.get("key") == "v2"
+
+
+def test_backend_is_read_off_the_event_loop(workers):
+    (a, b), (backend_a, backend_b) = workers
+    a.set("key", "v1")
+    backend_a.flush()
+    threads = []
+    read = backend_b.get
+
+    def recording_get(namespace, key):
+        threads.append(threading.current_thread())
+        return read(namespace, key)
+
+    backend_b.get = recording_get
+    assert asyncio.run(b.get_async("key")) == "v1"
+    assert threads and threading.main_thread() not in threads
+
+
+def test_late_reading_does_not_replace_newer_latest_from_another_worker(tmp_path, monkeypatch):
+    from app.routers import iot
+    from app.services import sensor_store, state_backend
+
+    worker_a, worker_b = (SQLiteBackend(str(tmp_path / "state.db")) for _ in range(2))
+    now = time.time()
+    try:
+        monkeypatch.setattr(state_backend, "_backend", worker_b)
+        iot._store_reading(iot.SensorData(device_id="shared-dev", soil_moisture=30.0, timestamp=now))
+        worker_b.flush()
+
+        # Worker A has never seen the device, so its own order check lets the late reading through.
+        monkeypatch.setattr(sensor_store, "_devices", sensor_store.OrderedDict())
+        monkeypatch.setattr(state_backend, "_backend", worker_a)
+        iot._store_reading(iot.SensorData(device_id="shared-dev", soil_moisture=99.0, timestamp=now - 60))
+        worker_a.flush()
+
+        assert worker_a.get(iot.LATEST_NAMESPACE, "shared-dev")["soil_moisture"] == 30.0
+        assert worker_b.get(iot.LATEST_NAMESPACE, "shared-dev")["soil_moisture"] == 30.0
+    finally:
+        worker_a.close()
+        worker_b.close()